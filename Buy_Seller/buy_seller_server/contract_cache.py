@@ -0,0 +1,79 @@
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+# Persistent symbol -> contract ID cache for the IBKR Web API.
+#
+# Looking a symbol up means a /iserver/secdef/search round-trip plus scoring
+# the results, and it used to happen on every order, right after a breakout
+# fired. Contract IDs practically never change, so each lookup is kept here
+# with the exchange it was matched on, when it was last verified and, once
+# known, the contract's tick size (price_increment). The cache is saved to
+# conid_cache.json, so it survives restarts. Symbols are looked up
+# ahead of time (when a trade is added or a ticker starts being watched), so
+# executing a trade finds its conid here without any search. Entries older
+# than MAX_AGE_SECONDS are searched again, and an entry is dropped when IBKR
+# rejects an order for it.
+
+CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "conid_cache.json")
+MAX_AGE_SECONDS = 7 * 24 * 3600
+
+
+class ContractCache:
+    """Thread-safe symbol -> {conid, exchange, verified_at} map, saved to a JSON file"""
+
+    def __init__(self, path: str = CACHE_FILE, max_age: float = MAX_AGE_SECONDS) -> None:
+        self.path = path
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = self._load()
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.path, 'r') as f:
+                entries = json.load(f)
+            return entries if isinstance(entries, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self) -> None:
+        """Write the entries through a temporary file (call with the lock held)"""
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(self._entries, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"   ⚠️ Could not save contract cache: {str(e)}")
+
+    def get(self, symbol: str) -> Optional[Dict[str, Any]]:
+        """The cached entry for symbol, None if missing or older than max_age"""
+        with self._lock:
+            entry = self._entries.get(symbol.upper())
+        if entry is None or time.time() - entry.get('verified_at', 0) > self.max_age:
+            return None
+        return entry
+
+    def put(self, symbol: str, conid: int, exchange: Optional[str] = None) -> None:
+        with self._lock:
+            self._entries[symbol.upper()] = {
+                'conid': conid,
+                'exchange': exchange,
+                'verified_at': time.time()
+            }
+            self._save()
+
+    def update(self, symbol: str, **fields: Any) -> None:
+        """Add details (e.g. price_increment) to an existing entry"""
+        with self._lock:
+            entry = self._entries.get(symbol.upper())
+            if entry is not None:
+                entry.update(fields)
+                self._save()
+
+    def invalidate(self, symbol: str) -> None:
+        with self._lock:
+            if self._entries.pop(symbol.upper(), None) is not None:
+                self._save()
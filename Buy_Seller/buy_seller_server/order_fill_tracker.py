@@ -0,0 +1,354 @@
+import json
+import ssl
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+# Order fill tracking for the IBKR Web API.
+#
+# Waiting for a buy to fill used to mean sleeping 2 s, then polling the order,
+# the full order list and the trades endpoint with 1-3 s sleeps in between, so
+# the protective stops went out seconds after the fill. Here a waiter returns
+# as soon as a fill (or cancellation) is seen, from either of two sources:
+#
+# - adaptive short polling of the order's own status endpoint: the order is
+#   checked right away, then at intervals growing from POLL_MIN_INTERVAL to
+#   POLL_MAX_INTERVAL, back to the minimum whenever the order makes progress;
+# - the gateway websocket, if the websocket-client package is installed: the
+#   OrderUpdateFeed thread subscribes to live order ("sor") and trade ("str")
+#   updates and wakes the waiters the moment one arrives.
+#
+# Without websocket-client (or when the socket drops) polling alone keeps
+# working. Everything goes through the gateway's base URL, so a local mock
+# gateway can stand in for IBKR.
+#
+# IBKR paces the gateway at about 10 requests/s overall, and the order list
+# and trades endpoints at about 1 request per 5 s; going over means 429s or
+# the penalty box, right when the stop orders have to go out. The tracker is
+# shared by all trade lanes, and so are its pacers: status polls from every
+# lane are spaced STATUS_POLL_SPACING apart, and the order list and trades
+# fallbacks are requested at most every LIST_POLL_SPACING, their responses
+# serving every waiter until the next one.
+#
+# Order updates are only kept while someone can use them: an order's entry is
+# dropped when its waiter finishes, and updates for orders nobody waits on
+# (other orders in the list, stops on the feed) expire after ORDER_STATE_TTL.
+
+POLL_MIN_INTERVAL = 0.25
+POLL_MAX_INTERVAL = 1.0
+POLL_BACKOFF = 1.5
+# Spacing of the per-order status requests, across all lanes
+STATUS_POLL_SPACING = 0.2
+# Spacing of /iserver/account/orders and of /iserver/account/trades requests
+LIST_POLL_SPACING = 5.0
+# How long an update is kept for an order nobody waits on (yet)
+ORDER_STATE_TTL = 60.0
+# Delay before the websocket feed reconnects after dropping
+FEED_RECONNECT_DELAY = 5.0
+
+FILLED_STATUSES = ('FILLED', 'COMPLETE')
+CANCELLED_STATUSES = ('CANCELLED', 'CANCELED')
+
+
+@dataclass
+class OrderState:
+    order_id: str
+    status: str
+    filled: float
+    remaining: float
+    avg_price: float
+
+    @classmethod
+    def from_order_info(cls, order_id: str, info: Dict[str, Any], expected_shares: float) -> "OrderState":
+        """Parse an order as returned by the order endpoints, the order status endpoint or the "sor" topic"""
+        status = str(info.get('status', info.get('orderStatus', info.get('order_status', 'Unknown')))).upper()
+        filled = float(info.get('filledQuantity', info.get('filled', info.get('cum_fill', 0))) or 0)
+        total = float(info.get('total_size') or expected_shares)
+        remaining = float(info.get('remainingQuantity', info.get('remaining', total - filled)) or 0)
+        avg_price = float(info.get('avgPrice', info.get('avgFillPrice', info.get('average_price', 0))) or 0)
+        return cls(str(order_id), status, filled, remaining, avg_price)
+
+    @property
+    def is_filled(self) -> bool:
+        return self.status in FILLED_STATUSES
+
+    @property
+    def is_cancelled(self) -> bool:
+        return self.status in CANCELLED_STATUSES
+
+
+def _order_id_of(info: Dict[str, Any]) -> Optional[str]:
+    order_id = info.get('orderId', info.get('order_id', info.get('id')))
+    return str(order_id) if order_id is not None else None
+
+
+class RequestPacer:
+    """Keeps one kind of gateway request at least min_interval apart, across all threads"""
+
+    def __init__(self, min_interval: float) -> None:
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._next_time = 0.0
+
+    def wait(self, deadline: Optional[float] = None) -> bool:
+        """Take the next free slot and sleep until it; False (no slot taken) if it is after deadline"""
+        with self._lock:
+            slot = max(time.time(), self._next_time)
+            if deadline is not None and slot > deadline:
+                return False
+            self._next_time = slot + self.min_interval
+        time.sleep(max(0.0, slot - time.time()))
+        return True
+
+    def try_acquire(self) -> bool:
+        """Take the slot only if it is free right now"""
+        with self._lock:
+            now = time.time()
+            if now < self._next_time:
+                return False
+            self._next_time = now + self.min_interval
+            return True
+
+
+class OrderFillTracker:
+    """Latest known state of each order, with waiters woken as soon as it changes"""
+
+    def __init__(self) -> None:
+        self._orders: Dict[str, Dict[str, Any]] = {}
+        self._updated_at: Dict[str, float] = {}
+        # order id -> number of waiters on it
+        self._watched: Dict[str, int] = {}
+        self._version = 0
+        self._changed = threading.Condition()
+        self.feed: Optional["OrderUpdateFeed"] = None
+        self.status_pacer = RequestPacer(STATUS_POLL_SPACING)
+        self.orders_pacer = RequestPacer(LIST_POLL_SPACING)
+        self.trades_pacer = RequestPacer(LIST_POLL_SPACING)
+        # Last response of the trades endpoint, read by every waiter
+        self._trades: List[Dict[str, Any]] = []
+
+    def start_feed(self, ib_api) -> bool:
+        """Start the websocket feed for the gateway (once); False if websocket-client isn't installed"""
+        if self.feed is not None and self.feed.base_url == ib_api.base_url and self.feed.is_alive():
+            return True
+        try:
+            import websocket  # noqa: F401  (websocket-client, optional)
+        except ImportError:
+            return False
+        self.feed = OrderUpdateFeed(self, ib_api)
+        self.feed.start()
+        return True
+
+    def update(self, info: Dict[str, Any]) -> None:
+        """Record an order update and wake the waiters"""
+        order_id = _order_id_of(info)
+        if order_id is None:
+            return
+        with self._changed:
+            self._orders[order_id] = {**self._orders.get(order_id, {}), **info}
+            self._updated_at[order_id] = time.time()
+            self._prune()
+            self._version += 1
+            self._changed.notify_all()
+
+    def _prune(self) -> None:
+        """Drop expired updates of orders nobody waits on (call with the lock held)"""
+        cutoff = time.time() - ORDER_STATE_TTL
+        for order_id in [o for o, at in self._updated_at.items() if at < cutoff and o not in self._watched]:
+            del self._orders[order_id], self._updated_at[order_id]
+
+    def notify(self) -> None:
+        """Wake the waiters so they poll now (e.g. a trade was reported without its order)"""
+        with self._changed:
+            self._version += 1
+            self._changed.notify_all()
+
+    def _wait_for_change(self, version: int, timeout: float) -> int:
+        with self._changed:
+            self._changed.wait_for(lambda: self._version != version, timeout=timeout)
+            return self._version
+
+    def _poll_order(self, ib_api, order_id: str, deadline: float) -> Optional[Dict[str, Any]]:
+        """The order from its status endpoint, else from the (paced) order list; None if not found (yet)"""
+        if self.status_pacer.wait(deadline):
+            response = ib_api.get_single_order_status(order_id)
+            if response.status_code == 200:
+                info = response.json()
+                if isinstance(info, dict) and info.get('order_status'):
+                    return info
+
+        # The order list is refreshed by at most one waiter per LIST_POLL_SPACING, for all of them
+        if self.orders_pacer.try_acquire():
+            response = ib_api.get_order_status()
+            if response.status_code == 200:
+                for order in response.json().get('orders', []):
+                    self.update(order)
+        with self._changed:
+            return self._orders.get(order_id)
+
+    def _poll_trades(self, ib_api, order_id: str) -> Optional[Dict[str, float]]:
+        """Executed quantity and average price of the order from the (paced) trades endpoint"""
+        if self.trades_pacer.try_acquire():
+            response = ib_api.session.get(f"{ib_api.base_url}/iserver/account/trades", timeout=30)
+            if response.status_code == 200:
+                trades = response.json()
+                with self._changed:
+                    self._trades = trades if isinstance(trades, list) else []
+        with self._changed:
+            trades = self._trades
+        executed, notional = 0.0, 0.0
+        for trade in trades:
+            if str(trade.get('order_id')) == order_id:
+                qty = float(trade.get('executed_qty', 0))
+                executed += qty
+                notional += float(trade.get('avg_price', 0)) * qty
+        if executed <= 0:
+            return None
+        return {'filled': executed, 'avg_price': notional / executed}
+
+    def wait_for_fill(self, ib_api, order_id: str, expected_shares: float, timeout: float) -> Optional[dict]:
+        """
+        Wait until the order is filled or cancelled. Returns the fill result
+        (as _wait_for_order_fill_webapi reports it), or None on timeout.
+        """
+        order_id = str(order_id)
+        with self._changed:
+            self._watched[order_id] = self._watched.get(order_id, 0) + 1
+        try:
+            return self._wait_for_fill(ib_api, order_id, expected_shares, timeout)
+        finally:
+            with self._changed:
+                self._watched[order_id] -= 1
+                if not self._watched[order_id]:
+                    del self._watched[order_id]
+                    self._orders.pop(order_id, None)
+                    self._updated_at.pop(order_id, None)
+
+    def _wait_for_fill(self, ib_api, order_id: str, expected_shares: float, timeout: float) -> Optional[dict]:
+        deadline = time.time() + timeout
+        interval = POLL_MIN_INTERVAL
+        last_filled = 0.0
+        version = self._version
+
+        while True:
+            with self._changed:
+                pushed = self._orders.get(order_id)
+            info = pushed
+            if info is None or not OrderState.from_order_info(order_id, info, expected_shares).is_filled:
+                try:
+                    info = self._poll_order(ib_api, order_id, deadline) or pushed
+                    if info is None:
+                        trade = self._poll_trades(ib_api, order_id)
+                        if trade:
+                            print(f"   ✅ Found trades for order {order_id}: {trade['filled']} shares at ${trade['avg_price']}")
+                            return {
+                                'success': True,
+                                'filled_shares': trade['filled'],
+                                'remaining_shares': 0,
+                                'avg_price': trade['avg_price'],
+                                'status': 'FILLED',
+                                'cancelled': False
+                            }
+                except Exception as e:
+                    print(f"   ⚠️ Error checking order status: {str(e)}")
+
+            if info is not None:
+                state = OrderState.from_order_info(order_id, info, expected_shares)
+                if state.is_filled:
+                    print(f"   ✅ Order {order_id} FULLY FILLED: {state.filled} shares at ${state.avg_price}")
+                    return {
+                        'success': True,
+                        'filled_shares': state.filled,
+                        'remaining_shares': 0,
+                        'avg_price': state.avg_price,
+                        'status': state.status,
+                        'cancelled': False
+                    }
+                if state.is_cancelled:
+                    print(f"   ❌ Order {order_id} CANCELLED: {state.filled} shares filled, {state.remaining} remaining")
+                    return {
+                        'success': state.filled > 0,
+                        'filled_shares': state.filled,
+                        'remaining_shares': state.remaining,
+                        'avg_price': state.avg_price,
+                        'status': state.status,
+                        'cancelled': True
+                    }
+                if state.filled > last_filled:
+                    last_filled = state.filled
+                    interval = POLL_MIN_INTERVAL
+                    print(f"   📈 Progress: {state.filled}/{expected_shares} shares filled at avg ${state.avg_price}")
+
+            remaining_time = deadline - time.time()
+            if remaining_time <= 0:
+                return None
+            # Sleeps until the next poll, or until the feed reports an update
+            version = self._wait_for_change(version, min(interval, remaining_time))
+            interval = min(interval * POLL_BACKOFF, POLL_MAX_INTERVAL)
+
+
+class OrderUpdateFeed(threading.Thread):
+    """Gateway websocket subscription that feeds live order and trade updates to the tracker"""
+
+    def __init__(self, tracker: OrderFillTracker, ib_api) -> None:
+        super().__init__(name="ib-order-feed", daemon=True)
+        self.tracker = tracker
+        self.base_url = ib_api.base_url
+        self.session = ib_api.session
+        self.connected = False
+
+    def _session_token(self) -> Optional[str]:
+        try:
+            response = self.session.post(f"{self.base_url}/tickle", timeout=10)
+            if response.status_code == 200:
+                return response.json().get('session')
+        except Exception:
+            pass
+        return None
+
+    def _on_open(self, ws) -> None:
+        token = self._session_token()
+        if token:
+            ws.send(json.dumps({"session": token}))
+        ws.send('sor+{}')
+        ws.send('str+{}')
+        self.connected = True
+        print("✅ Subscribed to IBKR order updates")
+
+    def _on_message(self, ws, message) -> None:
+        try:
+            data = json.loads(message)
+        except (TypeError, ValueError):
+            return
+        topic = data.get('topic') if isinstance(data, dict) else None
+        if topic == 'sor':
+            for order in data.get('args') or []:
+                if isinstance(order, dict):
+                    self.tracker.update(order)
+        elif topic == 'str':
+            # Trades don't always carry their order's state: let the waiters look it up
+            self.tracker.notify()
+
+    def _on_close(self, ws, *args) -> None:
+        self.connected = False
+
+    def run(self) -> None:
+        import websocket
+
+        url = self.base_url.replace('https://', 'wss://', 1).replace('http://', 'ws://', 1) + '/ws'
+        while True:
+            try:
+                ws = websocket.WebSocketApp(
+                    url,
+                    on_open=self._on_open,
+                    on_message=self._on_message,
+                    on_close=self._on_close,
+                    on_error=lambda ws, error: print(f"   ⚠️ Order feed error: {error}"),
+                )
+                # The local gateway uses a self-signed certificate, like the REST session
+                ws.run_forever(sslopt={"cert_reqs": ssl.CERT_NONE}, ping_interval=30, ping_timeout=10)
+            except Exception as e:
+                print(f"   ⚠️ Order feed stopped: {str(e)}")
+            self.connected = False
+            time.sleep(FEED_RECONNECT_DELAY)
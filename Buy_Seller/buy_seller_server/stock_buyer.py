@@ -6,11 +6,24 @@ from dataclasses import dataclass, asdict
 from datetime import datetime
 from flask import Flask, request, jsonify
 import math
-from queue import Queue
+from queue import Queue, Empty
 import uuid
 import flask_cors
 import requests
 import urllib3
+
+from contract_cache import ContractCache
+from order_fill_tracker import OrderFillTracker, OrderState
+
+# Requests run on one lane per ticker: each lane executes its requests in
+# order, while lanes for different tickers run in parallel, so a fill wait on
+# one breakout doesn't hold up another. Trades, risk and the error log are
+# shared between lanes under one lock, held only around checks and updates
+# (e.g. reserving a trade's risk), never around IB calls. /status reads a
+# snapshot republished after every change, without waiting on any lane.
+
+# Seconds a lane's worker thread waits for new requests before exiting
+LANE_IDLE_TIMEOUT = 60.0
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
 
@@ -42,6 +55,9 @@ class Trade:
             self.trade_id = str(uuid.uuid4())
 
 class IBWebAPI:
+    # Shared by every connection (one per lane), see contract_cache.py
+    contract_cache = ContractCache()
+
     def __init__(self, base_url="https://localhost:5050/v1/api"):
         self.base_url = base_url
         self.session = requests.Session()
@@ -82,37 +98,49 @@ class IBWebAPI:
             print(f"   ❌ Get accounts error: {str(e)}")
             return None
     
-    def place_order(self, conid, order_data):
-        """Place order via Web API"""
-        # First get the account ID
+    def _selected_account(self):
+        """The selected account ID, and the accounts response when it couldn't be found"""
         accounts_response = self.session.get(f"{self.base_url}/iserver/accounts", timeout=10)
         if accounts_response.status_code != 200:
             print(f"   ❌ Failed to get accounts: {accounts_response.status_code}")
-            return accounts_response
+            return None, accounts_response
         
-        accounts_data = accounts_response.json()
-        account_id = accounts_data.get('selectedAccount')
+        account_id = accounts_response.json().get('selectedAccount')
         if not account_id:
             print(f"   ❌ No selected account found")
-            return accounts_response
-        
-        url = f"{self.base_url}/iserver/account/{account_id}/orders"
-        payload = {
-            "orders": [{
-                "acctId": account_id,
-                "conid": int(conid),  # Ensure it's an integer
-                "orderType": order_data["orderType"],
-                "side": order_data["side"],
-                "quantity": order_data["quantity"],
-                "tif": order_data.get("tif", "DAY")  # Default to DAY if not provided
-            }]
+            return None, accounts_response
+        return account_id, None
+
+    @staticmethod
+    def _order_payload(account_id, conid, order_data):
+        order = {
+            "acctId": account_id,
+            "conid": int(conid),  # Ensure it's an integer
+            "orderType": order_data["orderType"],
+            "side": order_data["side"],
+            "quantity": order_data["quantity"],
+            "tif": order_data.get("tif", "DAY")  # Default to DAY if not provided
         }
         
-        # Only add price fields if they exist
-        if order_data.get("price") is not None:
-            payload["orders"][0]["price"] = order_data["price"]
-        if order_data.get("auxPrice") is not None:
-            payload["orders"][0]["auxPrice"] = order_data["auxPrice"]
+        # Only add price fields and bracket references (cOID / parentId) if they exist
+        for field in ("price", "auxPrice", "cOID", "parentId"):
+            if order_data.get(field) is not None:
+                order[field] = order_data[field]
+        return order
+
+    def place_order(self, conid, order_data):
+        """Place order via Web API"""
+        return self.place_orders(conid, [order_data])
+
+    def place_orders(self, conid, orders_data):
+        """Place several orders in one request, e.g. a parent order with its attached child orders"""
+        # First get the account ID
+        account_id, error_response = self._selected_account()
+        if account_id is None:
+            return error_response
+        
+        url = f"{self.base_url}/iserver/account/{account_id}/orders"
+        payload = {"orders": [self._order_payload(account_id, conid, order_data) for order_data in orders_data]}
         
         print(f"   📤 Sending order to: {url}")
         print(f"   📋 Payload: {json.dumps(payload, indent=2)}")
@@ -127,9 +155,46 @@ class IBWebAPI:
         except Exception as e:
             print(f"   ❌ Request exception: {str(e)}")
             raise
+
+    def modify_order(self, order_id, conid, order_data):
+        """Modify a working order (price, stop price or quantity)"""
+        account_id, error_response = self._selected_account()
+        if account_id is None:
+            return error_response
+        
+        url = f"{self.base_url}/iserver/account/{account_id}/order/{order_id}"
+        payload = self._order_payload(account_id, conid, order_data)
+        print(f"   📤 Modifying order {order_id}: {json.dumps(payload)}")
+        return self.session.post(url, json=payload, timeout=30)
+
+    def get_price_increment(self, symbol, conid):
+        """Tick size of a contract, kept in the contract cache next to its conid"""
+        cached = self.contract_cache.get(symbol)
+        if cached and cached.get('conid') == conid and cached.get('price_increment'):
+            return cached['price_increment']
+        
+        price_increment = 0.01  # Default tick size
+        contract_details = self.get_contract_details(conid)
+        if contract_details:
+            price_increment = float(contract_details.get('priceIncrement', 0.01))
+            self.contract_cache.update(symbol, price_increment=price_increment)
+        return price_increment
     
-    def get_contract_id(self, symbol):
-        """Get contract ID for a symbol with smart filtering"""
+    def get_contract_id(self, symbol, use_cache=True):
+        """Get contract ID for a symbol, from the contract cache unless it's missing or stale"""
+        if use_cache:
+            cached = self.contract_cache.get(symbol)
+            if cached:
+                return cached['conid']
+
+        match = self._search_contract(symbol)
+        if not match or match.get('conid') is None:
+            return None
+        self.contract_cache.put(symbol, match.get('conid'), match.get('description'))
+        return match.get('conid')
+
+    def _search_contract(self, symbol):
+        """Search the contract for a symbol with smart filtering"""
         url = f"{self.base_url}/iserver/secdef/search"
         payload = {"symbol": symbol, "secType": "STK"}
         try:
@@ -186,11 +251,11 @@ class IBWebAPI:
                         # Safely get description for logging
                         best_desc = (best_match.get('description') or 'Unknown').upper()
                         print(f"   🔍 Selected contract for {symbol}: {best_desc} (ID: {best_match.get('conid')})")
-                        return best_match.get("conid")
+                        return best_match
                     
                     # Fallback to first item if no candidates passed filter
                     print(f"   ⚠️ No ideal match found for {symbol}, using first result")
-                    return data[0].get("conid")
+                    return data[0]
                     
             return None
         except Exception as e:
@@ -204,6 +269,10 @@ class IBWebAPI:
             url += f"/{order_id}"
         return self.session.get(url, timeout=30)
     
+    def get_single_order_status(self, order_id):
+        """Status of one order (order_status, cum_fill, average_price); not paced like the order list"""
+        return self.session.get(f"{self.base_url}/iserver/account/order/status/{order_id}", timeout=30)
+    
     def cancel_order(self, order_id):
         """Cancel an order with proper account context"""
         try:
@@ -272,22 +341,37 @@ class StockTradingServer:
         self.server_start_time = time.time()
         self.last_trade_time = None
         
-        # Threading for sequential processing
-        self.request_queue = Queue()
-        self.processing_thread = None
-        self.is_processing = False
+        # Per-ticker lanes: lane key -> request queue, served by its own worker thread
+        self.lanes: Dict[str, Queue] = {}
+        self.lanes_lock = threading.Lock()
+        self.busy_lanes: set = set()
         self.server_running = True
+        # Guards trades, available_risk, the trade id sets and the error log
+        self.state_lock = threading.RLock()
+        self._status_snapshot: Dict[str, Any] = {}
         
-        # IBKR Web API connection
-        self.ib_api = None
+        # IBKR Web API connection, one per lane thread (see the ib_api property)
+        self._local = threading.local()
+        # Order fills, from polling and the gateway's order update feed
+        self.fill_tracker = OrderFillTracker()
+        # Send the buy and its sell stops as one bracket (False: buy, wait for the fill, then each stop)
+        self.use_bracket_orders = True
         
         # Idempotency tracking - prevent duplicate trades
         self.executed_trade_ids: set = set()  # Track completed trades
         self.executing_trade_ids: set = set()  # Track in-progress trades
         
-        # Start processing thread
-        self.start_processing_thread()
-        
+        self._publish_status()
+
+    @property
+    def ib_api(self) -> Optional[IBWebAPI]:
+        """The IBKR Web API connection of the current lane"""
+        return getattr(self._local, 'ib_api', None)
+
+    @ib_api.setter
+    def ib_api(self, value: Optional[IBWebAPI]):
+        self._local.ib_api = value
+
     def _remove_trade_internal(self, data: dict) -> dict:
         """Internal method to remove a trade"""
         try:
@@ -296,24 +380,26 @@ class StockTradingServer:
             lower_price = data.get('lower_price')
             higher_price = data.get('higher_price')
             
-            # Find trade by ID first, then by criteria as fallback
-            trade_to_remove = None
+            with self.state_lock:
+                # Find trade by ID first, then by criteria as fallback
+                trade_to_remove = None
             
-            if trade_id:
-                for trade in self.trades:
-                    if trade.trade_id == trade_id:
-                        trade_to_remove = trade
-                        break
+                if trade_id:
+                    for trade in self.trades:
+                        if trade.trade_id == trade_id:
+                            trade_to_remove = trade
+                            break
             
-            # If not found by ID, try to find by criteria
-            if trade_to_remove is None and ticker and lower_price is not None and higher_price is not None:
-                trade_to_remove = self._find_trade_by_criteria(ticker, lower_price, higher_price)
+                # If not found by ID, try to find by criteria
+                if trade_to_remove is None and ticker and lower_price is not None and higher_price is not None:
+                    trade_to_remove = self._find_trade_by_criteria(ticker, lower_price, higher_price)
             
-            if trade_to_remove is None:
-                return {'success': False, 'error': 'Trade not found'}
+                if trade_to_remove is None:
+                    return {'success': False, 'error': 'Trade not found'}
             
-            # Remove the trade
-            self.trades.remove(trade_to_remove)
+                # Remove the trade
+                self.trades.remove(trade_to_remove)
+                self._publish_status()
             
             return {
                 'success': True,
@@ -342,59 +428,80 @@ class StockTradingServer:
             'ticker': ticker,
             'lower_price': lower_price,
             'higher_price': higher_price
-        })
+        }, lane_key=self._lane_key(ticker, trade_id))
 
     
-    def start_processing_thread(self):
-        """Start the sequential processing thread"""
-        self.processing_thread = threading.Thread(target=self._process_requests)
-        self.processing_thread.daemon = True
-        self.processing_thread.start()
-    
-    def _process_requests(self):
-        """Process requests sequentially"""
+    def _lane_key(self, ticker: Optional[str] = None, trade_id: Optional[str] = None) -> str:
+        """The lane of a request: its ticker, or the ticker of the trade it refers to"""
+        if not ticker and trade_id:
+            with self.state_lock:
+                ticker = next((t.ticker for t in self.trades if t.trade_id == trade_id), None)
+        return (ticker or '').upper()
+
+    def _get_lane(self, key: str) -> Queue:
+        """The request queue of a lane, starting its worker if needed (call with lanes_lock held)"""
+        lane = self.lanes.get(key)
+        if lane is None:
+            lane = Queue()
+            self.lanes[key] = lane
+            worker = threading.Thread(target=self._process_lane, args=(key, lane), name=f"lane-{key or 'default'}")
+            worker.daemon = True
+            worker.start()
+        return lane
+
+    def _set_lane_busy(self, key: str, busy: bool):
+        with self.state_lock:
+            if busy:
+                self.busy_lanes.add(key)
+            else:
+                self.busy_lanes.discard(key)
+            self._publish_status()
+
+    def _process_lane(self, key: str, lane: Queue):
+        """Process one lane's requests in order; the worker exits once the lane stays idle"""
         while self.server_running:
             try:
                 # Get next request (blocks until available)
-                request_data = self.request_queue.get(timeout=1)
-                if request_data is None:
-                    continue
-                
-                self.is_processing = True
-                
-                # Process the request
-                request_type = request_data['type']
-                response_queue = request_data['response_queue']
-                
-                try:
-                    if request_type == 'execute_trade':
-                        result = self._execute_trade_internal(request_data['data'])
-                    elif request_type == 'add_trade':
-                        result = self._add_trade_internal(request_data['data'])
-                    elif request_type == 'get_status':
-                        result = self._get_status_internal()
-                    elif request_type == 'remove_trade':
-                        result = self._remove_trade_internal(request_data['data'])
-                    else:
-                        result = {'success': False, 'error': 'Unknown request type'}
-                    
-                    response_queue.put(result)
-                    
-                except Exception as e:
-                    error_result = {'success': False, 'error': str(e)}
-                    response_queue.put(error_result)
-                    self._log_error("REQUEST_PROCESSING_ERROR", "", str(e))
-                
-                finally:
-                    self.is_processing = False
-                    self.request_queue.task_done()
-                    
-            except:
-                # Timeout or other error - continue processing
+                request_data = lane.get(timeout=LANE_IDLE_TIMEOUT)
+            except Empty:
+                with self.lanes_lock:
+                    # Requests are only queued under lanes_lock, so none can slip in after this check
+                    if lane.empty():
+                        del self.lanes[key]
+                        return
                 continue
-    
-    def _queue_request(self, request_type: str, data: dict = None) -> dict:
-        """Queue a request for sequential processing"""
+            if request_data is None:
+                continue
+
+            self._set_lane_busy(key, True)
+
+            # Process the request
+            request_type = request_data['type']
+            response_queue = request_data['response_queue']
+
+            try:
+                if request_type == 'execute_trade':
+                    result = self._execute_trade_internal(request_data['data'])
+                elif request_type == 'add_trade':
+                    result = self._add_trade_internal(request_data['data'])
+                elif request_type == 'remove_trade':
+                    result = self._remove_trade_internal(request_data['data'])
+                else:
+                    result = {'success': False, 'error': 'Unknown request type'}
+
+                response_queue.put(result)
+
+            except Exception as e:
+                error_result = {'success': False, 'error': str(e)}
+                response_queue.put(error_result)
+                self._log_error("REQUEST_PROCESSING_ERROR", key, str(e))
+
+            finally:
+                self._set_lane_busy(key, False)
+                lane.task_done()
+
+    def _queue_request(self, request_type: str, data: dict = None, lane_key: str = '') -> dict:
+        """Queue a request on its lane and wait for the result"""
         response_queue = Queue()
         request_data = {
             'type': request_type,
@@ -402,7 +509,8 @@ class StockTradingServer:
             'response_queue': response_queue
         }
         
-        self.request_queue.put(request_data)
+        with self.lanes_lock:
+            self._get_lane(lane_key).put(request_data)
         
         # Wait for response (with timeout)
         try:
@@ -420,11 +528,13 @@ class StockTradingServer:
             "trade_data": trade_data
         }
         
-        self.error_log.append(error_entry)
-        
-        # Keep only last 100 errors
-        if len(self.error_log) > 100:
-            self.error_log = self.error_log[-100:]
+        with self.state_lock:
+            self.error_log.append(error_entry)
+
+            # Keep only last 100 errors
+            if len(self.error_log) > 100:
+                self.error_log = self.error_log[-100:]
+            self._publish_status()
         
         print(f"🚨 Error logged: {error_type} - {error_message}")
     
@@ -519,6 +629,8 @@ class StockTradingServer:
             
             print(f"✅ Found contract ID for {ticker}: {result}")
             print("✅ Connected to IBKR Web API")
+            if not self.fill_tracker.start_feed(self.ib_api):
+                print("   ℹ️ websocket-client not installed - tracking fills by polling only")
             return True
             
         except Exception as e:
@@ -562,7 +674,8 @@ class StockTradingServer:
                     'sample_symbol': symbol
                 }
             
-            conid = ib_api.get_contract_id(symbol)
+            # A real search (refreshing the cache), to check that lookups work
+            conid = ib_api.get_contract_id(symbol, use_cache=False)
             if not conid:
                 return {
                     'success': False,
@@ -592,6 +705,34 @@ class StockTradingServer:
                 'sample_symbol': symbol
             }
         
+    def _confirm_order_replies(self, result, max_confirmations: int = 3):
+        """Confirm the warnings IBKR asks about after an order; returns (final response, error)"""
+        confirmation_count = 0
+        current_result = result
+
+        while isinstance(current_result, list) and len(current_result) > 0 and 'id' in current_result[0] and confirmation_count < max_confirmations:
+            confirmation_id = current_result[0]['id']
+            print(f"   📩 Confirmation required. Sending reply to ID: {confirmation_id}")
+            reply_response = self.ib_api.session.post(
+                f"{self.ib_api.base_url}/iserver/reply/{confirmation_id}",
+                json={"confirmed": True},
+                timeout=30
+            )
+            print(f"   📥 Reply response status: {reply_response.status_code}, Headers: {dict(reply_response.headers)}, Body: {reply_response.text}")
+            if reply_response.status_code != 200:
+                return None, f'Confirmation failed: Status {reply_response.status_code}, Response: {reply_response.text}'
+            current_result = reply_response.json()
+            print(f"   ✅ Confirmation response: {current_result}")
+            confirmation_count += 1
+        return current_result, None
+
+    @staticmethod
+    def _order_ids(result) -> list:
+        """Order IDs in a final order response, in the order the orders were sent"""
+        items = result if isinstance(result, list) else [result] if isinstance(result, dict) else []
+        return [item.get('order_id') or item.get('id') for item in items
+                if isinstance(item, dict) and (item.get('order_id') or item.get('id'))]
+
     def _execute_order(self, symbol: str, side: str, quantity: float, order_type: str = "MKT", price: float = None, stop_price: float = None, tif: str = "DAY") -> dict:
         try:
             conid = self.ib_api.get_contract_id(symbol)
@@ -627,47 +768,24 @@ class StockTradingServer:
             if response.status_code != 200:
                 error_details = f'Status: {response.status_code}, Response: {response.text}'
                 print(f"   ❌ Order failed - {error_details}")
+                # The cached conid may be what IBKR rejected: search it again next time
+                self.ib_api.contract_cache.invalidate(symbol)
                 return {'success': False, 'error': error_details}
 
             result = response.json()
             print(f"   ✅ Order response: {result}")
 
             # Handle multiple confirmations
-            max_confirmations = 3
-            confirmation_count = 0
-            current_result = result
-
-            while isinstance(current_result, list) and len(current_result) > 0 and 'id' in current_result[0] and confirmation_count < max_confirmations:
-                confirmation_id = current_result[0]['id']
-                print(f"   📩 Confirmation required. Sending reply to ID: {confirmation_id}")
-                reply_response = self.ib_api.session.post(
-                    f"{self.ib_api.base_url}/iserver/reply/{confirmation_id}",
-                    json={"confirmed": True},
-                    timeout=30
-                )
-                print(f"   📥 Reply response status: {reply_response.status_code}, Headers: {dict(reply_response.headers)}, Body: {reply_response.text}")
-                if reply_response.status_code != 200:
-                    return {
-                        'success': False,
-                        'error': f'Confirmation failed: Status {reply_response.status_code}, Response: {reply_response.text}'
-                    }
-                current_result = reply_response.json()
-                print(f"   ✅ Confirmation response: {current_result}")
-                confirmation_count += 1
+            current_result, error = self._confirm_order_replies(result)
+            if error:
+                return {'success': False, 'error': error}
 
             # Extract order_id from final response
-            order_id = None
-            if isinstance(current_result, list) and current_result:
-                order_id = current_result[0].get('order_id') or current_result[0].get('id')
-            elif isinstance(current_result, dict):
-                order_id = current_result.get('order_id') or current_result.get('id')
+            order_ids = self._order_ids(current_result)
+            order_id = order_ids[0] if order_ids else None
 
             if order_id:
                 print(f"   📤 BUY ORDER SUBMITTED (Order ID: {order_id})")
-                # Immediate status check
-                time.sleep(1)  # Short delay to allow order registration
-                status_response = self.ib_api.get_order_status(order_id)
-                print(f"   📋 Immediate order status check: {status_response.text}")
                 return {
                     'success': True,
                     'order_id': order_id,
@@ -687,116 +805,11 @@ class StockTradingServer:
         """Wait for an order to fill, handling partial fills and cancellation with proper account context."""
         print(f"   ⏳ Waiting for order {order_id} to fill {expected_shares} shares...")
         
-        start_time = time.time()
-        last_filled = 0.0
-        no_progress_time = 0
-        max_retries = 3
-        
-        # Initial delay to allow order registration
-        time.sleep(2)
-        
-        while time.time() - start_time < timeout:
-            for attempt in range(max_retries):
-                try:
-                    # Try specific order status first
-                    response = self.ib_api.get_order_status(order_id)
-                    print(f"   📋 Specific order status response (attempt {attempt + 1}): {response.text}")
-                    
-                    order_info = None
-                    if response.status_code == 200 and response.json():
-                        order_info = response.json()
-                        if isinstance(order_info, list):
-                            order_info = order_info[0] if order_info else None
-                    
-                    # Fall back to full order list if specific status fails
-                    if not order_info:
-                        response = self.ib_api.get_order_status()
-                        print(f"   📋 Full order status response (attempt {attempt + 1}): {response.text}")
-                        if response.status_code == 200:
-                            orders = response.json().get('orders', [])
-                            for order in orders:
-                                if str(order.get('orderId')) == str(order_id) or str(order.get('id')) == str(order_id):
-                                    order_info = order
-                                    break
-                    
-                    # Check trades endpoint as a fallback
-                    if not order_info:
-                        print(f"   ⚠️ Order {order_id} not found in order list (attempt {attempt + 1})")
-                        print(f"   ⚠️ Checking trades for order {order_id}...")
-                        trades_response = self.ib_api.session.get(f"{self.ib_api.base_url}/iserver/account/trades", timeout=30)
-                        if trades_response.status_code == 200:
-                            trades = trades_response.json()
-                            for trade in trades:
-                                if str(trade.get('order_id')) == str(order_id):
-                                    print(f"   ✅ Found trade: {trade}")
-                                    return {
-                                        'success': True,
-                                        'filled_shares': float(trade.get('executed_qty', 0)),
-                                        'remaining_shares': 0,
-                                        'avg_price': float(trade.get('avg_price', 0)),
-                                        'status': 'FILLED',
-                                        'cancelled': False
-                                    }
-                        print(f"   ⚠️ Order {order_id} not found in trades")
-                        if attempt < max_retries - 1:
-                            time.sleep(1)
-                            continue
-                        break
-                    
-                    # Process order information
-                    status = order_info.get('status', order_info.get('orderStatus', 'Unknown')).upper()
-                    filled_qty = float(order_info.get('filledQuantity', order_info.get('filled', 0)))
-                    remaining_qty = float(order_info.get('remainingQuantity', order_info.get('remaining', expected_shares - filled_qty)))
-                    avg_price = float(order_info.get('avgPrice', order_info.get('avgFillPrice', 0)))
-                    
-                    if filled_qty > last_filled:
-                        last_filled = filled_qty
-                        no_progress_time = 0
-                        print(f"   📈 Progress: {filled_qty}/{expected_shares} shares filled at avg ${avg_price}")
-                    
-                    if status in ['FILLED', 'COMPLETE']:
-                        print(f"   ✅ Order {order_id} FULLY FILLED: {filled_qty} shares at ${avg_price}")
-                        return {
-                            'success': True,
-                            'filled_shares': filled_qty,
-                            'remaining_shares': 0,
-                            'avg_price': avg_price,
-                            'status': status,
-                            'cancelled': False
-                        }
-                    elif status in ['CANCELLED', 'CANCELED']:
-                        print(f"   ❌ Order {order_id} CANCELLED: {filled_qty} shares filled, {remaining_qty} remaining")
-                        return {
-                            'success': filled_qty > 0,
-                            'filled_shares': filled_qty,
-                            'remaining_shares': remaining_qty,
-                            'avg_price': avg_price,
-                            'status': status,
-                            'cancelled': True
-                        }
-                    elif status in ['PRESUBMITTED']:
-                        print(f"   ⏳ Order {order_id} in PreSubmitted state, waiting for status change...")
-                        time.sleep(3)
-                        continue
-                    elif filled_qty > 0 and filled_qty < expected_shares:
-                        if status in ['PARTIALLYFILLED', 'SUBMITTED', 'PENDING']:
-                            no_progress_time += 1
-                            print(f"   ⏳ Partial fill: {filled_qty}/{expected_shares} shares. Waiting for more...")
-                            time.sleep(1)
-                            continue
-                    
-                    time.sleep(1)
-                    no_progress_time += 1
-                    break
-                except Exception as e:
-                    print(f"   ⚠️ Error checking order status: {str(e)}")
-                    if attempt < max_retries - 1:
-                        time.sleep(1)
-                        continue
-                    time.sleep(1)
-                    no_progress_time += 1
-                    break
-        
+        # Returns as soon as the fill or cancellation is seen (polled or pushed by the order feed)
+        result = self.fill_tracker.wait_for_fill(self.ib_api, order_id, expected_shares, timeout)
+        if result is not None:
+            return result
+
         # Timeout reached - final check
         print(f"   ⏰ Order {order_id} timeout. Checking final status...")
         final_filled = 0.0
@@ -854,7 +867,7 @@ class StockTradingServer:
                         print(f"   📋 Found filled from trades: {final_filled} shares")
         except Exception as e:
             print(f"   ❌ Error in final check: {str(e)}")
-            self._log_error("FINAL_STATUS_CHECK_FAILED", "UNKNOWN", str(e), order_id=order_id)
+            self._log_error("FINAL_STATUS_CHECK_FAILED", "UNKNOWN", str(e), {'order_id': order_id})
         
         return {
             'success': final_filled > 0,
@@ -947,12 +960,9 @@ class StockTradingServer:
             self._log_error("CONTRACT_NOT_FOUND", trade.ticker, "Could not find contract ID")
             return
         
-        # Get contract details for tick size
-        contract_details = self.ib_api.get_contract_details(conid)
-        price_increment = 0.01  # Default tick size
-        if contract_details:
-            price_increment = float(contract_details.get('priceIncrement', 0.01))
-            print(f"   📏 Price increment (tick size): ${price_increment}")
+        # Tick size, from the contract cache once it has been looked up
+        price_increment = self.ib_api.get_price_increment(trade.ticker, conid)
+        print(f"   📏 Price increment (tick size): ${price_increment}")
         
         try:
             for i, stop in enumerate(trade.sell_stops, 1):
@@ -1010,6 +1020,175 @@ class StockTradingServer:
             self._log_error("SELL_STOP_ORDERS_FAILED", trade.ticker, error_msg)
             raise
     
+    def _stop_price(self, stop: SellStopOrder, reference_price: float, price_increment: float) -> float:
+        """A stop's price (fixed, or percent below reference_price) rounded to the tick size"""
+        if stop.price is not None:
+            raw_stop_price = stop.price
+        else:
+            raw_stop_price = reference_price * (1 - stop.percent_below_fill / 100.0)
+        return round(round(raw_stop_price / price_increment) * price_increment, 6)
+
+    def _execute_bracket_order(self, trade: Trade) -> dict:
+        """Execute the buy and all its sell stops as one bracket, sent in a single request.
+
+        The stops are child orders of the market buy, so IBKR activates them as
+        soon as it fills. Percent-below-fill stops are therefore sent against the
+        bottom of the buy range, which keeps them below the fill, and raised to
+        the actual average fill price right after the fill (never lowered); after
+        a partial fill, stop quantities are scaled down the same way.
+        'submitted' is False only when nothing can be working at IBKR (the
+        order was never sent, or IBKR rejected it with a 4xx), so the sequential
+        path can still be tried. After a timeout, connection error or 5xx the
+        bracket may exist, and falling back would buy twice; sending the bracket
+        again is safe, as IBKR refuses a second order with the same cOID.
+        """
+        print(f"\n🔵 EXECUTING BRACKET ORDER:")
+        print(f"   Ticker: {trade.ticker}")
+        print(f"   Shares: {trade.shares}")
+        print(f"   Sell stops: {len(trade.sell_stops)}")
+        failed = {'success': False, 'filled_shares': 0, 'avg_price': 0, 'full_fill': False, 'submitted': False}
+
+        try:
+            conid = self.ib_api.get_contract_id(trade.ticker)
+            if not conid:
+                self._log_error("CONTRACT_NOT_FOUND", trade.ticker, "Could not find contract ID")
+                return failed
+            price_increment = self.ib_api.get_price_increment(trade.ticker, conid)
+
+            buy_ref = f"{trade.trade_id}-buy"
+            orders = [{"orderType": "MKT", "side": "BUY", "quantity": trade.shares, "tif": "DAY", "cOID": buy_ref}]
+            for i, stop in enumerate(trade.sell_stops, 1):
+                stop_price = self._stop_price(stop, trade.lower_price_range, price_increment)
+                orders.append({
+                    "orderType": "STP", "side": "SELL", "quantity": stop.shares,
+                    "price": stop_price, "auxPrice": stop_price, "tif": "GTC",
+                    "cOID": f"{trade.trade_id}-stop{i}", "parentId": buy_ref
+                })
+
+            # From here on orders may be working at IBKR: never fall back to placing them again
+            failed['submitted'] = True
+            response = self.ib_api.place_orders(conid, orders)
+            if response is not None and 400 <= response.status_code < 500:
+                failed['submitted'] = False
+                error_msg = f"Bracket order rejected: Status {response.status_code}, Response: {response.text}"
+                print(f"   ❌ {error_msg}")
+                self.ib_api.contract_cache.invalidate(trade.ticker)
+                self._log_error("BRACKET_ORDER_FAILED", trade.ticker, error_msg)
+                return failed
+            if response is None or response.status_code != 200:
+                status = response.status_code if response is not None else "no response"
+                error_msg = (f"Bracket order outcome unknown (status {status}) - it may be working at IBKR, "
+                             f"check orders for {buy_ref} before retrying")
+                print(f"   ❌ {error_msg}")
+                self._log_error("BRACKET_ORDER_UNCONFIRMED", trade.ticker, error_msg)
+                return failed
+
+            current_result, error = self._confirm_order_replies(response.json(), max_confirmations=3 + len(orders))
+            order_ids = self._order_ids(current_result) if not error else []
+            if not order_ids:
+                error_msg = f"Bracket order not confirmed: {error or current_result}"
+                print(f"   ❌ {error_msg}")
+                self._log_error("BRACKET_ORDER_FAILED", trade.ticker, error_msg)
+                return failed
+
+            buy_order_id, stop_order_ids = order_ids[0], order_ids[1:]
+            print(f"   📤 BRACKET SUBMITTED (Buy order ID: {buy_order_id}, stop order IDs: {stop_order_ids})")
+
+            fill_result = self._wait_for_order_fill_webapi(buy_order_id, trade.shares, timeout=7)
+            filled_shares = fill_result['filled_shares']
+            if filled_shares <= 0:
+                # Cancel the buy itself first, so a late fill can't arrive without stops,
+                # then the attached stops in case any is left working
+                self.ib_api.cancel_order(buy_order_id)
+                for order_id in stop_order_ids:
+                    self.ib_api.cancel_order(order_id)
+                error_msg = f"Buy order {buy_order_id} failed to fill any shares"
+                print(f"   ❌ BUY ORDER FAILED: {error_msg}")
+                self._log_error("BUY_ORDER_NO_FILL", trade.ticker, error_msg)
+                return failed
+
+            avg_price = fill_result['avg_price']
+            full_fill = filled_shares == trade.shares
+            print(f"   ✅ BUY ORDER {'FULLY ' if full_fill else 'PARTIALLY '}COMPLETED: {filled_shares} shares at ${avg_price}")
+
+            stops_placed = True
+            if len(stop_order_ids) == len(trade.sell_stops):
+                self._adjust_bracket_stops(trade, conid, stop_order_ids, filled_shares, avg_price, price_increment)
+            elif not stop_order_ids:
+                print("   ⚠️ IBKR returned no attached stop orders - placing the stops separately")
+                self._execute_sell_stop_orders(trade, filled_shares, avg_price)
+            else:
+                # Which stops these are is unknown: cancel them and let the caller place all stops again
+                error_msg = (f"IBKR acknowledged {len(stop_order_ids)} of {len(trade.sell_stops)} attached stops "
+                             f"({stop_order_ids}) - cancelling them and placing the stops separately")
+                print(f"   ⚠️ {error_msg}")
+                self._log_error("BRACKET_STOPS_UNCONFIRMED", trade.ticker, error_msg)
+                for order_id in stop_order_ids:
+                    self.ib_api.cancel_order(order_id)
+                stops_placed = False
+
+            return {
+                'success': True,
+                'filled_shares': filled_shares,
+                'avg_price': avg_price,
+                'full_fill': full_fill,
+                'submitted': True,
+                'stops_placed': stops_placed
+            }
+
+        except Exception as e:
+            error_msg = f"Bracket order failed: {str(e)}"
+            if failed['submitted']:
+                error_msg += f" - it may be working at IBKR, check orders for {trade.trade_id}-buy before retrying"
+            print(f"   ❌ {error_msg}")
+            self._log_error("BRACKET_ORDER_FAILED", trade.ticker, error_msg)
+            return failed
+
+    def _adjust_bracket_stops(self, trade: Trade, conid, stop_order_ids: list, filled_shares: float,
+                              avg_fill_price: float, price_increment: float):
+        """Move the attached stops to the fill: percent stops up to the fill price, quantities to the shares bought"""
+        scale_factor = float(filled_shares) / trade.shares
+        for i, (stop, order_id) in enumerate(zip(trade.sell_stops, stop_order_ids), 1):
+            scaled_shares = stop.shares * scale_factor
+            sent_price = self._stop_price(stop, trade.lower_price_range, price_increment)
+            # Only ever tighten: a fill below the range keeps the stop that is already working
+            stop_price = max(self._stop_price(stop, avg_fill_price, price_increment), sent_price)
+
+            if scaled_shares < 0.001:  # Minimum fractional share
+                print(f"   ⚠️ Stop {i}: Cancelling (scaled to {scaled_shares:.3f} shares - too small)")
+                self.ib_api.cancel_order(order_id)
+                continue
+            if abs(scaled_shares - stop.shares) < 1e-9 and abs(stop_price - sent_price) < 1e-9:
+                print(f"   Stop {i}: {stop.shares:.3f} shares at ${stop_price} - Order ID: {order_id}")
+                continue
+
+            order_data = {"orderType": "STP", "side": "SELL", "quantity": scaled_shares,
+                          "price": stop_price, "auxPrice": stop_price, "tif": "GTC"}
+            try:
+                response = self.ib_api.modify_order(order_id, conid, order_data)
+                error = None if response.status_code == 200 else f"Status {response.status_code}, Response: {response.text}"
+                if error is None:
+                    _, error = self._confirm_order_replies(response.json())
+                if error is None:
+                    print(f"   Stop {i}: moved to {scaled_shares:.3f} shares at ${stop_price} - Order ID: {order_id}")
+                    continue
+            except Exception as e:
+                error = str(e)
+
+            # A stop cancelled along with the unfilled rest of the buy is placed again on its own
+            status_response = self.ib_api.get_order_status(order_id)
+            status = status_response.json() if status_response.status_code == 200 else {}
+            if isinstance(status, list):
+                status = status[0] if status else {}
+            if OrderState.from_order_info(order_id, status or {}, scaled_shares).is_cancelled:
+                result = self._execute_order(trade.ticker, "SELL", scaled_shares, "STP", stop_price=stop_price, tif="GTC")
+                if result['success']:
+                    print(f"   Stop {i}: placed again, {scaled_shares:.3f} shares at ${stop_price} - Order ID: {result.get('order_id')}")
+                    continue
+                error = result['error']
+            print(f"   ❌ Stop {i} ADJUSTMENT FAILED: {error}")
+            self._log_error("SELL_STOP_ADJUST_FAILED", trade.ticker, f"Stop {i} (order {order_id}): {error}")
+
     def _find_trade_by_criteria(self, ticker: str, lower_price: float, higher_price: float) -> Optional[Trade]:
         """Find trade by criteria"""
         for trade in self.trades:
@@ -1057,61 +1236,65 @@ class StockTradingServer:
         
         print(f"\n📊 Looking for trade: {ticker} (${lower_price} - ${higher_price})...")
         
-        # Find the trade
-        trade = self._find_trade_by_criteria(ticker, lower_price, higher_price)
+        with self.state_lock:
+            # Find the trade
+            trade = self._find_trade_by_criteria(ticker, lower_price, higher_price)
         
-        if trade is None:
-            error_msg = f"No trade found for {ticker} with price range ${lower_price} - ${higher_price}"
-            self._log_error("TRADE_NOT_FOUND", ticker, error_msg)
-            print(f"❌ {error_msg}")
-            return {'success': False, 'error': error_msg}
-        
-        print(f"✅ Found trade for {trade.ticker}")
+            if trade is None:
+                error_msg = f"No trade found for {ticker} with price range ${lower_price} - ${higher_price}"
+                self._log_error("TRADE_NOT_FOUND", ticker, error_msg)
+                print(f"❌ {error_msg}")
+                return {'success': False, 'error': error_msg}
         
-        # IDEMPOTENCY CHECK - Prevent duplicate execution
-        if trade.trade_id in self.executed_trade_ids:
-            error_msg = f"Trade {trade.trade_id} has already been executed (duplicate prevention)"
-            print(f"🛑 {error_msg}")
-            self._log_error("DUPLICATE_TRADE_PREVENTED", ticker, error_msg)
-            return {'success': False, 'error': error_msg}
+            print(f"✅ Found trade for {trade.ticker}")
         
-        if trade.trade_id in self.executing_trade_ids:
-            error_msg = f"Trade {trade.trade_id} is currently being executed (concurrent execution prevented)"
-            print(f"🛑 {error_msg}")
-            self._log_error("CONCURRENT_EXECUTION_PREVENTED", ticker, error_msg)
-            return {'success': False, 'error': error_msg}
+            # IDEMPOTENCY CHECK - Prevent duplicate execution
+            if trade.trade_id in self.executed_trade_ids:
+                error_msg = f"Trade {trade.trade_id} has already been executed (duplicate prevention)"
+                print(f"🛑 {error_msg}")
+                self._log_error("DUPLICATE_TRADE_PREVENTED", ticker, error_msg)
+                return {'success': False, 'error': error_msg}
         
-        # Mark trade as executing
-        self.executing_trade_ids.add(trade.trade_id)
-        print(f"🔒 Trade {trade.trade_id} locked for execution")
+            if trade.trade_id in self.executing_trade_ids:
+                error_msg = f"Trade {trade.trade_id} is currently being executed (concurrent execution prevented)"
+                print(f"🛑 {error_msg}")
+                self._log_error("CONCURRENT_EXECUTION_PREVENTED", ticker, error_msg)
+                return {'success': False, 'error': error_msg}
         
+            # Mark trade as executing
+            self.executing_trade_ids.add(trade.trade_id)
+            print(f"🔒 Trade {trade.trade_id} locked for execution")
+
         try:
-            # Validate trade
-            is_valid, error_msg = self._validate_trade(trade)
-            if not is_valid:
-                print(f"❌ {error_msg}. Removing invalid trade.")
-                self._log_error("TRADE_VALIDATION_FAILED", ticker, error_msg)
-                self.trades.remove(trade)
-                return {'success': False, 'error': error_msg}
+            with self.state_lock:
+                # Validate trade
+                is_valid, error_msg = self._validate_trade(trade)
+                if not is_valid:
+                    print(f"❌ {error_msg}. Removing invalid trade.")
+                    self._log_error("TRADE_VALIDATION_FAILED", ticker, error_msg)
+                    self.trades.remove(trade)
+                    self._publish_status()
+                    return {'success': False, 'error': error_msg}
 
-            # RISK CHECK (prevent negative available_risk)
-            if self.available_risk < trade.risk_amount - 1e-9:
-                error_msg = (f"Insufficient available risk: have ${self.available_risk:.2f}, "
-                             f"need ${trade.risk_amount:.2f} for trade {trade.ticker}")
-                print(f"❌ {error_msg}")
-                self._log_error("INSUFFICIENT_RISK", ticker, error_msg)
-                # Do NOT remove trade; allow user to either increase risk or remove trade later
-                return {'success': False, 'error': error_msg, 'available_risk': self.available_risk}
+                # RISK CHECK (prevent negative available_risk)
+                if self.available_risk < trade.risk_amount - 1e-9:
+                    error_msg = (f"Insufficient available risk: have ${self.available_risk:.2f}, "
+                                 f"need ${trade.risk_amount:.2f} for trade {trade.ticker}")
+                    print(f"❌ {error_msg}")
+                    self._log_error("INSUFFICIENT_RISK", ticker, error_msg)
+                    # Do NOT remove trade; allow user to either increase risk or remove trade later
+                    return {'success': False, 'error': error_msg, 'available_risk': self.available_risk}
             
-            # ------------------------------------------------------------
-            # EARLY RISK DEDUCTION & TRADE REMOVAL (as requested)
-            # Reserve (deduct) the full risk BEFORE any API interaction.
-            # ------------------------------------------------------------
-            self.trades.remove(trade)  # remove immediately
-            self.available_risk -= trade.risk_amount
-            if self.available_risk < 0 and self.available_risk > -1e-6:  # guard tiny negatives
-                self.available_risk = 0.0
-            print(f"✅ Trade removed & risk deducted upfront: -${trade.risk_amount:.2f}. New available risk: ${self.available_risk:.2f}")
+                # ------------------------------------------------------------
+                # EARLY RISK DEDUCTION & TRADE REMOVAL (as requested)
+                # Reserve (deduct) the full risk BEFORE any API interaction.
+                # ------------------------------------------------------------
+                self.trades.remove(trade)  # remove immediately
+                self.available_risk -= trade.risk_amount
+                if self.available_risk < 0 and self.available_risk > -1e-6:  # guard tiny negatives
+                    self.available_risk = 0.0
+                print(f"✅ Trade removed & risk deducted upfront: -${trade.risk_amount:.2f}. New available risk: ${self.available_risk:.2f}")
+                self._publish_status()
 
             # Connect to IB AFTER risk has been deducted
             if not self._connect_to_ib(ticker):
@@ -1122,16 +1305,23 @@ class StockTradingServer:
         
         finally:
             # Always remove from executing set, even on failure
-            if trade.trade_id in self.executing_trade_ids:
-                self.executing_trade_ids.remove(trade.trade_id)
-                print(f"🔓 Trade {trade.trade_id} execution lock released")
+            with self.state_lock:
+                if trade.trade_id in self.executing_trade_ids:
+                    self.executing_trade_ids.remove(trade.trade_id)
+                    print(f"🔓 Trade {trade.trade_id} execution lock released")
 
         try:
             # Update last trade time when a trade is executed
             self.last_trade_time = time.time()
 
-            # Execute buy order
-            buy_result = self._execute_buy_order(trade)
+            # Execute buy order, with its stops attached in bracket mode
+            if self.use_bracket_orders:
+                buy_result = self._execute_bracket_order(trade)
+                if not buy_result['success'] and not buy_result['submitted']:
+                    print("   ↩️ Bracket order not accepted - falling back to separate buy and stop orders")
+                    buy_result = self._execute_buy_order(trade)
+            else:
+                buy_result = self._execute_buy_order(trade)
             
             if not buy_result['success']:
                 error_msg = "Buy order failed completely"
@@ -1140,13 +1330,15 @@ class StockTradingServer:
                 return {'success': False, 'error': error_msg}
             
             # Place sell stops (need avg fill price for percent-based stops)
-            self._execute_sell_stop_orders(trade, buy_result['filled_shares'], buy_result['avg_price'])
+            if not buy_result.get('stops_placed'):
+                self._execute_sell_stop_orders(trade, buy_result['filled_shares'], buy_result['avg_price'])
             # Risk already fully deducted upfront; report full risk_amount as used regardless of fill.
             risk_used = trade.risk_amount
             print(f"💰 Risk recorded (already deducted earlier): ${risk_used:.2f}")
             
             # Mark trade as successfully executed (idempotency protection)
-            self.executed_trade_ids.add(trade.trade_id)
+            with self.state_lock:
+                self.executed_trade_ids.add(trade.trade_id)
             print(f"✅ Trade {trade.trade_id} marked as executed (duplicate prevention active)")
             
             result = {
@@ -1198,14 +1390,19 @@ class StockTradingServer:
             if not is_valid:
                 return {'success': False, 'error': error_msg}
 
-            # RISK CHECK when adding: ensure we don't enqueue trades that exceed available risk
-            if self.available_risk < trade.risk_amount - 1e-9:
-                msg = (f"Cannot add trade {trade.ticker}: required risk ${trade.risk_amount:.2f} "
-                       f"exceeds available risk ${self.available_risk:.2f}. Update your risk in the Status tab and try again")
-                print(f"❌ {msg}")
-                return {'success': False, 'error': msg, 'available_risk': self.available_risk}
-            
-            self.trades.append(trade)
+            with self.state_lock:
+                # RISK CHECK when adding: ensure we don't enqueue trades that exceed available risk
+                if self.available_risk < trade.risk_amount - 1e-9:
+                    msg = (f"Cannot add trade {trade.ticker}: required risk ${trade.risk_amount:.2f} "
+                           f"exceeds available risk ${self.available_risk:.2f}. Update your risk in the Status tab and try again")
+                    print(f"❌ {msg}")
+                    return {'success': False, 'error': msg, 'available_risk': self.available_risk}
+
+                self.trades.append(trade)
+                self._publish_status()
+
+            # Look the contract up now, so executing the trade needs no search
+            self.prewarm_contracts([trade.ticker])
             
             return {
                 'success': True,
@@ -1217,66 +1414,90 @@ class StockTradingServer:
             self._log_error("ADD_TRADE", trade_data.get('ticker', 'unknown'), str(e), trade_data)
             return {'success': False, 'error': str(e)}
     
-    def _get_status_internal(self) -> dict:
-        """Internal method to get server status"""
-        trades_data = []
-        for trade in self.trades:
-            trade_dict = asdict(trade)
-            trades_data.append(trade_dict)
-        
-        # Calculate server uptime
-        uptime_seconds = time.time() - self.server_start_time
-        uptime_hours = int(uptime_seconds // 3600)
-        uptime_minutes = int((uptime_seconds % 3600) // 60)
-        uptime_str = f"{uptime_hours}h {uptime_minutes}m"
-        
+    def _publish_status(self):
+        """Rebuild the status snapshot that get_status returns (call with state_lock held)"""
         # Format last trade time
         last_trade_formatted = None
         if self.last_trade_time:
             last_trade_formatted = datetime.fromtimestamp(self.last_trade_time).strftime("%Y-%m-%d %H:%M:%S")
         
-        return {
+        self._status_snapshot = {
             'success': True,
             'available_risk': self.available_risk,
             'active_trades': len(self.trades),  # Changed from 'trades_count'
-            'server_uptime': uptime_str,        # Added server uptime
             'last_trade_time': last_trade_formatted,  # Added last trade time
-            'trades': trades_data,
-            'is_processing': self.is_processing,
+            'trades': [asdict(trade) for trade in self.trades],
+            'is_processing': bool(self.busy_lanes),
+            'processing_tickers': sorted(self.busy_lanes),
             'error_count': len(self.error_log)
         }
 
-    
-    # Public API methods (these queue requests)
+        # Public API methods (these queue requests)
     def execute_trade(self, ticker: str, lower_price: float, higher_price: float) -> dict:
         """Execute a specific trade"""
         return self._queue_request('execute_trade', {
             'ticker': ticker,
             'lower_price': lower_price,
             'higher_price': higher_price
-        })
+        }, lane_key=self._lane_key(ticker))
     
     def add_trade(self, trade_data: dict) -> dict:
         """Add a new trade"""
-        return self._queue_request('add_trade', trade_data)
+        return self._queue_request('add_trade', trade_data, lane_key=self._lane_key(trade_data.get('ticker')))
     
     def get_status(self) -> dict:
-        """Get server status"""
-        return self._queue_request('get_status')
+        """Get server status (from the snapshot, not queued behind any lane)"""
+        status = dict(self._status_snapshot)
+        
+        # Calculate server uptime
+        uptime_seconds = time.time() - self.server_start_time
+        uptime_hours = int(uptime_seconds // 3600)
+        uptime_minutes = int((uptime_seconds % 3600) // 60)
+        status['server_uptime'] = f"{uptime_hours}h {uptime_minutes}m"  # Added server uptime
+        return status
     
+    def prewarm_contracts(self, symbols: List[str]) -> dict:
+        """Look up the contract IDs missing from the cache in the background"""
+        symbols = sorted({s.upper().strip() for s in symbols if s and s.strip()})
+        missing = [s for s in symbols if IBWebAPI.contract_cache.get(s) is None]
+        if missing:
+            worker = threading.Thread(target=self._prewarm_worker, args=(missing,), name="contract-prewarm")
+            worker.daemon = True
+            worker.start()
+        return {
+            'success': True,
+            'cached': [s for s in symbols if s not in missing],
+            'looking_up': missing
+        }
+
+    def _prewarm_worker(self, symbols: List[str]):
+        ib_api = IBWebAPI()
+        for symbol in symbols:
+            conid = ib_api.get_contract_id(symbol)
+            if conid:
+                ib_api.get_price_increment(symbol, conid)
+                print(f"🔥 Contract ID for {symbol} cached: {conid}")
+            else:
+                print(f"⚠️ Could not look up the contract ID for {symbol} ahead of time")
+
     def get_errors(self) -> List[Dict]:
         """Get error log (direct access, no queuing needed)"""
-        return self.error_log.copy()
+        with self.state_lock:
+            return self.error_log.copy()
     
     def update_risk_amount(self, new_amount: float) -> dict:
         """Update available risk amount (direct access)"""
-        self.available_risk = new_amount
-        return {'success': True, 'available_risk': self.available_risk}
+        with self.state_lock:
+            self.available_risk = new_amount
+            self._publish_status()
+            return {'success': True, 'available_risk': self.available_risk}
     
     def shutdown(self):
         """Shutdown the server"""
         self.server_running = False
-        self.request_queue.put(None)  # Signal shutdown
+        with self.lanes_lock:
+            for lane in self.lanes.values():
+                lane.put(None)  # Signal shutdown
 
 # Flask app
 app = Flask(__name__)
@@ -1405,6 +1626,17 @@ def update_risk():
     except ValueError:
         return jsonify({'success': False, 'error': 'Invalid amount value'}), 400
 
+@app.route('/prewarm_contracts', methods=['POST'])
+def prewarm_contracts():
+    """Look up and cache the contract IDs of symbols ahead of any trade"""
+    data = request.json
+    
+    if not data or not isinstance(data.get('symbols'), list):
+        return jsonify({'success': False, 'error': 'Missing required field: symbols (a list)'}), 400
+    
+    result = trading_server.prewarm_contracts(data['symbols'])
+    return jsonify(result), 200
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
@@ -1416,7 +1648,7 @@ def health_check():
 
 if __name__ == '__main__':
     print("🚀 Starting Stock Trading Server...")
-    print("📡 Server will process requests sequentially")
+    print("📡 Server will process requests on one lane per ticker")
     print("🔗 IBKR connections are managed automatically")
     print("\nAPI Endpoints:")
     print("  POST /execute_trade - Execute a specific trade")
@@ -1426,6 +1658,7 @@ if __name__ == '__main__':
     print("  GET /errors - Get error log")
     print("  GET /ib_status - Check IBKR Web API connectivity")
     print("  POST /update_risk - Update available risk amount")
+    print("  POST /prewarm_contracts - Cache contract IDs ahead of trades")
     print("  GET /health - Health check")
 
     
@@ -0,0 +1,120 @@
+import threading
+import time
+import unittest
+
+import order_fill_tracker
+from order_fill_tracker import OrderFillTracker
+
+# Tests for OrderFillTracker.wait_for_fill against a scripted stand-in for
+# IBWebAPI (no gateway needed). Run from this directory:
+#   python -m unittest test_order_fill_tracker
+
+
+class FakeResponse:
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self._body = body
+
+    def json(self):
+        return self._body
+
+
+class FakeIBWebAPI:
+    """Answers the order status endpoint from a list of statuses, the last one repeating"""
+
+    base_url = "http://gateway.invalid/v1/api"
+
+    def __init__(self, statuses, orders=None):
+        self.statuses = list(statuses)
+        self.orders = orders or []
+        self.status_calls = 0
+        self.list_calls = 0
+        self.session = self
+
+    def get_single_order_status(self, order_id):
+        self.status_calls += 1
+        status = self.statuses.pop(0) if len(self.statuses) > 1 else self.statuses[0]
+        if status is None:
+            return FakeResponse(400, {"error": "not found"})
+        filled = 10 if status == "Filled" else 0
+        return FakeResponse(200, {"order_id": int(order_id), "order_status": status, "cum_fill": str(filled),
+                                  "total_size": "10", "average_price": "10.5" if filled else ""})
+
+    def get_order_status(self, order_id=None):
+        self.list_calls += 1
+        return FakeResponse(200, {"orders": self.orders})
+
+    def get(self, url, timeout=None):
+        # /iserver/account/trades
+        return FakeResponse(200, [])
+
+
+class WaitForFillTests(unittest.TestCase):
+
+    def test_fill_found_by_polling(self):
+        tracker = OrderFillTracker()
+        ib_api = FakeIBWebAPI(["PreSubmitted", "Submitted", "Filled"])
+
+        result = tracker.wait_for_fill(ib_api, "101", 10, timeout=5)
+
+        self.assertEqual(result['status'], "FILLED")
+        self.assertEqual(result['filled_shares'], 10)
+        self.assertEqual(result['avg_price'], 10.5)
+        self.assertEqual(ib_api.status_calls, 3)
+        self.assertEqual(ib_api.list_calls, 0)
+
+    def test_fill_pushed_by_feed(self):
+        tracker = OrderFillTracker()
+        ib_api = FakeIBWebAPI(["Submitted"])
+        push = threading.Timer(0.3, tracker.update, [{
+            'orderId': 102, 'status': 'Filled', 'filledQuantity': 10, 'remainingQuantity': 0, 'avgPrice': 10.25
+        }])
+
+        started = time.time()
+        push.start()
+        result = tracker.wait_for_fill(ib_api, "102", 10, timeout=5)
+
+        self.assertEqual(result['status'], "FILLED")
+        self.assertEqual(result['avg_price'], 10.25)
+        # Woken by the update, well before polling alone would have seen anything
+        self.assertLess(time.time() - started, 1.0)
+
+    def test_order_list_fallback_when_status_unavailable(self):
+        tracker = OrderFillTracker()
+        ib_api = FakeIBWebAPI([None], orders=[
+            {'orderId': 103, 'status': 'Filled', 'filledQuantity': 10, 'remainingQuantity': 0, 'avgPrice': 10.5}
+        ])
+
+        result = tracker.wait_for_fill(ib_api, "103", 10, timeout=5)
+
+        self.assertEqual(result['status'], "FILLED")
+        self.assertEqual(ib_api.list_calls, 1)
+
+    def test_timeout(self):
+        tracker = OrderFillTracker()
+        ib_api = FakeIBWebAPI(["Submitted"])
+
+        self.assertIsNone(tracker.wait_for_fill(ib_api, "104", 10, timeout=0.5))
+
+    def test_order_states_are_dropped(self):
+        tracker = OrderFillTracker()
+        ib_api = FakeIBWebAPI(["Filled"])
+        tracker.update({'orderId': 105, 'status': 'Submitted'})
+
+        tracker.wait_for_fill(ib_api, "105", 10, timeout=5)
+        self.assertNotIn("105", tracker._orders)
+
+        # Updates nobody waits on expire
+        ttl = order_fill_tracker.ORDER_STATE_TTL
+        order_fill_tracker.ORDER_STATE_TTL = 0.1
+        try:
+            tracker.update({'orderId': 106, 'status': 'Submitted'})
+            time.sleep(0.2)
+            tracker.update({'orderId': 107, 'status': 'Submitted'})
+        finally:
+            order_fill_tracker.ORDER_STATE_TTL = ttl
+        self.assertEqual(set(tracker._orders), {"107"})
+
+
+if __name__ == '__main__':
+    unittest.main()
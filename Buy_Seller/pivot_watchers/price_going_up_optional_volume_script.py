@@ -129,6 +129,11 @@ class StockTradingBot:
         - Require a data point at/before cutoff and at least one after cutoff; otherwise return None.
         - Detect suspicious 0 baselines far from session start (indicates truncated history) and abort.
         - Guard against intraday volume resets (negative deltas) by returning None.
+
+        Record volumes are the consolidated day volume with the data server's default
+        quote source (as with Ticker.info before). Its yahoo_batch source sums 1-minute
+        bars instead, which runs somewhat below it; volume requirements are sized for
+        the consolidated figure.
         """
         logger.info(f"   Calculating volume increase for timeframe: {minutes} minutes")
 
@@ -0,0 +1,218 @@
+import logging
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+
+import pandas as pd
+import requests
+import yfinance as yf
+
+# Where the ticker data fetcher gets its quotes from.
+#
+# A quote source turns a list of symbols into {symbol: quote}, a quote being
+# {'currentPrice', 'dayHigh', 'dayLow', 'volume'} (the fields of a stored
+# record). The fetcher asks for every watched symbol together once per cycle
+# and spaces the cycles by requests_per_fetch(), so its Yahoo request rate
+# stays within StockDataServer.max_requests_per_minute.
+#
+# - YahooQuoteSource (the default): Yahoo's quote endpoint, up to
+#   chunk_size symbols per request, so a cycle is one request for any usual
+#   watch list and refreshes every symbol each request_interval. Its volume
+#   is regularMarketVolume, the consolidated day volume Ticker.info reports.
+# - YahooBatchQuoteSource: one yf.download call for all symbols. yfinance
+#   still sends one chart request per symbol (in parallel threads), for
+#   today's 1-minute bars. The volume is the sum of those bars, which runs
+#   somewhat below the consolidated day volume.
+# - YahooInfoQuoteSource: the former per-symbol Ticker.info requests (with a
+#   1-day history fallback), one symbol after another.
+#
+# Another source (e.g. IBKR market data snapshots for a list of conids) only
+# needs fetch() and, if it batches symbols, requests_per_fetch().
+
+logger = logging.getLogger(__name__)
+
+
+class QuoteSource(ABC):
+    """Fetches current quotes for many symbols at once"""
+
+    name = "base"
+
+    @abstractmethod
+    def fetch(self, symbols: List[str]) -> Dict[str, dict]:
+        """Quotes by symbol; symbols without data are left out"""
+
+    def requests_per_fetch(self, symbols: List[str]) -> int:
+        """How many requests fetch(symbols) sends to the data provider"""
+        return len(symbols)
+
+
+class YahooQuoteSource(QuoteSource):
+    """Quotes for up to chunk_size symbols per request from Yahoo's quote endpoint"""
+
+    name = "yahoo_quote"
+    QUOTE_URL = "https://query1.finance.yahoo.com/v7/finance/quote"
+    CRUMB_URL = "https://query1.finance.yahoo.com/v1/test/getcrumb"
+    # Any response from here sets the cookie the crumb belongs to
+    COOKIE_URL = "https://fc.yahoo.com"
+    FIELDS = "regularMarketPrice,regularMarketDayHigh,regularMarketDayLow,regularMarketVolume"
+
+    def __init__(self, chunk_size: int = 200, timeout: float = 10) -> None:
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+        self.session = requests.Session()
+        # Yahoo turns away the default python-requests agent
+        self.session.headers['User-Agent'] = "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"
+        self._crumb = None
+
+    def requests_per_fetch(self, symbols: List[str]) -> int:
+        return -(-len(symbols) // self.chunk_size)
+
+    def _refresh_crumb(self) -> None:
+        self.session.get(self.COOKIE_URL, timeout=self.timeout)
+        response = self.session.get(self.CRUMB_URL, timeout=self.timeout)
+        response.raise_for_status()
+        self._crumb = response.text.strip()
+
+    def fetch(self, symbols: List[str]) -> Dict[str, dict]:
+        quotes = {}
+        for start in range(0, len(symbols), self.chunk_size):
+            chunk = symbols[start:start + self.chunk_size]
+            try:
+                quotes.update(self._fetch_chunk(chunk))
+            except (requests.RequestException, ValueError) as e:
+                logger.warning(f"Could not get quotes for {len(chunk)} symbols: {e}")
+        return quotes
+
+    def _fetch_chunk(self, symbols: List[str]) -> Dict[str, dict]:
+        if self._crumb is None:
+            self._refresh_crumb()
+        params = {'symbols': ",".join(symbols), 'fields': self.FIELDS, 'crumb': self._crumb}
+        response = self.session.get(self.QUOTE_URL, params=params, timeout=self.timeout)
+        if response.status_code in (401, 403):
+            # The crumb expired with its cookie: get a new pair and try once more
+            self._refresh_crumb()
+            params['crumb'] = self._crumb
+            response = self.session.get(self.QUOTE_URL, params=params, timeout=self.timeout)
+        response.raise_for_status()
+
+        wanted = set(symbols)
+        quotes = {}
+        for item in (response.json().get('quoteResponse') or {}).get('result') or []:
+            symbol, price = item.get('symbol'), item.get('regularMarketPrice')
+            if symbol not in wanted or price is None:
+                continue
+            day_high = item.get('regularMarketDayHigh')
+            day_low = item.get('regularMarketDayLow')
+            volume = item.get('regularMarketVolume')
+            quotes[symbol] = {
+                'currentPrice': float(price),
+                'dayHigh': float(day_high) if day_high is not None else float(price),
+                'dayLow': float(day_low) if day_low is not None else float(price),
+                'volume': int(volume) if volume is not None else 0
+            }
+        return quotes
+
+
+def _quote_from_bars(bars: pd.DataFrame) -> Optional[dict]:
+    """Quote from a symbol's intraday bars (Close, High, Low, Volume), None without any bar"""
+    bars = bars.dropna(subset=['Close'])
+    if bars.empty:
+        return None
+    return {
+        'currentPrice': float(bars['Close'].iloc[-1]),
+        'dayHigh': float(bars['High'].max()),
+        'dayLow': float(bars['Low'].min()),
+        # Volume so far today from the bars; below Ticker.info's consolidated volume
+        'volume': int(bars['Volume'].fillna(0).sum())
+    }
+
+
+class YahooBatchQuoteSource(QuoteSource):
+    """All symbols' intraday bars from one yf.download call (one chart request per symbol)"""
+
+    name = "yahoo_batch"
+
+    def __init__(self, interval: str = "1m", chunk_size: int = 100) -> None:
+        self.interval = interval
+        # Very long watch lists are downloaded in a few calls rather than one huge one
+        self.chunk_size = chunk_size
+
+    def fetch(self, symbols: List[str]) -> Dict[str, dict]:
+        quotes = {}
+        for start in range(0, len(symbols), self.chunk_size):
+            quotes.update(self._fetch_chunk(symbols[start:start + self.chunk_size]))
+        return quotes
+
+    def _fetch_chunk(self, symbols: List[str]) -> Dict[str, dict]:
+        if not symbols:
+            return {}
+        data = yf.download(
+            tickers=symbols,
+            period="1d",
+            interval=self.interval,
+            group_by='ticker',
+            threads=True,
+            progress=False,
+            auto_adjust=False,
+            prepost=False
+        )
+        if data is None or data.empty:
+            return {}
+
+        quotes = {}
+        for symbol in symbols:
+            try:
+                if isinstance(data.columns, pd.MultiIndex):
+                    if symbol not in data.columns.get_level_values(0):
+                        continue
+                    bars = data[symbol]
+                elif len(symbols) == 1:
+                    bars = data
+                else:
+                    continue
+                quote = _quote_from_bars(bars)
+            except (KeyError, ValueError) as e:
+                logger.warning(f"Could not read bars for {symbol}: {e}")
+                continue
+            if quote is not None:
+                quotes[symbol] = quote
+        return quotes
+
+
+class YahooInfoQuoteSource(QuoteSource):
+    """One Ticker.info request per symbol (falling back to today's history)"""
+
+    name = "yahoo_info"
+
+    def fetch(self, symbols: List[str]) -> Dict[str, dict]:
+        quotes = {}
+        for symbol in symbols:
+            quote = self._fetch_one(symbol)
+            if quote is not None:
+                quotes[symbol] = quote
+        return quotes
+
+    def _fetch_one(self, symbol: str) -> Optional[dict]:
+        ticker = yf.Ticker(symbol)
+        try:
+            info = ticker.info
+            current_price = info.get('currentPrice') or info.get('regularMarketPrice')
+            if current_price is not None:
+                day_high = info.get('dayHigh') or info.get('regularMarketDayHigh')
+                day_low = info.get('dayLow') or info.get('regularMarketDayLow')
+                volume = info.get('volume') or info.get('regularMarketVolume')
+                return {
+                    'currentPrice': float(current_price),
+                    'dayHigh': float(day_high) if day_high is not None else float(current_price),
+                    'dayLow': float(day_low) if day_low is not None else float(current_price),
+                    'volume': int(volume) if volume is not None else 0
+                }
+        except Exception as e:
+            logger.warning(f"Could not get info for {symbol}: {e}")
+
+        # If info didn't work, try history
+        try:
+            return _quote_from_bars(ticker.history(period="1d", interval="1m"))
+        except Exception as e:
+            logger.warning(f"Could not get history for {symbol}: {e}")
+        return None
+
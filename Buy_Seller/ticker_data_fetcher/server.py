@@ -1,4 +1,3 @@
-import yfinance as yf
 import time
 import threading
 from collections import deque
@@ -10,19 +9,24 @@ import flask_cors
 import pytz
 import requests  # For calling the stock buyer server
 
+from quote_sources import QuoteSource, YahooQuoteSource
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class StockDataServer:
-    def __init__(self):
+    def __init__(self, quote_source: QuoteSource = None):
         self.tickers = []
         self.ticker_data = {}  # {ticker: deque of records}
         self.ticker_initial_prices = {}  # Store initial prices for each ticker
-        self.current_ticker_index = 0
         self.max_records = 10000
+        # Every cycle fetches all tickers together (see quote_sources.py)
+        self.quote_source = quote_source or YahooQuoteSource()
         self.max_requests_per_minute = 120
-        self.request_interval = 60 / self.max_requests_per_minute  # 0.5 seconds between requests
+        self.request_interval = 60 / self.max_requests_per_minute  # 0.5 seconds per request
+        self.cycle_interval = self.request_interval  # Time between cycle starts, set by fetch_all_tickers
+        self.last_cycle_seconds = None  # How long the last fetch took
         self.running = False
         self.data_thread = None
         self.market_check_interval = 30  # Check market status every 30 seconds when closed
@@ -32,6 +36,8 @@ class StockDataServer:
         # ---- Trade activity integration (for pruning inactive tickers) ----
         # Base URL of the stock buyer server status endpoint
         self.trade_server_status_url = "http://localhost:5002/status"
+        # Stock buyer endpoint that caches IBKR contract IDs ahead of any breakout
+        self.trade_server_prewarm_url = "http://localhost:5002/prewarm_contracts"
         # How often (seconds) to poll the trade server for active trades
         self.trade_activity_check_interval = 300  # 5 minutes
         # Consider a ticker inactive if no active trade for this many hours
@@ -215,8 +221,18 @@ class StockDataServer:
             if absence_key in self.ticker_last_trade_seen:
                 del self.ticker_last_trade_seen[absence_key]
             logger.info(f"Added ticker: {symbol}")
+            self.request_contract_prewarm(symbol)
             return True
         return False
+
+    def request_contract_prewarm(self, symbol):
+        """Ask the stock buyer server to look up the symbol's contract now, in the background"""
+        def send():
+            try:
+                requests.post(self.trade_server_prewarm_url, json={'symbols': [symbol]}, timeout=5)
+            except Exception as e:
+                logger.debug(f"Contract prewarm request for {symbol} failed: {e}")
+        threading.Thread(target=send, daemon=True).start()
     
     def remove_ticker(self, symbol):
         """Remove a ticker from the monitoring list"""
@@ -230,68 +246,46 @@ class StockDataServer:
             return True
         return False
     
-    def fetch_ticker_data(self, symbol):
-        """Fetch data for a single ticker"""
-        try:
-            ticker = yf.Ticker(symbol)
-            
-            # Use multiple methods to get current price
-            current_price = None
-            volume = None
-            day_high = None
-            day_low = None
-            
-            # Try getting from info first
-            try:
-                info = ticker.info
-                current_price = info.get('currentPrice') or info.get('regularMarketPrice')
-                volume = info.get('volume') or info.get('regularMarketVolume')
-                day_high = info.get('dayHigh') or info.get('regularMarketDayHigh')
-                day_low = info.get('dayLow') or info.get('regularMarketDayLow')
-            except Exception as e:
-                logger.warning(f"Could not get info for {symbol}: {e}")
-            
-            # If info didn't work, try history
-            if current_price is None:
-                try:
-                    hist = ticker.history(period="1d", interval="1m")
-                    if not hist.empty:
-                        latest = hist.iloc[-1]
-                        current_price = latest['Close']
-                        volume = latest['Volume']
-                        day_high = hist['High'].max()
-                        day_low = hist['Low'].min()
-                except Exception as e:
-                    logger.warning(f"Could not get history for {symbol}: {e}")
-            
-            if current_price is None:
-                logger.warning(f"No price data available for {symbol}")
-                return
-            
-            record = {
-                'symbol': symbol,
-                'timestamp': datetime.now().isoformat(),
-                'currentPrice': float(current_price),
-                'dayHigh': float(day_high) if day_high is not None else float(current_price),
-                'dayLow': float(day_low) if day_low is not None else float(current_price),
-                'volume': int(volume) if volume is not None else 0
-            }
-            
-            # Check for duplicates before adding (skip if same price and volume)
-            if not self.ticker_data[symbol] or (
-                abs(self.ticker_data[symbol][-1]['currentPrice'] - record['currentPrice']) > 0.001 or 
-                self.ticker_data[symbol][-1]['volume'] != record['volume']
-            ):
-                self.ticker_data[symbol].append(record)
-                logger.info(f"Fetched data for {symbol}: ${record['currentPrice']:.4f} | volume {record['volume']} | time {record['timestamp'][:19]}")
+    def record_quote(self, symbol, quote):
+        """Store a quote as the ticker's newest record"""
+        records = self.ticker_data.get(symbol)
+        if records is None:
+            return  # Removed while its quote was being fetched
+        record = {
+            'symbol': symbol,
+            'timestamp': datetime.now().isoformat(),
+            **quote
+        }
+        
+        # Check for duplicates before adding (skip if same price and volume)
+        if not records or (
+            abs(records[-1]['currentPrice'] - record['currentPrice']) > 0.001 or 
+            records[-1]['volume'] != record['volume']
+        ):
+            records.append(record)
+            logger.info(f"Fetched data for {symbol}: ${record['currentPrice']:.4f} | volume {record['volume']} | time {record['timestamp'][:19]}")
+        else:
+            logger.debug(f"Skipped duplicate data for {symbol}")
+
+    def fetch_all_tickers(self):
+        """Fetch quotes for every watched ticker with one quote source call"""
+        symbols = list(self.tickers)
+        if not symbols:
+            return
+        # Each request of the cycle gets its request_interval, so cycles stay within max_requests_per_minute
+        self.cycle_interval = max(1, self.quote_source.requests_per_fetch(symbols)) * self.request_interval
+        started = time.time()
+        quotes = self.quote_source.fetch(symbols)
+        self.last_cycle_seconds = time.time() - started
+        
+        for symbol in symbols:
+            if symbol in quotes:
+                self.record_quote(symbol, quotes[symbol])
             else:
-                logger.debug(f"Skipped duplicate data for {symbol}")
-                
-        except Exception as e:
-            logger.error(f"Error fetching data for {symbol}: {str(e)}")
+                logger.warning(f"No price data available for {symbol}")
     
     def data_collection_loop(self):
-        """Main loop for collecting data in round-robin fashion"""
+        """Main loop for collecting data, all tickers per cycle"""
         consecutive_errors = 0
         max_consecutive_errors = 5
         
@@ -328,16 +322,15 @@ class StockDataServer:
                     time.sleep(15)
                     logger.info("15-second delay complete. Adding initial records with volume 0 for all tickers.")
                     
-                    # Add initial records for ALL tickers at once
-                    for symbol in self.tickers:
-                        try:
-                            ticker = yf.Ticker(symbol)
-                            info = ticker.info
-                            current_price = info.get('currentPrice') or info.get('regularMarketPrice')
-                            if current_price:
-                                self.add_initial_market_open_record(symbol, current_price)
-                        except Exception as e:
-                            logger.error(f"Error adding initial record for {symbol}: {e}")
+                    # Add initial records for ALL tickers at once, from one quote source call
+                    try:
+                        quotes = self.quote_source.fetch(list(self.tickers))
+                    except Exception as e:
+                        logger.error(f"Error fetching quotes for initial records: {e}")
+                        quotes = {}
+                    for symbol, quote in quotes.items():
+                        if symbol in self.ticker_data and quote.get('currentPrice'):
+                            self.add_initial_market_open_record(symbol, quote['currentPrice'])
                 
                 self.last_market_status = market_open
                 
@@ -351,21 +344,15 @@ class StockDataServer:
                     time.sleep(5)
                     continue
                 
-                # Get next ticker in round-robin fashion
-                if self.current_ticker_index >= len(self.tickers):
-                    self.current_ticker_index = 0
-                
-                current_ticker = self.tickers[self.current_ticker_index]
-                self.fetch_ticker_data(current_ticker)
-                
-                # Move to next ticker
-                self.current_ticker_index += 1
+                # Refresh every ticker with one quote source call
+                cycle_started = time.time()
+                self.fetch_all_tickers()
                 
                 # Reset error counter on success
                 consecutive_errors = 0
                 
-                # Wait for the interval
-                time.sleep(self.request_interval)
+                # Wait out the rest of the cycle's request budget
+                time.sleep(max(self.request_interval, self.cycle_interval - (time.time() - cycle_started)))
                 
             except Exception as e:
                 consecutive_errors += 1
@@ -502,9 +489,6 @@ class StockDataServer:
                     removed.append(symbol)
 
         if removed:
-            # Reset current_ticker_index if it surpasses length after removals
-            if self.current_ticker_index >= len(self.tickers):
-                self.current_ticker_index = 0
             logger.info(f"Removed inactive tickers (no active trade in > {self.inactive_ticker_hours}h): {', '.join(sorted(removed))}")
 
 # Initialize the server
@@ -602,7 +586,9 @@ def get_status():
             'current_time': market_status['current_time'],
             'market_hours': market_status['market_hours'],
             'tickers_count': len(stock_server.tickers),
-            'current_ticker_index': stock_server.current_ticker_index,
+            'quote_source': stock_server.quote_source.name,
+            'last_cycle_seconds': stock_server.last_cycle_seconds,
+            'cycle_interval_seconds': stock_server.cycle_interval,
             'max_records_per_ticker': stock_server.max_records,
             'request_interval_seconds': stock_server.request_interval,
             'last_cleanup_date': str(stock_server.last_cleanup_date) if stock_server.last_cleanup_date else None
@@ -0,0 +1,125 @@
+import logging
+import threading
+import time
+
+import requests
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from requests.adapters import HTTPAdapter
+
+# Streaming proxy to the Flask stock filtering microservice.
+#
+# All views share one requests.Session, so calls reuse pooled keep-alive
+# connections instead of opening a new one per request. The upstream body is
+# relayed in chunks as received, without decoding and re-encoding the JSON,
+# and the status, content type and caching headers are passed through
+# unchanged. Conditional request headers go upstream, so a 304 from Flask
+# reaches the browser. The time until the upstream headers arrived is logged
+# and sent back in a Server-Timing header.
+
+logger = logging.getLogger(__name__)
+
+MICROSERVICE_SETTINGS = settings.MICROSERVICE_SETTINGS
+FLASK_SERVICE_URL = MICROSERVICE_SETTINGS['FLASK_SERVICE_URL'].rstrip('/')
+# (connect, read) timeouts in seconds
+CONNECT_TIMEOUT = 3.05
+READ_TIMEOUT = MICROSERVICE_SETTINGS.get('TIMEOUT', 30)
+VERIFY_SSL = MICROSERVICE_SETTINGS.get('VERIFY_SSL', True)
+POOL_SIZE = 16
+# Chunk size when relaying response bodies from the microservice
+STREAM_CHUNK_SIZE = 64 * 1024
+# Upstream calls slower than this are logged as warnings
+SLOW_REQUEST_SECONDS = 2.0
+
+# Request headers passed on to the microservice, and response headers passed back to the client
+FORWARDED_REQUEST_HEADERS = ('If-None-Match', 'If-Modified-Since', 'Accept', 'Content-Type')
+PASSTHROUGH_HEADERS = ('ETag', 'Cache-Control', 'Last-Modified', 'X-Accel-Buffering')
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """The shared session, created on first use"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _session = session
+        return _session
+
+
+def _request_headers(request):
+    return {header: request.headers[header] for header in FORWARDED_REQUEST_HEADERS if request.headers.get(header)}
+
+
+def stream_response(response, upstream_ms: float):
+    """Relay a streamed microservice response as is, without parsing the body"""
+    if response.status_code == 304:
+        response.close()
+        proxied = HttpResponse(status=304)
+    else:
+        content_type = response.headers.get('Content-Type', 'application/json')
+        # Event streams are relayed as each event arrives instead of in full chunks
+        chunk_size = None if content_type.startswith('text/event-stream') else STREAM_CHUNK_SIZE
+
+        def relay():
+            try:
+                yield from response.iter_content(chunk_size=chunk_size)
+            finally:
+                response.close()
+
+        proxied = StreamingHttpResponse(
+            relay(),
+            status=response.status_code,
+            content_type=content_type
+        )
+    for header in PASSTHROUGH_HEADERS:
+        if header in response.headers:
+            proxied[header] = response.headers[header]
+    proxied['Server-Timing'] = f'upstream;dur={upstream_ms:.1f}'
+    return proxied
+
+
+def forward(request, method: str, path: str, body: bytes = None):
+    """
+    Forward a request to the microservice path with the client's query
+    parameters, conditional headers and body (the raw request body by default).
+    """
+    url = f"{FLASK_SERVICE_URL}/{path}"
+    data = request.body if body is None and method != 'GET' else body
+    headers = _request_headers(request)
+    if data:
+        # The microservice reads request bodies as JSON
+        headers.setdefault('Content-Type', 'application/json')
+    start = time.perf_counter()
+    try:
+        response = get_session().request(
+            method,
+            url,
+            params=request.GET,
+            data=data,
+            headers=headers,
+            stream=True,
+            timeout=(CONNECT_TIMEOUT, READ_TIMEOUT),
+            verify=VERIFY_SSL,
+        )
+    except requests.Timeout as e:
+        logger.warning("%s %s timed out after %.0f ms", method, url, (time.perf_counter() - start) * 1000)
+        return JsonResponse({
+            "status": "error",
+            "error": f"Microservice timed out: {str(e)}"
+        }, status=504)
+    except requests.RequestException as e:
+        return JsonResponse({
+            "status": "error",
+            "error": f"Could not connect to microservice: {str(e)}"
+        }, status=500)
+
+    upstream_ms = (time.perf_counter() - start) * 1000
+    level = logging.WARNING if upstream_ms >= SLOW_REQUEST_SECONDS * 1000 else logging.DEBUG
+    logger.log(level, "%s %s -> %s in %.1f ms", method, url, response.status_code, upstream_ms)
+    return stream_response(response, upstream_ms)
@@ -1,5 +1,5 @@
 import time
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 import subprocess
 import shlex
 import sys
@@ -11,9 +11,22 @@ import psutil
 from datetime import datetime
 from typing import List, Optional
 from stocks_filtering_application.pipeline_status import PipelineStatus
+from stocks_filtering_application.pipeline_events import EventLogWatcher, ProgressBus, sse_events
+from stocks_filtering_application.price_store import price_data_timestamp as get_price_data_timestamp
+from stocks_filtering_application.price_store import CSV_FILE as PRICE_CSV_PATH, META_FILE, STORE_DIR
+from risk_management_sims.risk_batch import RiskPlan, run_batch
+from response_cache import FileResponseCache
 
 app = Flask(__name__)
 
+# Rankings and stock counts, re-read only when their files change
+response_cache = FileResponseCache()
+PRICE_META_PATH = os.path.join(STORE_DIR, META_FILE)
+
+# Pipeline progress events, tailed from the pipeline's event log once and pushed to every /pipeline/events client
+progress_bus = ProgressBus()
+pipeline_event_watcher = EventLogWatcher(progress_bus, PipelineStatus.events_path)
+
 
 def run_stock_screening(
         min_price_increase: float,
@@ -154,65 +167,82 @@ def get_rankings(filename):
     Args:
         filename (str): Name of the ranking file (without .csv extension)
 
+    Query parameters (all optional, without them the whole file is returned):
+        offset (int): Number of rows to skip (default 0)
+        limit (int): Maximum number of rows to return
+        columns (str): Comma-separated columns to return, e.g. "Symbol,Score"
+        sort (str): Column to sort by before paging (default: the file's own order)
+        order (str): "asc" (default) or "desc"
+        symbol (str): Comma-separated symbols to keep (case-insensitive)
+
     Returns:
-        JSON object containing the CSV data, creation date, total stocks count, and status or error message
+        JSON object containing the CSV data, creation date, total stocks count, and status or error message,
+        plus the paging fields offset, limit, matched_stocks (rows left after the symbol filter) and
+        next_offset (null on the last page).
+        The response carries an ETag; a request with a matching If-None-Match gets an empty 304.
     """
 
     file_path = os.path.join('./stocks_filtering_application', filename)
-    stock_data_path = os.path.join('./stocks_filtering_application', 'price_data',
-                                   'all_tickers_historical.csv')
+
+    # Check if ranking file exists
+    if not os.path.exists(file_path):
+        return jsonify({
+            "status": "error",
+            "message": f"Ranking file {file_path} not found"
+        }), 404
+
+    # Determine which list this file belongs to, to count the stocks that passed its obligatory screens
+    total_path = None
+    for pipeline in ('minervini_1mo', 'minervini_4mo', 'ipos'):
+        if pipeline in file_path:
+            total_path = os.path.join('./stocks_filtering_application', pipeline,
+                                      'obligatory_screens/results/obligatory_passed_stocks.csv')
+            break
 
     try:
-        # Check if ranking file exists
-        if not os.path.exists(file_path):
-            return jsonify({
-                "status": "error",
-                "message": f"Ranking file {file_path} not found"
-            }), 404
+        query = parse_rankings_query(request.args)
+    except ValueError as e:
+        return jsonify({
+            "status": "error",
+            "message": f"Invalid rankings query: {str(e)}"
+        }), 400
 
-        # Get modification times for both files
-        price_data_timestamp = os.path.getmtime(stock_data_path)
+    def build_rankings():
+        # Get modification times for the price data and the ranking file
+        price_data_timestamp = get_price_data_timestamp()
+        if price_data_timestamp is None:
+            raise FileNotFoundError("No price data found (price store or all_tickers_historical.csv)")
         rankings_timestamp = os.path.getmtime(file_path)
 
-        price_data_date = datetime.fromtimestamp(price_data_timestamp).isoformat()
-        rankings_date = datetime.fromtimestamp(rankings_timestamp).isoformat()
-
-        # Read CSV file
-        df = pd.read_csv(file_path)
-
-        # Convert DataFrame to list of dictionaries
-        rankings_data = df.fillna('').to_dict('records')
-
-        # Default total stocks (in case we can't find the file)
-        total_stocks = 0
-
-        # Determine which list this file belongs to and get total stocks count
-        if 'minervini_1mo' in file_path:
-            total_path = os.path.join('./stocks_filtering_application',
-                                      'minervini_1mo/obligatory_screens/results/obligatory_passed_stocks.csv')
-            if os.path.exists(total_path):
-                total_stocks = len(pd.read_csv(total_path))
-        elif 'minervini_4mo' in file_path:
-            total_path = os.path.join('./stocks_filtering_application',
-                                      'minervini_4mo/obligatory_screens/results/obligatory_passed_stocks.csv')
-            if os.path.exists(total_path):
-                total_stocks = len(pd.read_csv(total_path))
-        elif 'ipos' in file_path:
-            total_path = os.path.join('./stocks_filtering_application',
-                                      'ipos/obligatory_screens/results/obligatory_passed_stocks.csv')
-            if os.path.exists(total_path):
-                total_stocks = len(pd.read_csv(total_path))
-
-        filtered_stocks = len(rankings_data)
+        # The CSV is parsed once per version of the file, whatever page is asked for
+        df = response_cache.value(f"rankings_frame:{file_path}", [file_path], lambda: pd.read_csv(file_path))
+        rankings_data, matched = select_rankings(df, query)
+        next_offset = query["offset"] + len(rankings_data)
 
-        return jsonify({
+        return {
             "status": "success",
             "message": rankings_data,
-            "stock_data_created_at": price_data_date,
-            "rankings_created_at": rankings_date,
-            "total_stocks": total_stocks,
-            "filtered_stocks": filtered_stocks
-        })
+            "stock_data_created_at": datetime.fromtimestamp(price_data_timestamp).isoformat(),
+            "rankings_created_at": datetime.fromtimestamp(rankings_timestamp).isoformat(),
+            "total_stocks": count_rows_in_csv(total_path) if total_path else 0,
+            "filtered_stocks": len(df),
+            "matched_stocks": matched,
+            "offset": query["offset"],
+            "limit": query["limit"],
+            "next_offset": next_offset if next_offset < matched else None
+        }
+
+    try:
+        # Built once per query and version of the ranking, obligatory and price files
+        paths = [file_path, PRICE_META_PATH, PRICE_CSV_PATH] + ([total_path] if total_path else [])
+        key = f"rankings:{file_path}?" + "&".join(f"{name}={value}" for name, value in sorted(query.items()))
+        return response_cache.respond(key, paths, build_rankings)
+
+    except KeyError as e:
+        return jsonify({
+            "status": "error",
+            "message": f"Invalid rankings query: unknown column {str(e)}"
+        }), 400
 
     except Exception as e:
         print(f"Error in get_rankings: {str(e)}")
@@ -249,6 +279,29 @@ def get_pipeline_status():
     return jsonify(status)
 
 
+@app.route('/pipeline/events', methods=['GET'])
+def stream_pipeline_events():
+    """
+    Stream the pipeline progress as Server-Sent Events, instead of polling /pipeline/status
+
+    Events:
+        - snapshot: the full status (as /pipeline/status, or null before the first run), sent on
+          connect and when a new run starts
+        - step: {step} a new pipeline step
+        - stage: {stage, seconds, finished, total, step} a screening engine stage finished
+        - batch: {current_batch, total_batches} data fetching progress
+        - error: {script, error} an error line from a script
+        - status: {status, process_pid, end_time, error} the run started, completed or failed
+    Every event carries id, run (the run's start time), type and time.
+    """
+    pipeline_event_watcher.start()
+    return Response(
+        sse_events(progress_bus, PipelineStatus.get_status),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
 @app.route('/run_screening', methods=['POST'])
 def screen_stocks():
     """
@@ -415,16 +468,12 @@ def get_stock_counts():
         minervini_4mo_path = os.path.join(base_path, "minervini_4mo/obligatory_screens/obligatory_passed_stocks.csv")
         ipos_path = os.path.join(base_path, "ipos/obligatory_screens/obligatory_passed_stocks.csv")
 
-        # Count rows in each file
-        minervini_1mo_count = count_rows_in_csv(minervini_1mo_path)
-        minervini_4mo_count = count_rows_in_csv(minervini_4mo_path)
-        ipos_count = count_rows_in_csv(ipos_path)
-
-        return jsonify({
+        # Count rows in each file (recounted only when one of them changes)
+        return response_cache.respond("stock_counts", [minervini_1mo_path, minervini_4mo_path, ipos_path], lambda: {
             "status": "success",
-            "minervini_1mo_total": minervini_1mo_count,
-            "minervini_4mo_total": minervini_4mo_count,
-            "ipos_total": ipos_count
+            "minervini_1mo_total": count_rows_in_csv(minervini_1mo_path),
+            "minervini_4mo_total": count_rows_in_csv(minervini_4mo_path),
+            "ipos_total": count_rows_in_csv(ipos_path)
         })
 
     except Exception as e:
@@ -434,6 +483,112 @@ def get_stock_counts():
         }), 500
 
 
+@app.route('/risk_sim', methods=['POST'])
+def simulate_risk_plans():
+    """
+    Simulate risk plans over many equity paths at once and return their distributions
+
+    Example POST body (a single plan can also be given directly instead of "plans"):
+    {
+        "plans": [
+            {"num_trades": 200, "win_rate": 0.4, "avg_gain": 2.5, "avg_loss": 1.0, "gain_stdev": 0.5},
+            {"num_trades": 200, "win_rate": 0.4, "avg_gain": 2.5, "avg_loss": 1.0, "max_risk_pool_pct": 0.03}
+        ],
+        "num_paths": 2000,
+        "seed": 42
+    }
+
+    Returns:
+        JSON object with one result per plan: final balance, return, max drawdown and
+        final risk pool percentiles, probability of profit and risk of ruin
+    """
+    data = request.get_json(silent=True)
+
+    if not isinstance(data, dict):
+        return jsonify({
+            "status": "error",
+            "message": "A JSON object with the risk plan parameters is required"
+        }), 400
+
+    data = dict(data)
+    num_paths = data.pop('num_paths', 1000)
+    seed = data.pop('seed', None)
+    plans = data.pop('plans', None)
+
+    try:
+        if plans is None:
+            plans = [data]
+        elif data:
+            raise ValueError(f"Unknown fields next to plans: {sorted(data)}")
+        if not isinstance(plans, list) or not plans:
+            raise ValueError("plans must be a non-empty list")
+        risk_plans = [RiskPlan.from_dict(plan) for plan in plans]
+        num_paths = int(num_paths)
+        seed = None if seed is None else int(seed)
+        # The same seed for every plan, so plans are compared on the same random outcomes
+        results = [run_batch(plan, num_paths, seed) for plan in risk_plans]
+    except (ValueError, TypeError, AttributeError) as e:
+        return jsonify({
+            "status": "error",
+            "message": f"Invalid risk plan: {str(e)}"
+        }), 400
+
+    return jsonify({
+        "status": "success",
+        "results": results
+    })
+
+
+def parse_rankings_query(args) -> dict:
+    """Normalized paging, projection, sort and filter parameters of a rankings request"""
+    def split(name):
+        return tuple(item.strip() for item in args.get(name, '').split(',') if item.strip())
+
+    try:
+        offset = int(args.get('offset', 0))
+        limit = int(args['limit']) if args.get('limit') else None
+    except ValueError:
+        raise ValueError("offset and limit must be integers")
+    if offset < 0 or (limit is not None and limit < 1):
+        raise ValueError("offset can't be negative and limit must be at least 1")
+
+    order = args.get('order', 'asc').lower()
+    if order not in ('asc', 'desc'):
+        raise ValueError("order must be asc or desc")
+
+    return {
+        "offset": offset,
+        "limit": limit,
+        "columns": split('columns'),
+        "sort": args.get('sort') or None,
+        "order": order,
+        "symbols": tuple(sorted({symbol.upper() for symbol in split('symbol')})),
+    }
+
+
+def select_rankings(df: pd.DataFrame, query: dict):
+    """
+    (records of the requested page, number of rows that passed the symbol filter);
+    raises KeyError for unknown columns.
+    """
+    for column in query["columns"] + ((query["sort"],) if query["sort"] else ()):
+        if column not in df.columns:
+            raise KeyError(column)
+
+    if query["symbols"]:
+        if 'Symbol' not in df.columns:
+            raise KeyError('Symbol')
+        df = df[df['Symbol'].astype(str).str.upper().isin(query["symbols"])]
+    if query["sort"]:
+        df = df.sort_values(query["sort"], ascending=query["order"] == 'asc', kind='stable', na_position='last')
+
+    end = None if query["limit"] is None else query["offset"] + query["limit"]
+    page = df.iloc[query["offset"]:end]
+    if query["columns"]:
+        page = page[list(query["columns"])]
+    return page.fillna('').to_dict('records'), len(df)
+
+
 def count_rows_in_csv(file_path):
     """Helper function to count rows in a CSV file"""
     try:
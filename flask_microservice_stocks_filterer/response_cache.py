@@ -0,0 +1,99 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, NamedTuple, Optional, Sequence, Tuple
+
+from flask import Response, current_app, request
+
+# In-process cache of JSON responses built from files on disk.
+#
+# The UI polls the rankings and counts endpoints, and each poll used to parse
+# the same CSVs again. Here a response body is serialized once and kept with
+# a fingerprint of the files it was built from (mtime and size of each). A
+# request only stats those files: while the fingerprint is unchanged the
+# stored bytes are sent as they are, and once a pipeline rewrites a file the
+# next request rebuilds the body. Every body carries a strong ETag, so a
+# client that sends it back in If-None-Match gets an empty 304.
+#
+# Parsed inputs (e.g. a ranking frame that many paginated queries slice) can
+# be kept the same way with value(), so each query variant parses nothing.
+
+# (mtime_ns, size) per file, None for files that don't exist
+Fingerprint = Tuple[Optional[Tuple[int, int]], ...]
+
+
+class CachedBody(NamedTuple):
+    body: bytes
+    etag: str
+    status: int
+
+
+def file_fingerprint(paths: Sequence[str]) -> Fingerprint:
+    stamps = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            stamps.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            stamps.append(None)
+    return tuple(stamps)
+
+
+class FileResponseCache:
+    """Values keyed by request, rebuilt when any of the files they were built from changes"""
+
+    def __init__(self, max_entries: int = 256) -> None:
+        self.max_entries = max_entries
+        # key -> (fingerprint, value), least recently used first
+        self._entries: "OrderedDict[str, Tuple[Fingerprint, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def value(self, key: str, paths: Sequence[str], build: Callable[[], Any]) -> Any:
+        """
+        The cached value for key, or build() stored when the files changed
+        since it was cached (errors raised by build are not cached).
+        """
+        fingerprint = file_fingerprint(paths)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == fingerprint:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+        # Built outside the lock: concurrent misses may build twice, but never block hits
+        value = build()
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = (fingerprint, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def get(self, key: str, paths: Sequence[str], build: Callable[[], Dict], status: int = 200) -> CachedBody:
+        """The cached JSON body for key, with build() serialized again when the files changed"""
+        def serialize():
+            body = (current_app.json.dumps(build()) + "\n").encode()
+            return CachedBody(body, hashlib.sha1(body).hexdigest()[:20], status)
+        return self.value(key, paths, serialize)
+
+    def respond(self, key: str, paths: Sequence[str], build: Callable[[], Dict], status: int = 200) -> Response:
+        """A JSON response for the cached body, answering 304 when the client already has it"""
+        entry = self.get(key, paths, build, status)
+        response = Response(entry.body, status=entry.status, mimetype=current_app.json.mimetype)
+        response.set_etag(entry.etag)
+        # Clients may keep the body but have to revalidate it on every poll
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
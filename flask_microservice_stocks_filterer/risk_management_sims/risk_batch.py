@@ -0,0 +1,229 @@
+import time
+from dataclasses import asdict, dataclass, fields
+from typing import Dict, Optional
+
+import numpy as np
+
+# Batch mode of the risk-pool simulators: many equity paths at once.
+#
+# Every path follows the rules of RiskManagementSimulator in risk_sim_v2.py
+# (or, with rules="v1", those of risk_plan_simulation_v1.py). The whole risk pool is risked on each trade,
+# and a win or loss moves the pool up or down. The pool moves directly above
+# the 0.5% threshold and through a damped formula below it. It is capped at
+# 5% of the balance, and reset to 0.5% when the win rate over the last 8
+# trades climbs back to 37.5%.
+#
+# Trades are still stepped one at a time, since each depends on the pool left
+# by the previous one. Each step is a handful of array operations over all
+# paths, with draws from a seeded numpy Generator and no per-trade logging.
+# A few thousand paths of a few hundred trades take well under a second.
+
+RULES = ("v2", "v1")
+# Trades in the rolling win-rate window, and the win rate needed to trade "well"
+WIN_RATE_WINDOW = 8
+TRADING_WELL_WIN_RATE = 0.375
+# Gain and loss factors drawn with a standard deviation never go below this
+MIN_FACTOR = 0.1
+# Guard against huge requests from the API
+MAX_CELLS = 50_000_000
+
+
+@dataclass
+class RiskPlan:
+    """Parameters of one batch simulation (gain and loss factors are multiples of the amount risked)"""
+    num_trades: int = 100
+    win_rate: float = 0.5
+    avg_gain: float = 2.0
+    avg_loss: float = 1.0
+    gain_stdev: float = 0.0
+    loss_stdev: float = 0.0
+    initial_balance: float = 1000.0
+    threshold_pct: float = 0.005
+    max_risk_pool_pct: float = 0.05
+    # "v2": risk_sim_v2, the pool moves by 20% x amount / pool (at most 20%) below the threshold
+    #       and the trade is sized before the win-rate reset
+    # "v1": risk_plan_simulation_v1, the pool moves by amount x pool / (pool + k_value) below the
+    #       threshold and the trade is sized after the reset (its gains are % of risk: pass avg_gain / 100)
+    rules: str = "v2"
+    k_value: float = 20.0
+    # A path is ruined once its balance falls to this fraction of the initial balance
+    ruin_fraction: float = 0.5
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "RiskPlan":
+        """Build a plan from JSON-like data, rejecting unknown or invalid fields with ValueError"""
+        names = {f.name for f in fields(cls)}
+        unknown = set(data) - names
+        if unknown:
+            raise ValueError(f"Unknown risk plan fields: {sorted(unknown)}")
+        plan = cls()
+        for f in fields(cls):
+            if f.name in data:
+                value = data[f.name]
+                try:
+                    setattr(plan, f.name, type(getattr(plan, f.name))(value))
+                except (TypeError, ValueError):
+                    raise ValueError(f"Invalid value for {f.name}: {value!r}")
+        plan.validate()
+        return plan
+
+    def validate(self) -> None:
+        if self.num_trades < 1:
+            raise ValueError("num_trades must be at least 1")
+        if not 0 <= self.win_rate <= 1:
+            raise ValueError("win_rate must be between 0 and 1")
+        if self.avg_gain <= 0 or self.avg_loss <= 0:
+            raise ValueError("avg_gain and avg_loss must be positive")
+        if self.gain_stdev < 0 or self.loss_stdev < 0:
+            raise ValueError("gain_stdev and loss_stdev can't be negative")
+        if self.initial_balance <= 0:
+            raise ValueError("initial_balance must be positive")
+        if self.rules not in RULES:
+            raise ValueError(f"rules must be one of {RULES}")
+
+
+def _increased_pool(plan: RiskPlan, pool: np.ndarray, amount: np.ndarray) -> np.ndarray:
+    if plan.rules == "v1":
+        return pool + amount * pool / (pool + plan.k_value)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        proportion = np.minimum(amount / pool, 1.0)
+    # An empty pool takes the whole win
+    return np.where(pool <= 0, pool + amount, pool + pool * 0.2 * proportion)
+
+
+def _reduced_pool(plan: RiskPlan, pool: np.ndarray, amount: np.ndarray) -> np.ndarray:
+    if plan.rules == "v1":
+        return pool - amount * pool / (pool + plan.k_value)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        proportion = np.minimum(amount / pool, 1.0)
+    return np.where(pool <= 0, pool, pool - pool * 0.2 * proportion)
+
+
+def _factors(rng: np.random.Generator, mean: float, stdev: float, size: int) -> np.ndarray:
+    if stdev > 0:
+        return np.maximum(MIN_FACTOR, rng.normal(mean, stdev, size))
+    return np.full(size, mean)
+
+
+def simulate_paths(plan: RiskPlan, num_paths: int, seed: Optional[int] = None,
+                   keep_paths: bool = False) -> Dict[str, np.ndarray]:
+    """
+    Simulate num_paths independent equity paths of plan.num_trades trades.
+
+    Returns per-path arrays: final_balance, final_risk_pool, max_drawdown
+    (fraction of the running peak), min_balance and ruined. With keep_paths,
+    also the (trades + 1) x paths balance matrix, starting with the initial balance.
+    """
+    plan.validate()
+    if num_paths < 1:
+        raise ValueError("num_paths must be at least 1")
+    if num_paths * plan.num_trades > MAX_CELLS:
+        raise ValueError(f"num_paths x num_trades can be at most {MAX_CELLS:,}")
+
+    rng = np.random.default_rng(seed)
+    balance = np.full(num_paths, float(plan.initial_balance))
+    pool = balance * plan.threshold_pct
+    peak = balance.copy()
+    max_drawdown = np.zeros(num_paths)
+    min_balance = balance.copy()
+    ruin_level = plan.initial_balance * plan.ruin_fraction
+    ruined = np.zeros(num_paths, dtype=bool)
+
+    # Outcomes of the last WIN_RATE_WINDOW trades of every path, as a ring buffer
+    window = np.zeros((WIN_RATE_WINDOW, num_paths), dtype=bool)
+    window_wins = np.zeros(num_paths, dtype=np.int64)
+    trading_well = np.zeros(num_paths, dtype=bool)
+    history = np.empty((plan.num_trades + 1, num_paths)) if keep_paths else None
+    if keep_paths:
+        history[0] = balance
+
+    for trade in range(plan.num_trades):
+        is_win = rng.random(num_paths) < plan.win_rate
+        gain_factors = _factors(rng, plan.avg_gain, plan.gain_stdev, num_paths)
+        loss_factors = _factors(rng, plan.avg_loss, plan.loss_stdev, num_paths)
+
+        slot = trade % WIN_RATE_WINDOW
+        window_wins += is_win.astype(np.int64) - window[slot]
+        window[slot] = is_win
+        win_rate = window_wins / min(trade + 1, WIN_RATE_WINDOW)
+
+        # Crossing back above the win-rate threshold tops the pool up to the threshold
+        factors = np.where(is_win, gain_factors, loss_factors)
+        amount = pool * factors
+        was_trading_well = trading_well
+        trading_well = win_rate >= TRADING_WELL_WIN_RATE
+        crossed = trading_well & ~was_trading_well
+        pool = np.where(crossed, np.maximum(pool, balance * plan.threshold_pct), pool)
+        if plan.rules == "v1":
+            amount = pool * factors
+        balance = np.where(is_win, balance + amount, balance - amount)
+        threshold = balance * plan.threshold_pct
+
+        # Wins: the formula below the threshold, the full amount above it
+        below = pool < threshold
+        formula_pool = _increased_pool(plan, pool, amount)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # Part of the win that brings the pool to the threshold through the formula
+            needed = (threshold - pool) * (pool + plan.k_value) / pool
+        split_pool = _increased_pool(plan, pool, needed) + (amount - needed)
+        win_pool = np.where(below, np.where(formula_pool < threshold, formula_pool, split_pool), pool + amount)
+        win_pool = np.minimum(win_pool, balance * plan.max_risk_pool_pct)
+
+        # Losses: the full amount down to the threshold, the formula for the rest
+        above = pool > threshold
+        room = pool - threshold
+        loss_pool = np.where(
+            above,
+            np.where(amount <= room, pool - amount, _reduced_pool(plan, threshold, amount - room)),
+            _reduced_pool(plan, pool, amount))
+
+        pool = np.where(is_win, win_pool, loss_pool)
+
+        peak = np.maximum(peak, balance)
+        max_drawdown = np.maximum(max_drawdown, (peak - balance) / peak)
+        min_balance = np.minimum(min_balance, balance)
+        ruined |= balance <= ruin_level
+        if keep_paths:
+            history[trade + 1] = balance
+
+    result = {
+        'final_balance': balance,
+        'final_risk_pool': pool,
+        'max_drawdown': max_drawdown,
+        'min_balance': min_balance,
+        'ruined': ruined,
+    }
+    if keep_paths:
+        result['balances'] = history
+    return result
+
+
+def _quantiles(values: np.ndarray, percents=(5, 25, 50, 75, 95)) -> Dict[str, float]:
+    stats = {f"p{p}": float(v) for p, v in zip(percents, np.percentile(values, percents))}
+    stats['mean'] = float(values.mean())
+    return stats
+
+
+def summarize(plan: RiskPlan, paths: Dict[str, np.ndarray]) -> Dict:
+    """Distribution statistics of simulate_paths results, as plain JSON-ready values"""
+    final_balance = paths['final_balance']
+    returns_pct = (final_balance / plan.initial_balance - 1) * 100
+    return {
+        'plan': asdict(plan),
+        'num_paths': int(len(final_balance)),
+        'final_balance': _quantiles(final_balance),
+        'return_pct': _quantiles(returns_pct),
+        'max_drawdown_pct': _quantiles(paths['max_drawdown'] * 100, (50, 75, 90, 95, 99)),
+        'final_risk_pct': _quantiles(paths['final_risk_pool'] / final_balance * 100),
+        'probability_of_profit': float((final_balance > plan.initial_balance).mean()),
+        'risk_of_ruin': float(paths['ruined'].mean()),
+    }
+
+
+def run_batch(plan: RiskPlan, num_paths: int = 1000, seed: Optional[int] = None) -> Dict:
+    """simulate_paths + summarize, with the time it took"""
+    start = time.perf_counter()
+    summary = summarize(plan, simulate_paths(plan, num_paths, seed))
+    summary['seed'] = seed
+    summary['elapsed_ms'] = round((time.perf_counter() - start) * 1000, 1)
+    return summary
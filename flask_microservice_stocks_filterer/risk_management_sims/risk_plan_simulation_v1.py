@@ -1,6 +1,7 @@
 import random
 import matplotlib.pyplot as plt
 import numpy as np
+from risk_batch import RiskPlan, run_batch
 
 class RiskManagementSimulator:
     def __init__(self, initial_balance=1000, threshold_pct=0.005, max_risk_pool_pct=0.05, k_value=20):
@@ -322,13 +323,41 @@ def run_multiple_scenarios():
     for r in results:
         print(f"{r['name']:<25} ${r['final_balance']:<14.2f} {r['profit_pct']:<9.2f}% ${r['final_risk_pool']:<14.2f}")
 
+def run_batch_scenarios(num_paths=2000, seed=None):
+    """Compare the scenarios over many paths each, with the vectorized batch mode"""
+    print("===== Batch Scenario Analysis =====")
+    print(f"Each scenario is simulated over {num_paths} paths.")
+    
+    scenarios = [
+        {"name": "High Win Rate, Small Gains", "trades": 100, "avg_gain": 50, "avg_loss": 100, "win_rate": 0.7},
+        {"name": "Low Win Rate, Big Gains", "trades": 100, "avg_gain": 200, "avg_loss": 100, "win_rate": 0.3},
+        {"name": "Balanced Approach", "trades": 100, "avg_gain": 100, "avg_loss": 100, "win_rate": 0.5},
+        {"name": "Risky Approach", "trades": 100, "avg_gain": 300, "avg_loss": 150, "win_rate": 0.35},
+        {"name": "Conservative Approach", "trades": 100, "avg_gain": 80, "avg_loss": 50, "win_rate": 0.6}
+    ]
+    
+    print(f"\n{'Scenario':<25} {'Median Balance':<15} {'5%-95% Balance':<22} {'Max DD p95':<11} {'P(profit)':<10}")
+    print("-" * 85)
+    for scenario in scenarios:
+        # Gains and losses here are % of the amount risked
+        plan = RiskPlan(num_trades=scenario["trades"], win_rate=scenario["win_rate"],
+                        avg_gain=scenario["avg_gain"] / 100, avg_loss=scenario["avg_loss"] / 100, rules="v1")
+        summary = run_batch(plan, num_paths, seed)
+        balance = summary["final_balance"]
+        band = f"${balance['p5']:.2f}-${balance['p95']:.2f}"
+        drawdown = f"{summary['max_drawdown_pct']['p95']:.2f}%"
+        profit = f"{summary['probability_of_profit'] * 100:.1f}%"
+        print(f"{scenario['name']:<25} ${balance['p50']:<14.2f} {band:<22} {drawdown:<11} {profit:<10}")
+
 if __name__ == "__main__":
     print("===== Risk Management Simulation =====")
-    choice = input("Choose simulation type:\n1. Manual parameters\n2. Multiple scenario analysis\nChoice (1/2): ")
+    choice = input("Choose simulation type:\n1. Manual parameters\n2. Multiple scenario analysis\n3. Batch scenario analysis (many paths)\nChoice (1/2/3): ")
     
     if choice == "1":
         run_manual_simulation()
     elif choice == "2":
         run_multiple_scenarios()
+    elif choice == "3":
+        run_batch_scenarios()
     else:
         print("Invalid choice. Exiting.")
\ No newline at end of file
@@ -2,6 +2,7 @@ import random
 import argparse
 import matplotlib.pyplot as plt
 import sys
+from risk_batch import RiskPlan, run_batch
 
 class RiskManagementSimulator:
     def __init__(self, initial_balance=1000, threshold_pct=0.005, max_risk_pool_pct=0.05):
@@ -435,6 +436,18 @@ def get_user_input():
         'initial_balance': initial_balance
     }
 
+def print_batch_summary(summary):
+    """Print the distribution statistics returned by risk_batch.run_batch"""
+    print(f"\n=== BATCH SIMULATION ({summary['num_paths']} paths x {summary['plan']['num_trades']} trades, "
+          f"{summary['elapsed_ms']:.0f} ms) ===")
+    for name, label in [('final_balance', 'Final balance ($)'), ('return_pct', 'Return (%)'),
+                        ('max_drawdown_pct', 'Max drawdown (%)'), ('final_risk_pct', 'Final risk pool (%)')]:
+        stats = summary[name]
+        print(f"{label:<22} " + "  ".join(f"{key}: {value:,.2f}" for key, value in stats.items()))
+    print(f"Probability of profit: {summary['probability_of_profit'] * 100:.1f}%")
+    print(f"Risk of ruin (balance <= {summary['plan']['ruin_fraction'] * 100:.0f}% of start): "
+          f"{summary['risk_of_ruin'] * 100:.2f}%")
+
 def main():
     parser = argparse.ArgumentParser(description='Risk Management Simulation')
     parser.add_argument('--trades', type=int, help='Number of trades to simulate')
@@ -445,9 +458,24 @@ def main():
     parser.add_argument('--loss-stdev', type=float, default=0.1, help='Standard deviation for loss randomness')
     parser.add_argument('--initial-balance', type=float, default=1000, help='Initial account balance')
     parser.add_argument('--no-plots', action='store_true', help='Disable plotting')
+    parser.add_argument('--paths', type=int, help='Batch mode: simulate this many paths at once and print their distribution')
+    parser.add_argument('--seed', type=int, default=None, help='Random seed for batch mode')
     
     args = parser.parse_args()
     
+    if args.paths is not None:
+        # Batch mode never prompts, the trade parameters have to be on the command line
+        if None in [args.trades, args.win_rate, args.avg_gain, args.avg_loss]:
+            parser.error("--paths needs --trades, --win-rate, --avg-gain and --avg-loss")
+        plan = RiskPlan(num_trades=args.trades, win_rate=args.win_rate, avg_gain=args.avg_gain,
+                        avg_loss=args.avg_loss, gain_stdev=args.gain_stdev, loss_stdev=args.loss_stdev,
+                        initial_balance=args.initial_balance)
+        try:
+            print_batch_summary(run_batch(plan, args.paths, args.seed))
+        except ValueError as e:
+            parser.error(str(e))
+        return
+    
     # Check if required args are provided, if not, ask for input
     if None in [args.trades, args.win_rate, args.avg_gain, args.avg_loss]:
         user_params = get_user_input()
@@ -0,0 +1,412 @@
+import argparse
+import csv
+import os
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from price_store import PricePanel
+from indicators import _grouped, indicator
+
+# Market breadth engine: the sentiment screens and sentiment graphs in one pass.
+#
+# Every breadth measure is a per-row flag of the price panel (new 52-week
+# high, RSI above 70, ...) computed once for all symbols from the shared
+# indicators. The value of a measure on a date is then a reduction over a
+# (dates x symbols) matrix. For the sentiment history, the matrix holds each
+# symbol's flag as of its last row on or before the date, which is what the
+# old per-script screens saw when run on that day's data. For the graphs, it
+# holds only the symbols trading on the date. Calendar windows ("the last two
+# weeks") are range reductions over each symbol's rows through a sparse
+# table, so any set of dates costs a few array operations.
+#
+# sentiment_history.csv is updated incrementally: only dates newer than its
+# last row are computed and appended.
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+HISTORY_FILE = os.path.join(APP_DIR, "sentiment_history", "sentiment_history.csv")
+SCREEN_RESULTS_DIR = os.path.join(APP_DIR, "market_sentiment_screens", "results")
+GRAPH_RESULTS_DIR = os.path.join(APP_DIR, "sentiment_graphs", "results")
+PRICE_COLUMNS = ['High', 'Low', 'Close']
+
+# History columns, named like the result CSVs of the old sentiment screens
+HISTORY_COLUMNS = [
+    '52week_high_1_days', '52week_high_2_weeks', '52week_low_1_days', '52week_low_2_weeks',
+    'rsi_over_70', 'rsi_under_30', 'rsi_trending_down_stocks', 'rsi_trending_up_stocks', 'above_200ma',
+]
+# Column names found in older history files
+LEGACY_HISTORY_NAMES = {'52week_high_1_day': '52week_high_1_days', '52week_low_1_day': '52week_low_1_days'}
+INDEXES = {'SPY': 'SPY', 'NASDAQ': '^IXIC'}
+
+YEAR_ROWS = 252
+RSI_TREND_WINDOW = 30
+DAYS_IN_MONTH = 21
+RSI_TREND_THRESHOLD = 0.7
+# Bound on the (dates x symbols) matrices built at a time
+MAX_MATRIX_CELLS = 2_000_000
+
+
+def _row_starts(panel: PricePanel) -> np.ndarray:
+    """First row of each row's symbol"""
+    return np.repeat(panel.offsets[:-1], panel.lengths)
+
+
+def _last_valid_rows(panel: PricePanel, values: np.ndarray) -> np.ndarray:
+    """For each row, the last row up to it (same symbol) with a non-NaN value, -1 if none"""
+    rows = np.maximum.accumulate(np.where(np.isnan(values), -1, np.arange(len(values))))
+    return np.where(rows >= _row_starts(panel), rows, -1)
+
+
+def _valid_rolling(panel: PricePanel, values: np.ndarray, window: int, how: str) -> np.ndarray:
+    """Max/min of the last `window` non-NaN values of each symbol up to each row (NaN rows stay NaN)"""
+    valid = ~np.isnan(values)
+    result = np.full(len(values), np.nan)
+    symbol_ids = np.repeat(np.arange(len(panel)), panel.lengths)[valid]
+    rolling = pd.Series(values[valid]).groupby(symbol_ids, sort=False).rolling(window, min_periods=1)
+    result[valid] = getattr(rolling, how)().to_numpy()
+    return result
+
+
+def _rsi_trend_flags(panel: PricePanel, rsi: np.ndarray):
+    """
+    Rows where the RSI has trended up / down over the last month: the
+    30-day average of the RSI rose (fell) on at least 70% of its last 22
+    values and ends above (below) where it started. The symbol needs 72
+    rows of history, like the month-by-month walk of the old screens.
+    """
+    rsi_ma = _grouped(panel, rsi).rolling(window=RSI_TREND_WINDOW).mean().to_numpy()
+    rows = np.arange(len(rsi_ma))
+    enough = rows - _row_starts(panel) >= RSI_TREND_WINDOW + 2 * DAYS_IN_MONTH - 1
+    first = np.maximum(rows - DAYS_IN_MONTH, 0)
+    valid = ~np.isnan(rsi_ma)
+    valid_counts = np.concatenate([[0], np.cumsum(valid)])
+    # Averages in the window that are not NaN (the old screens divided by this count)
+    window_valid = valid_counts[rows + 1] - valid_counts[first]
+
+    # Up: rises between consecutive non-NaN averages, from the first to the last one in the window
+    values = rsi_ma[valid]
+    rises = np.zeros(len(values), dtype=bool)
+    same_symbol = np.diff(np.repeat(np.arange(len(panel)), panel.lengths)[valid]) == 0
+    rises[1:] = same_symbol & (values[1:] > values[:-1])
+    rise_counts = np.concatenate([[0], np.cumsum(rises)])
+    first_valid = np.minimum(valid_counts[first], max(len(values) - 1, 0))
+    last_valid = np.maximum(valid_counts[rows + 1] - 1, 0)
+    ups = rise_counts[last_valid + 1] - rise_counts[first_valid + 1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        trending_up = (enough & (window_valid > 0) & (ups / window_valid >= RSI_TREND_THRESHOLD)
+                       & (values[last_valid] > values[first_valid])) if len(values) else valid
+
+    # Down: falls of the average over the last 21 days, where both days have one
+    previous = np.full(len(rsi_ma), np.nan)
+    previous[1:] = rsi_ma[:-1]
+    previous[panel.offsets[:-1][panel.lengths > 0]] = np.nan
+    down_counts = np.concatenate([[0], np.cumsum(rsi_ma < previous)])
+    downs = down_counts[rows + 1] - down_counts[first + 1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # The old down-trend check compared with the second value of the window
+        trending_down = (enough & (window_valid > 0) & (downs / window_valid >= RSI_TREND_THRESHOLD)
+                         & (rsi_ma < rsi_ma[np.minimum(first + 1, len(rsi_ma) - 1)]))
+    return trending_up, trending_down
+
+
+def _row_flags(panel: PricePanel) -> Dict[str, np.ndarray]:
+    """Per-row inputs of the history measures, computed once per panel"""
+    def build():
+        high = panel.columns['High'].astype(np.float64, copy=False)
+        low = panel.columns['Low'].astype(np.float64, copy=False)
+        close = panel.columns['Close'].astype(np.float64, copy=False)
+        rsi = indicator(panel, 'ewm_rsi', period=14)
+        ma_200 = indicator(panel, 'sma', window=200, column='Close')
+        trending_up, trending_down = _rsi_trend_flags(panel, rsi)
+        return {
+            'high': high,
+            'low': low,
+            # Highest high / lowest low of the last 252 trading days, as of each row
+            'new_high': high == _valid_rolling(panel, high, YEAR_ROWS, 'max'),
+            'new_low': low == _valid_rolling(panel, low, YEAR_ROWS, 'min'),
+            'last_high_row': _last_valid_rows(panel, high),
+            'last_low_row': _last_valid_rows(panel, low),
+            'rsi': rsi,
+            'rsi_trending_up': trending_up,
+            'rsi_trending_down': trending_down,
+            'close': close,
+            'ma_200': ma_200,
+            'last_close_row': _last_valid_rows(panel, close),
+            'last_ma_row': _last_valid_rows(panel, ma_200),
+        }
+    return panel.cached('breadth_rows', build)
+
+
+def _range_reduce(values: np.ndarray, starts: np.ndarray, ends: np.ndarray, ufunc) -> np.ndarray:
+    """
+    ufunc (np.fmax / np.fmin) over values[start..end] for every pair of
+    starts and ends (inclusive, NaN for empty ranges), through a sparse table.
+    """
+    result = np.full(starts.shape, np.nan)
+    lengths = ends - starts + 1
+    nonempty = lengths > 0
+    if not nonempty.any():
+        return result
+    levels = np.zeros(starts.shape, dtype=np.int64)
+    levels[nonempty] = np.floor(np.log2(lengths[nonempty])).astype(np.int64)
+
+    # table[j] is the reduction of values[j .. j + 2**level - 1]
+    table = values.astype(np.float64)
+    for level in range(int(levels[nonempty].max()) + 1):
+        span = 1 << level
+        if level:
+            table = ufunc(table[:-(span >> 1)], table[span >> 1:])
+        picked = nonempty & (levels == level)
+        result[picked] = ufunc(table[starts[picked]], table[ends[picked] - span + 1])
+    return result
+
+
+def _calendar_extreme(panel: PricePanel, values: np.ndarray, dates: np.ndarray, rows: np.ndarray,
+                      days: int, ufunc) -> np.ndarray:
+    """Max/min of each symbol's values dated within `days` calendar days before each date (inclusive)"""
+    before = panel.rows_as_of(dates - np.timedelta64(days + 1, 'D'))
+    starts = np.where(before >= 0, before + 1, panel.offsets[None, :-1])
+    return _range_reduce(values, starts, rows, ufunc)
+
+
+def _percentages(hits: np.ndarray, counted: np.ndarray) -> np.ndarray:
+    """Percentage of counted symbols that are hits, per date (0 when nothing is counted)"""
+    totals = counted.sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(totals > 0, (hits & counted).sum(axis=1) / totals * 100, 0.0)
+
+
+def _history_chunk(panel: PricePanel, dates: np.ndarray) -> Dict[str, np.ndarray]:
+    flags = _row_flags(panel)
+    rows = panel.rows_as_of(dates)
+    counted = rows >= 0
+    last = np.maximum(rows, 0)
+
+    def at(name, row_index):
+        return flags[name][row_index]
+
+    # Last trading day versus the last 252 trading days (rows without a value are skipped)
+    high_rows, low_rows = at('last_high_row', last), at('last_low_row', last)
+    has_high, has_low = counted & (high_rows >= 0), counted & (low_rows >= 0)
+
+    # Calendar windows, measured back from the date itself
+    high_2w = _calendar_extreme(panel, flags['high'], dates, rows, 14, np.fmax)
+    high_1y = _calendar_extreme(panel, flags['high'], dates, rows, 365, np.fmax)
+    low_2w = _calendar_extreme(panel, flags['low'], dates, rows, 14, np.fmin)
+    low_1y = _calendar_extreme(panel, flags['low'], dates, rows, 365, np.fmin)
+
+    rsi = at('rsi', last)
+    close_rows, ma_rows = at('last_close_row', last), at('last_ma_row', last)
+    close = np.where(close_rows >= 0, flags['close'][np.maximum(close_rows, 0)], np.nan)
+    ma_200 = np.where(ma_rows >= 0, flags['ma_200'][np.maximum(ma_rows, 0)], np.nan)
+
+    with np.errstate(invalid='ignore'):
+        return {
+            '52week_high_1_days': _percentages(at('new_high', np.maximum(high_rows, 0)), has_high),
+            '52week_high_2_weeks': _percentages(high_2w >= high_1y, counted),
+            '52week_low_1_days': _percentages(at('new_low', np.maximum(low_rows, 0)), has_low),
+            '52week_low_2_weeks': _percentages(low_2w <= low_1y, counted),
+            'rsi_over_70': _percentages(rsi > 70, counted),
+            'rsi_under_30': _percentages(rsi < 30, counted),
+            'rsi_trending_down_stocks': _percentages(at('rsi_trending_down', last), counted),
+            'rsi_trending_up_stocks': _percentages(at('rsi_trending_up', last), counted),
+            'above_200ma': _percentages(close > ma_200, counted),
+        }
+
+
+def breadth_history(panel: PricePanel, dates=None) -> pd.DataFrame:
+    """
+    Percentage of stocks meeting each history measure on each date (every
+    date of the panel by default), indexed by date with HISTORY_COLUMNS.
+    """
+    dates = np.unique(panel.dates) if dates is None else np.asarray(dates, dtype='datetime64[D]')
+    chunk_size = max(1, MAX_MATRIX_CELLS // max(len(panel), 1))
+    chunks = [_history_chunk(panel, dates[i:i + chunk_size]) for i in range(0, len(dates), chunk_size)]
+    data = {name: np.concatenate([chunk[name] for chunk in chunks]) if chunks else np.array([])
+            for name in HISTORY_COLUMNS}
+    return pd.DataFrame(data, index=pd.DatetimeIndex(dates.astype('datetime64[ns]'), name='Date'))
+
+
+def _daily_percentages(panel: PricePanel, eligible: np.ndarray, hits: np.ndarray) -> pd.Series:
+    """Per date, the percentage of the eligible rows that are hits (dates without eligible rows are left out)"""
+    days, day_index = np.unique(panel.dates[eligible], return_inverse=True)
+    totals = np.bincount(day_index, minlength=len(days))
+    counts = np.bincount(day_index, weights=hits[eligible], minlength=len(days))
+    return pd.Series(counts / totals * 100, index=pd.DatetimeIndex(days.astype('datetime64[ns]'), name='Date'))
+
+
+def breadth_graphs(panel: PricePanel) -> Dict[str, pd.DataFrame]:
+    """The sentiment graph series, keyed by their CSV file name"""
+    high = panel.columns['High'].astype(np.float64, copy=False)
+    low = panel.columns['Low'].astype(np.float64, copy=False)
+    close = panel.columns['Close'].astype(np.float64, copy=False)
+    graphs = {}
+
+    with np.errstate(invalid='ignore'):
+        # New 32-week highs / lows: beyond the prior 224 days, among the symbols that have 224 prior days
+        prior_max = indicator(panel, 'rolling_max', window=224, column='High', shift=1)
+        prior_min = indicator(panel, 'rolling_min', window=224, column='Low', shift=1)
+        for file_name, column, prior, hits in [
+            ("rolling_4day_percentage_new_32week_highs.csv", 'Rolling_4Day_Percentage_32Week_Highs', prior_max, high > prior_max),
+            ("rolling_4day_percentage_new_32week_lows.csv", 'Rolling_4Day_Percentage_32Week_Lows', prior_min, low < prior_min),
+        ]:
+            daily = _daily_percentages(panel, ~np.isnan(prior), hits)
+            graphs[file_name] = pd.DataFrame({'Date': daily.index, column: daily.rolling(window=4).mean().to_numpy()})
+
+        ma_200 = indicator(panel, 'sma', window=200, column='Close')
+        daily = _daily_percentages(panel, ~np.isnan(ma_200), close > ma_200).round(2)
+        graphs["above_200ma.csv"] = pd.DataFrame({'Date': daily.index.strftime('%Y-%m-%d'),
+                                                  'Percentage_Above_200MA': daily.to_numpy()})
+    return graphs
+
+
+def write_graphs(panel: PricePanel, file_names: Optional[List[str]] = None,
+                 output_dir: str = GRAPH_RESULTS_DIR) -> None:
+    """Write the graph series (all of them by default) to their CSVs"""
+    os.makedirs(output_dir, exist_ok=True)
+    for file_name, df in breadth_graphs(panel).items():
+        if file_names is not None and file_name not in file_names:
+            continue
+        df.to_csv(os.path.join(output_dir, file_name), index=False)
+        print(f"Saved {len(df)} days to {file_name}")
+
+
+def write_screen_results(panel: PricePanel, names: Optional[List[str]] = None,
+                         output_dir: str = SCREEN_RESULTS_DIR) -> pd.Series:
+    """Write the latest value of each measure to its one-number results CSV; returns the values"""
+    latest = breadth_history(panel, [panel.dates.max()]).iloc[-1] if len(panel.dates) else \
+        pd.Series(0.0, index=HISTORY_COLUMNS)
+    os.makedirs(output_dir, exist_ok=True)
+    for name in names or HISTORY_COLUMNS:
+        pd.DataFrame([[latest[name]]], columns=['Percentage']).to_csv(os.path.join(output_dir, f"{name}.csv"), index=False)
+        print(f"{name}: {latest[name]:.2f}%")
+    return latest
+
+
+def index_changes(dates: pd.DatetimeIndex) -> Dict[str, Dict[pd.Timestamp, float]]:
+    """Daily % change of SPY and the NASDAQ composite on the given dates (missing dates are left out)"""
+    changes = {name: {} for name in INDEXES}
+    if len(dates) == 0:
+        return changes
+    try:
+        import yfinance as yf
+    except ImportError:
+        print("yfinance is not installed, index changes are left at 0")
+        return changes
+
+    for name, ticker in INDEXES.items():
+        try:
+            history = yf.Ticker(ticker).history(start=(dates.min() - timedelta(days=10)).strftime('%Y-%m-%d'),
+                                                end=(dates.max() + timedelta(days=1)).strftime('%Y-%m-%d'))
+            change = history['Close'].pct_change() * 100
+            index = change.index.tz_localize(None) if change.index.tz is not None else change.index
+            changes[name] = dict(zip(index.normalize(), change.to_numpy()))
+        except Exception as e:
+            print(f"Could not fetch {ticker} history: {e}")
+    return changes
+
+
+def _read_history(history_file: str):
+    """(header, rows) of the history file, or (None, []) when it does not exist"""
+    if not os.path.exists(history_file):
+        return None, []
+    with open(history_file, 'r', newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        return header, [row for row in reader if row]
+
+
+def _last_history_date(rows) -> Optional[pd.Timestamp]:
+    dates = pd.to_datetime([row[0] for row in rows], errors='coerce')
+    dates = dates[~dates.isna()]
+    return dates.max() if len(dates) else None
+
+
+def _history_rows(header: List[str], history: pd.DataFrame, changes) -> List[List[str]]:
+    """Rows of the history frame laid out like the file's header"""
+    rows = []
+    for day, values in history.iterrows():
+        row = []
+        for column in header:
+            name = column.strip()
+            name = LEGACY_HISTORY_NAMES.get(name, name)
+            if name == 'Date':
+                row.append(day.strftime('%Y-%m-%d'))
+            elif name in INDEXES:
+                change = changes[name].get(day)
+                row.append(f"{change:.2f}" if change is not None and not np.isnan(change) else "0.00")
+            elif name in values.index:
+                row.append(f"{values[name]:.2f}")
+            else:
+                row.append("")
+        rows.append(row)
+    return rows
+
+
+def update_history(panel: PricePanel, history_file: str = HISTORY_FILE,
+                   rebuild_days: Optional[int] = None) -> int:
+    """
+    Append the dates of the panel that are newer than the last row of the
+    history file; returns the number of rows written.
+
+    With rebuild_days, the last rebuild_days dates of the panel are
+    recomputed and replace the rows of those dates (older rows are kept).
+    """
+    header, rows = _read_history(history_file)
+    if header is None:
+        header = ['Date'] + list(INDEXES) + HISTORY_COLUMNS
+    all_dates = np.unique(panel.dates)
+
+    if rebuild_days is not None:
+        dates = all_dates[-rebuild_days:]
+    else:
+        last_date = _last_history_date(rows)
+        dates = all_dates if last_date is None else all_dates[all_dates > np.datetime64(last_date.date(), 'D')]
+    if len(dates) == 0:
+        print(f"{history_file} is already up to date")
+        return 0
+
+    print(f"Computing breadth for {len(dates)} dates ({dates[0]} to {dates[-1]})")
+    history = breadth_history(panel, dates)
+    new_rows = _history_rows(header, history, index_changes(history.index))
+
+    os.makedirs(os.path.dirname(history_file), exist_ok=True)
+    if rebuild_days is None and os.path.exists(history_file):
+        with open(history_file, 'a', newline='') as f:
+            csv.writer(f).writerows(new_rows)
+    else:
+        replaced = {row[0] for row in new_rows}
+        kept = [row for row in rows if row[0] not in replaced]
+        merged = sorted(kept + new_rows, key=lambda row: row[0])
+        tmp_file = history_file + ".tmp"
+        with open(tmp_file, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            writer.writerows(merged)
+        os.replace(tmp_file, history_file)
+    print(f"Wrote {len(new_rows)} rows to {history_file}")
+    return len(new_rows)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compute the market breadth history, screens and graphs")
+    parser.add_argument("--rebuild-days", type=int, default=None,
+                        help="Recompute the last N dates of the history instead of appending new dates")
+    parser.add_argument("--skip-graphs", action="store_true", help="Do not rewrite the sentiment graph series")
+    return parser.parse_args()
+
+
+def main(rebuild_days: Optional[int] = None, graphs: bool = True) -> None:
+    panel = PricePanel.load(columns=PRICE_COLUMNS)
+    print(f"Loaded {len(panel.df)} rows for {len(panel)} symbols")
+    write_screen_results(panel)
+    update_history(panel, rebuild_days=rebuild_days)
+    if graphs:
+        write_graphs(panel)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    main(args.rebuild_days, not args.skip_graphs)
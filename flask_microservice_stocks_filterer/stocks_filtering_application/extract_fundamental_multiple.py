@@ -7,14 +7,18 @@ import datetime
 import queue
 import csv
 import os
-import pandas as pd
 import xml.etree.ElementTree as ET
 
+FUNDAMENTAL_FIELDS = ['Symbol', 'Date', 'Eps', 'Revenue']
+
 class FundamentalDataApp(EClient, EWrapper):
-    def __init__(self, tickers_to_process, output_dir):
+    def __init__(self, tickers_to_process, output_dir, output_file):
         EClient.__init__(self, self)
         
         self.tickers_to_process = tickers_to_process
+        # Rows are appended to this file as each ticker arrives (no per-ticker files)
+        self.output_file = output_file
+        self.write_lock = threading.Lock()
         self.data_queue = queue.Queue()
         self.orderId = None
         self.processed_tickers = set()
@@ -57,7 +61,7 @@ class FundamentalDataApp(EClient, EWrapper):
             # let's just save what we have and move on
             if errorCode == 322 and "Duplicate ticker ID" in errorString and ticker in self.fundamental_data:
                 print(f"Saving partial data for {ticker} despite duplicate ID error")
-                self.save_ticker_data_to_csv(ticker)
+                self.process_and_save_fundamental_data(ticker, self.fundamental_data[ticker])
             
             # Clean up processing status and mark as processed
             if ticker in self.processing_tickers:
@@ -134,16 +138,10 @@ class FundamentalDataApp(EClient, EWrapper):
                 print(f"No complete fundamental data found for {ticker}")
                 return
             
-            # Save the processed data to CSV
-            csv_filename = os.path.join(self.output_dir, f"{ticker}_fundamentals.csv")
-            
-            with open(csv_filename, 'w', newline='') as f:
-                fieldnames = ['Symbol', 'Date', 'Eps', 'Revenue']
-                writer = csv.DictWriter(f, fieldnames=fieldnames)
-                writer.writeheader()
-                writer.writerows(complete_data)
+            # Append the processed rows to the merged CSV
+            append_rows(self.output_file, complete_data, self.write_lock)
             
-            print(f"Saved fundamental data for {ticker} to {csv_filename}")
+            print(f"Saved fundamental data for {ticker} to {self.output_file}")
             
         except Exception as e:
             print(f"Error processing fundamental data for {ticker}: {e}")
@@ -211,49 +209,49 @@ class FundamentalDataApp(EClient, EWrapper):
             self.processed_tickers.add(ticker)
             self.process_next_ticker()
 
-def merge_csv_files(directory, output_file):
-    """Merge all individual CSV files into one master CSV file."""
-    all_data = []
-    
-    for filename in os.listdir(directory):
-        if filename.endswith("_fundamentals.csv"):
-            file_path = os.path.join(directory, filename)
-            try:
-                df = pd.read_csv(file_path)
-                all_data.append(df)
-            except Exception as e:
-                print(f"Error reading {filename}: {e}")
+def append_rows(output_file, rows, lock):
+    """Append rows to the merged CSV, writing the header when the file is new."""
+    with lock:
+        write_header = not os.path.exists(output_file) or os.path.getsize(output_file) == 0
+        with open(output_file, 'a', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=FUNDAMENTAL_FIELDS)
+            if write_header:
+                writer.writeheader()
+            writer.writerows(rows)
+
+def finalize_output(partial_file, output_file):
+    """
+    Move the streamed rows into place, dropping (Symbol, Date) rows repeated when a
+    chunk was retried. Streams line by line, only the keys are held in memory.
+    """
+    if not os.path.exists(partial_file):
+        print("No fundamental data was fetched.")
+        return
     
-    if all_data:
-        # Concatenate all dataframes
-        master_df = pd.concat(all_data, ignore_index=True)
-        
-        # Save to master CSV file
-        master_df.to_csv(output_file, index=False)
-        print(f"Merged all fundamental data into {output_file}")
-    else:
-        print("No data files found to merge.")
-        
-def cleanup_ticker_files(directory):
-    """Delete all individual ticker CSV files after merging."""
-    count = 0
-    for filename in os.listdir(directory):
-        if filename.endswith("_fundamentals.csv") and filename != "all_tickers_fundamentals.csv":
-            file_path = os.path.join(directory, filename)
-            try:
-                os.remove(file_path)
-                count += 1
-            except Exception as e:
-                print(f"Error removing {filename}: {e}")
-    print(f"Deleted {count} individual ticker files")
+    seen = set()
+    tmp_file = output_file + ".tmp"
+    with open(partial_file, 'r', newline='') as src, open(tmp_file, 'w', newline='') as dst:
+        reader = csv.DictReader(src)
+        writer = csv.DictWriter(dst, fieldnames=FUNDAMENTAL_FIELDS)
+        writer.writeheader()
+        for row in reader:
+            key = (row['Symbol'], row['Date'])
+            if key not in seen:
+                seen.add(key)
+                writer.writerow(row)
+    os.replace(tmp_file, output_file)
+    os.remove(partial_file)
+    print(f"Merged all fundamental data into {output_file}")
 
 def chunked_main():
     # Ensure paths are properly resolved
     script_dir = os.path.dirname(os.path.abspath(__file__))
     
     input_file = os.path.join(script_dir, "stock_tickers", "amex_arca_bats_nasdaq_nyse_otc_stocks.csv")  # File with ticker symbols
-    output_dir = os.path.join(script_dir, "fundamental_data")  # Directory to store individual ticker CSVs
+    output_dir = os.path.join(script_dir, "fundamental_data")
     master_output_file = os.path.join(script_dir, "fundamental_data", "all_tickers_fundamentals.csv")  # Final merged output file
+    # Rows are streamed here while fetching and moved to master_output_file at the end
+    partial_output_file = master_output_file + ".partial"
     
     # Read tickers from input
     with open(input_file, 'r') as f:
@@ -280,6 +278,10 @@ def chunked_main():
         current_chunk = 0
         print("Starting from the beginning")
     
+    # A fresh run starts a new merged file; a resumed one keeps appending to it
+    if current_chunk == 0 and os.path.exists(partial_output_file):
+        os.remove(partial_output_file)
+    
     # Process all chunks
     for chunk_index in range(current_chunk, (total_tickers + CHUNK_SIZE - 1) // CHUNK_SIZE):
         chunk_start = chunk_index * CHUNK_SIZE
@@ -305,7 +307,8 @@ def chunked_main():
             # Create and start the app with only the remaining tickers
             app = FundamentalDataApp(
                 tickers_to_process=remaining_tickers,
-                output_dir=output_dir
+                output_dir=output_dir,
+                output_file=partial_output_file
             )
             
             # Connect
@@ -382,11 +385,8 @@ def chunked_main():
         with open("fundamental_progress.txt", "w") as f:
             f.write(str(chunk_index + 1))
     
-    # After all chunks are processed, merge the CSV files
-    merge_csv_files(output_dir, master_output_file)
-    
-    # Clean up individual files
-    cleanup_ticker_files(output_dir)
+    # After all chunks are processed, publish the merged file
+    finalize_output(partial_output_file, master_output_file)
     
     print("\nAll chunks completed. Exiting.")
     # Clear progress file when done
@@ -0,0 +1,295 @@
+import heapq
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Request scheduler for IB API downloads (historical bars, one request per ticker).
+#
+# Keeps up to `max_in_flight` requests outstanding, spread over several API
+# client connections, and paces new requests with a token bucket instead of
+# sleeping on a per-minute counter. A failed or timed-out ticker is retried on
+# its own after a delay; a dropped connection is reopened and its requests are
+# re-queued, so one bad ticker or socket never restarts the whole download.
+#
+# The scheduler does not import ibapi. A client is any object with:
+#     start()                   connect and start its reader thread
+#     stop()                    disconnect
+#     request(req_id, ticker)   send the request for `ticker` under `req_id`
+#     cancel(req_id)            cancel an outstanding request
+# that reports back through client_ready / client_lost / complete / fail /
+# requeue. This keeps it testable against a fake client or a fake TWS.
+
+# IB pacing: the previous 100 requests/minute limit, with small bursts
+PACING_RATE = 100 / 60  # requests per second
+PACING_BURST = 10
+# IB allows at most 50 simultaneous open historical data requests
+MAX_IN_FLIGHT = 50
+NUM_CLIENTS = 4
+
+MAX_ATTEMPTS = 3
+# IB rejects identical historical requests made within 15 seconds
+RETRY_DELAY = 15
+# Extra pause of the whole bucket after a pacing violation
+PACING_PENALTY = 30
+REQUEST_TIMEOUT = 120
+RECONNECT_DELAY = 10
+# Give up when nothing completes, fails or connects for this long
+STALL_TIMEOUT = 300
+POLL_INTERVAL = 1.0
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, bursts of up to `capacity`"""
+
+    def __init__(self, rate: float = PACING_RATE, capacity: float = PACING_BURST,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = float(capacity)
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self) -> float:
+        """Take a token; returns 0 on success, otherwise the seconds until one is available"""
+        with self.lock:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    def penalize(self, seconds: float) -> None:
+        """Empty the bucket and hold new tokens back for `seconds`"""
+        with self.lock:
+            self._refill()
+            self.tokens = min(self.tokens, 0.0) - seconds * self.rate
+
+
+class FetchScheduler:
+    """Download one request per ticker over `num_clients` API connections"""
+
+    def __init__(self, tickers: Iterable[str], client_factory: Callable,
+                 num_clients: int = NUM_CLIENTS,
+                 max_in_flight: int = MAX_IN_FLIGHT,
+                 bucket: Optional[TokenBucket] = None,
+                 max_attempts: int = MAX_ATTEMPTS,
+                 retry_delay: float = RETRY_DELAY,
+                 request_timeout: float = REQUEST_TIMEOUT,
+                 reconnect_delay: float = RECONNECT_DELAY,
+                 stall_timeout: float = STALL_TIMEOUT,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        """
+        Args:
+            tickers: Tickers to request, in order
+            client_factory: client_factory(client_index, scheduler) -> new client
+            num_clients: Number of API connections
+            max_in_flight: Outstanding requests over all connections
+            bucket: Pacing of new requests (defaults to PACING_RATE / PACING_BURST)
+            max_attempts: Attempts per ticker before it is reported as failed
+            retry_delay: Seconds before a failed ticker is retried (times the attempt number)
+            request_timeout: Seconds before an unanswered request is cancelled and retried
+            reconnect_delay: Seconds before a lost connection is reopened
+            stall_timeout: Give up on the remaining tickers after this long without progress
+        """
+        self.client_factory = client_factory
+        self.num_clients = num_clients
+        self.max_in_flight = max_in_flight
+        self.bucket = bucket or TokenBucket(clock=clock)
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.request_timeout = request_timeout
+        self.reconnect_delay = reconnect_delay
+        self.stall_timeout = stall_timeout
+        self.clock = clock
+
+        self.pending = deque(dict.fromkeys(tickers))
+        self.delayed: List[Tuple[float, int, str]] = []  # heap of (ready at, sequence, ticker)
+        self.in_flight: Dict[int, Tuple[str, object, float]] = {}  # req_id -> (ticker, client, sent at)
+        self.attempts: Dict[str, int] = {}
+        self.done: List[str] = []
+        self.failed: Dict[str, str] = {}  # ticker -> last error
+
+        self.clients: List[Optional[object]] = [None] * num_clients
+        self.ready = set()  # indices of connected clients
+        self.reconnect_at: Dict[int, float] = {}
+        self.next_req_id = 1
+        self.sequence = 0
+        self.last_progress = clock()
+        self.condition = threading.Condition()
+
+    # ------------------------------------------------------------------
+    # Client callbacks (called from the clients' reader threads)
+    # ------------------------------------------------------------------
+
+    def client_ready(self, client) -> None:
+        with self.condition:
+            index = self._client_index(client)
+            if index is not None:
+                self.ready.add(index)
+                self.last_progress = self.clock()
+                self.condition.notify_all()
+
+    def client_lost(self, client) -> None:
+        """Connection closed: re-queue its requests and reopen it after reconnect_delay"""
+        with self.condition:
+            index = self._client_index(client)
+            if index is None:
+                return
+            self.ready.discard(index)
+            self.clients[index] = None
+            self.reconnect_at[index] = self.clock() + self.reconnect_delay
+            for req_id, (ticker, owner, _) in list(self.in_flight.items()):
+                if owner is client:
+                    del self.in_flight[req_id]
+                    self.pending.appendleft(ticker)
+            self.condition.notify_all()
+
+    def complete(self, req_id: int) -> None:
+        with self.condition:
+            entry = self.in_flight.pop(req_id, None)
+            if entry is None:
+                return
+            self.done.append(entry[0])
+            self.last_progress = self.clock()
+            self.condition.notify_all()
+
+    def fail(self, req_id: int, reason: str, retry: bool = True, pacing: bool = False) -> None:
+        """Request failed: retry the ticker later (until max_attempts) or report it as failed"""
+        with self.condition:
+            entry = self.in_flight.pop(req_id, None)
+            if entry is None:
+                return
+            ticker = entry[0]
+            self.last_progress = self.clock()
+            if pacing:
+                self.bucket.penalize(PACING_PENALTY)
+            if retry and self.attempts[ticker] < self.max_attempts:
+                ready_at = self.clock() + self.retry_delay * self.attempts[ticker]
+                self._delay(ticker, ready_at)
+            else:
+                self.failed[ticker] = reason
+            self.condition.notify_all()
+
+    def requeue(self, req_id: int) -> None:
+        """Send the ticker again as soon as possible, without counting an attempt"""
+        with self.condition:
+            entry = self.in_flight.pop(req_id, None)
+            if entry is None:
+                return
+            ticker = entry[0]
+            self.attempts[ticker] -= 1
+            self.last_progress = self.clock()
+            self.pending.appendleft(ticker)
+            self.condition.notify_all()
+
+    # ------------------------------------------------------------------
+    # Scheduling
+    # ------------------------------------------------------------------
+
+    def run(self) -> Tuple[List[str], Dict[str, str]]:
+        """Request every ticker; returns (completed tickers, failed ticker -> error)"""
+        for index in range(self.num_clients):
+            self._start_client(index)
+
+        try:
+            with self.condition:
+                while self.pending or self.delayed or self.in_flight:
+                    now = self.clock()
+                    if now - self.last_progress > self.stall_timeout:
+                        self._give_up(f"no progress for {self.stall_timeout} seconds")
+                        break
+                    self._expire_requests(now)
+                    self._release_delayed(now)
+                    self._reconnect_clients(now)
+                    wait = self._dispatch(now)
+                    self.condition.wait(timeout=min(wait, POLL_INTERVAL))
+        finally:
+            for client in self.clients:
+                if client is not None:
+                    client.stop()
+
+        return self.done, self.failed
+
+    def _dispatch(self, now: float) -> float:
+        """Send pending tickers while slots and tokens allow; returns how long to wait before trying again"""
+        while self.pending and self.ready and len(self.in_flight) < self.max_in_flight:
+            wait = self.bucket.try_acquire()
+            if wait > 0:
+                return wait
+
+            index = min(self.ready, key=self._load)
+            client = self.clients[index]
+            ticker = self.pending.popleft()
+            req_id = self.next_req_id
+            self.next_req_id += 1
+            self.attempts[ticker] = self.attempts.get(ticker, 0) + 1
+            self.in_flight[req_id] = (ticker, client, now)
+            try:
+                client.request(req_id, ticker)
+            except Exception as e:
+                print(f"Exception requesting data for {ticker}: {e}")
+                self.fail(req_id, str(e))
+        return POLL_INTERVAL
+
+    def _load(self, index: int) -> int:
+        client = self.clients[index]
+        return sum(1 for _, owner, _ in self.in_flight.values() if owner is client)
+
+    def _expire_requests(self, now: float) -> None:
+        for req_id, (ticker, client, sent_at) in list(self.in_flight.items()):
+            if now - sent_at > self.request_timeout:
+                print(f"No answer for {ticker} after {self.request_timeout} seconds, cancelling")
+                try:
+                    client.cancel(req_id)
+                except Exception as e:
+                    print(f"Error cancelling request for {ticker}: {e}")
+                self.fail(req_id, "request timed out")
+
+    def _release_delayed(self, now: float) -> None:
+        while self.delayed and self.delayed[0][0] <= now:
+            _, _, ticker = heapq.heappop(self.delayed)
+            self.pending.append(ticker)
+
+    def _reconnect_clients(self, now: float) -> None:
+        for index, reconnect_at in list(self.reconnect_at.items()):
+            if now >= reconnect_at:
+                del self.reconnect_at[index]
+                print(f"Reconnecting client {index}")
+                self._start_client(index)
+
+    def _start_client(self, index: int) -> None:
+        client = self.client_factory(index, self)
+        self.clients[index] = client
+        try:
+            client.start()
+        except Exception as e:
+            print(f"Could not start client {index}: {e}")
+            self.clients[index] = None
+            self.reconnect_at[index] = self.clock() + self.reconnect_delay
+
+    def _client_index(self, client) -> Optional[int]:
+        for index, current in enumerate(self.clients):
+            if current is client:
+                return index
+        return None
+
+    def _delay(self, ticker: str, ready_at: float) -> None:
+        self.sequence += 1
+        heapq.heappush(self.delayed, (ready_at, self.sequence, ticker))
+
+    def _give_up(self, reason: str) -> None:
+        print(f"Giving up on the remaining tickers: {reason}")
+        remaining = list(self.pending) + [ticker for _, _, ticker in self.delayed]
+        remaining += [ticker for ticker, _, _ in self.in_flight.values()]
+        for ticker in remaining:
+            self.failed[ticker] = reason
+        self.pending.clear()
+        self.delayed.clear()
+        self.in_flight.clear()
@@ -0,0 +1,216 @@
+import hashlib
+import json
+import os
+import shutil
+from typing import Callable, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from price_store import PricePanel, _save_array
+
+# Technical indicators shared by the screens, with a memo cache.
+#
+# Every indicator is computed for all symbols of a PricePanel at once and
+# returned as one value per panel row (NaN where the symbol does not have
+# enough history yet), so screens slice it with panel.rows()/offsets instead
+# of recomputing it per symbol and per script.
+#
+# Results are memoized by (symbol set, indicator, parameters, data version):
+#   - in memory on the panel, so the four pipelines and every screen in one
+#     engine run share a single computation;
+#   - on disk under price_data/indicator_cache/<store version>/ for panels
+#     loaded from the store, so separate processes (the standalone scripts,
+#     the sentiment screens) reuse it until the store is rewritten.
+
+CACHE_DIR_NAME = "indicator_cache"
+RSI_PERIOD = 14
+
+# name -> function(panel, **params) -> per-row values
+INDICATORS: Dict[str, Callable] = {}
+
+
+def indicator_function(name: str):
+    """Register an indicator computed by `indicator(panel, name, **params)`"""
+    def register(func):
+        INDICATORS[name] = func
+        return func
+    return register
+
+
+def _symbol_ids(panel: PricePanel) -> np.ndarray:
+    return np.repeat(np.arange(len(panel)), panel.lengths)
+
+
+def _grouped(panel: PricePanel, values: np.ndarray):
+    """Per-symbol groupby over row-aligned values (rows are contiguous per symbol)"""
+    return pd.Series(values, dtype=np.float64).groupby(_symbol_ids(panel), sort=False)
+
+
+def _column(panel: PricePanel, column: str) -> np.ndarray:
+    return panel.columns[column].astype(np.float64, copy=False)
+
+
+def _changes(panel: PricePanel, column: str = 'Close') -> np.ndarray:
+    """Row-to-row change of `column` within each symbol (NaN on each symbol's first row)"""
+    values = _column(panel, column)
+    delta = np.full(len(values), np.nan)
+    delta[1:] = values[1:] - values[:-1]
+    delta[panel.offsets[:-1][panel.lengths > 0]] = np.nan
+    return delta
+
+
+@indicator_function("sma")
+def sma(panel: PricePanel, window: int, column: str = 'Close') -> np.ndarray:
+    """Simple moving average over the last `window` rows of each symbol"""
+    return _grouped(panel, _column(panel, column)).rolling(window=window, min_periods=window).mean().to_numpy()
+
+
+def _shifted_window(panel: PricePanel, column: str, window: int, shift: int):
+    """Rolling window over each symbol's `column`, ending `shift` rows before each row"""
+    values = _column(panel, column)
+    if shift:
+        values = _grouped(panel, values).shift(shift).to_numpy()
+    return _grouped(panel, values).rolling(window=window, min_periods=window)
+
+
+@indicator_function("rolling_max")
+def rolling_max(panel: PricePanel, window: int, column: str = 'High', shift: int = 0) -> np.ndarray:
+    """Highest value of the `window` rows ending `shift` rows before each row"""
+    return _shifted_window(panel, column, window, shift).max().to_numpy()
+
+
+@indicator_function("rolling_min")
+def rolling_min(panel: PricePanel, window: int, column: str = 'Low', shift: int = 0) -> np.ndarray:
+    """Lowest value of the `window` rows ending `shift` rows before each row"""
+    return _shifted_window(panel, column, window, shift).min().to_numpy()
+
+
+@indicator_function("rsi")
+def rsi(panel: PricePanel, period: int = RSI_PERIOD) -> np.ndarray:
+    """
+    Simple-moving-average RSI of the closes (the top_rsi screens).
+
+    Missing changes count as 0, no losses gives 100 and a window without
+    any change gives NaN.
+    """
+    delta = _changes(panel)
+    gain = np.where(delta > 0, delta, 0.0)
+    loss = np.where(delta < 0, -delta, 0.0)
+    avg_gain = _grouped(panel, gain).rolling(window=period).mean().to_numpy()
+    avg_loss = _grouped(panel, loss).rolling(window=period).mean().to_numpy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 100 - (100 / (1 + avg_gain / avg_loss))
+
+
+@indicator_function("ewm_rsi")
+def ewm_rsi(panel: PricePanel, period: int = RSI_PERIOD) -> np.ndarray:
+    """Exponentially weighted RSI of the closes (the market sentiment screens)"""
+    delta = _changes(panel)
+    up = np.clip(delta, 0, None)
+    down = -np.clip(delta, None, 0)
+    ma_up = _grouped(panel, up).ewm(com=period - 1, adjust=True, min_periods=period).mean().to_numpy()
+    ma_down = _grouped(panel, down).ewm(com=period - 1, adjust=True, min_periods=period).mean().to_numpy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 100 - (100 / (1 + ma_up / ma_down))
+
+
+class IndicatorCache:
+    """Memo of the indicators computed for one panel, persisted per store version"""
+
+    def __init__(self, panel: PricePanel) -> None:
+        self.panel = panel
+        self.cache_dir = None
+        if panel.version and panel.store_dir:
+            self.cache_dir = os.path.join(os.path.dirname(panel.store_dir), CACHE_DIR_NAME, panel.version)
+
+        # Symbol set of the panel, including how many rows each symbol has
+        digest = hashlib.sha1()
+        digest.update("\n".join(panel.symbols.tolist()).encode())
+        digest.update(panel.offsets.tobytes())
+        self.symbols_digest = digest.hexdigest()
+
+    def key(self, name: str, params: Dict) -> str:
+        payload = json.dumps([self.symbols_digest, name, params, self.panel.version], sort_keys=True)
+        return f"{name}-{hashlib.sha1(payload.encode()).hexdigest()[:20]}"
+
+    def _read(self, key: str) -> Optional[np.ndarray]:
+        if self.cache_dir is None:
+            return None
+        path = os.path.join(self.cache_dir, f"{key}.npy")
+        try:
+            values = np.load(path, allow_pickle=False)
+        except (OSError, ValueError):
+            return None
+        return values if len(values) == len(self.panel.df) else None
+
+    def _write(self, key: str, values: np.ndarray) -> None:
+        if self.cache_dir is None:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            _save_array(self.cache_dir, key, values)
+        except OSError as e:
+            print(f"Could not persist indicator {key}: {e}")
+            return
+
+        # Indicators of older store versions can never be hit again
+        versions_dir = os.path.dirname(self.cache_dir)
+        for version in os.listdir(versions_dir):
+            if version != self.panel.version:
+                shutil.rmtree(os.path.join(versions_dir, version), ignore_errors=True)
+
+    def get(self, name: str, **params) -> np.ndarray:
+        key = self.key(name, params)
+
+        def build():
+            values = self._read(key)
+            if values is None:
+                values = INDICATORS[name](self.panel, **params)
+                self._write(key, values)
+            return values
+        return self.panel.cached(('indicator', key), build)
+
+
+def indicator(panel: PricePanel, name: str, **params) -> np.ndarray:
+    """
+    Values of a registered indicator for every row of the panel, computed at
+    most once per (symbol set, indicator, parameters, data version).
+    """
+    return panel.cached('indicators', lambda: IndicatorCache(panel)).get(name, **params)
+
+
+def last_values(panel: PricePanel, values: np.ndarray, skipna: bool = False) -> pd.Series:
+    """Each symbol's value on its last row (last non-NaN value with skipna, like groupby().last()), indexed by symbol"""
+    rows = panel.offsets[1:] - 1
+    if skipna and len(values):
+        rows = np.maximum.reduceat(np.where(np.isnan(values), -1, np.arange(len(values))), panel.offsets[:-1])
+    last = np.where(rows >= 0, values[np.maximum(rows, 0)], np.nan)
+    return pd.Series(last, index=panel.symbols.astype(object))
+
+
+def max_rsi(panel: PricePanel, months: int, symbols=None, period: int = RSI_PERIOD) -> pd.Series:
+    """
+    Highest RSI of each symbol over the last `months` months (counted back from
+    the latest date of the selected symbols).
+
+    Like the original per-window calculation, a symbol needs at least
+    period + 1 rows in the window and the first `period` - 1 rows of the
+    window are not considered.
+    """
+    rows = panel.rows(symbols)
+    frame = pd.DataFrame({
+        'Symbol': panel.df['Symbol'].to_numpy()[rows],
+        'Date': panel.dates[rows],
+        'RSI': indicator(panel, 'rsi', period=period)[rows],
+    })
+    if frame.empty:
+        return pd.Series(dtype=np.float64)
+
+    cutoff = pd.Timestamp(frame['Date'].max()) - pd.DateOffset(months=months)
+    window = frame[frame['Date'] >= cutoff]
+    grouped = window.groupby('Symbol', sort=False)
+    position = grouped.cumcount()
+    counts = grouped['RSI'].transform('size')
+    window = window[(counts >= period + 1) & (position >= period - 1)]
+    return window.groupby('Symbol', sort=False)['RSI'].max().dropna()
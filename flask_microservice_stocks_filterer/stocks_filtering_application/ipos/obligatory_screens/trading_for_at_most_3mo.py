@@ -1,50 +1,34 @@
 import csv
-from datetime import datetime, timedelta
+import os
+import sys
+import numpy as np
+
+# Make the shared modules in stocks_filtering_application importable
+app_dir = os.path.dirname(os.path.abspath(__file__))
+while not app_dir.endswith("flask_microservice_stocks_filterer") and os.path.dirname(app_dir) != app_dir:
+    app_dir = os.path.dirname(app_dir)
+sys.path.append(os.path.join(app_dir, "stocks_filtering_application"))
+from price_store import iter_symbol_arrays
 
-def process_recent_stocks(input_file, output_file, max_months=12):
-    stocks = {}
+def process_recent_stocks(output_file, max_months=12):
     skipped_rows = 0
-    
-    # Read the CSV file and process the data
-    with open(input_file, 'r') as file:
-        csv_reader = csv.DictReader(file)
-        for row_num, row in enumerate(csv_reader, start=2):  # Start at 2 to account for header row
-            symbol = row['Symbol']
-            date_str = row['Date'].split()[0] if row['Date'] else None
-            close_price_str = row['Close']
-            
-            # Skip rows with missing data
-            if not symbol or not date_str or not close_price_str:
-                skipped_rows += 1
-                continue
-            
-            try:
-                date = datetime.strptime(date_str, '%Y-%m-%d')
-                close_price = float(close_price_str)
-            except ValueError as e:
-                print(f"Error processing row {row_num}: {e}")
-                skipped_rows += 1
-                continue
-            
-            if symbol not in stocks:
-                stocks[symbol] = {'prices': [], 'dates': []}
-            
-            stocks[symbol]['prices'].append(close_price)
-            stocks[symbol]['dates'].append(date)
 
     # Filter stocks trading for at most `max_months` months
     qualified_stocks = []
-    for symbol, data in stocks.items():
-        dates = data['dates']
+    for symbol, dates, values in iter_symbol_arrays(['Close']):
+        # Skip rows with missing data
+        valid = ~np.isnan(values['Close'])
+        skipped_rows += int((~valid).sum())
+        dates = dates[valid]
         
-        if not dates:
+        if len(dates) == 0:
             continue
         
-        first_date = min(dates)
-        latest_date = max(dates)
+        first_date = dates.min()
+        latest_date = dates.max()
         
         # Check if the stock has been trading for at most `max_months` months
-        if (latest_date - first_date) <= timedelta(days=max_months * 30):
+        if (latest_date - first_date) <= np.timedelta64(max_months * 30, 'D'):
             qualified_stocks.append(symbol)
 
     # Write the qualified stocks to a new CSV file
@@ -58,21 +42,14 @@ def process_recent_stocks(input_file, output_file, max_months=12):
     print(f"Skipped {skipped_rows} rows due to missing or invalid data.")
 
 # Usage
-import os
-
 # Get the absolute path of the current script
-
 script_dir = os.path.dirname(os.path.abspath(__file__))
 # Find the absolute path of the "flask_microservice_stocks_filterer" directory
 while not script_dir.endswith("flask_microservice_stocks_filterer") and os.path.dirname(script_dir) != script_dir:
     script_dir = os.path.dirname(script_dir)
 
-# Append the correct relative path to the input file
-input_file = os.path.join(script_dir, "stocks_filtering_application", "price_data", "all_tickers_historical.csv")
-
 # Define the output file
 output_file = os.path.join(script_dir, "stocks_filtering_application", "ipos", "obligatory_screens", "results", "trading_for_at_most_3mo.csv")
 
-print(f"Resolved input file path: {input_file}")
 print(f"Resolved output file path: {output_file}")
-process_recent_stocks(input_file, output_file, max_months=12)
\ No newline at end of file
+process_recent_stocks(output_file, max_months=12)
\ No newline at end of file
@@ -1,36 +1,22 @@
-import csv
-
-def filter_stock_data(stocks_to_screen_file, all_stocks_data_file, output_file):
-    # Read the stocks to screen
-    with open(stocks_to_screen_file, 'r') as f:
-        reader = csv.reader(f)
-        next(reader)  # Skip header
-        stocks_to_screen = set(row[0] for row in reader)
-
-    # Read all stocks data and write filtered data to output file
-    with open(all_stocks_data_file, 'r') as input_file, open(output_file, 'w', newline='') as output_file:
-        reader = csv.reader(input_file)
-        writer = csv.writer(output_file)
-
-        # Write header and find Symbol column index
-        header = next(reader)
-        writer.writerow(header)
-        try:
-            symbol_index = header.index('Symbol')
-        except ValueError:
-            print(f"Error: 'Symbol' column not found in {all_stocks_data_file}")
-            return
-
-        # Filter and write data
-        for row in reader:
-            if row[symbol_index] in stocks_to_screen:
-                writer.writerow(row)
-
-    print(f"Filtered data has been written to {output_file}")
-
-# Usage
 import os
+import sys
+
+# Make the shared modules in stocks_filtering_application importable
+app_dir = os.path.dirname(os.path.abspath(__file__))
+while not app_dir.endswith("flask_microservice_stocks_filterer") and os.path.dirname(app_dir) != app_dir:
+    app_dir = os.path.dirname(app_dir)
+sys.path.append(os.path.join(app_dir, "stocks_filtering_application"))
+from price_store import load_prices, read_symbol_file
 
+def filter_stock_data(stocks_to_screen_file, output_file):
+    """Export the price rows of the screened stocks from the price store to a CSV."""
+    stocks_to_screen = read_symbol_file(stocks_to_screen_file)
+    df = load_prices(symbols=stocks_to_screen)
+    df.to_csv(output_file, index=False)
+
+    print(f"Filtered data for {df['Symbol'].nunique()} stocks has been written to {output_file}")
+
+# Usage
 # Get the absolute path of the current script
 script_dir = os.path.dirname(os.path.abspath(__file__))
 
@@ -41,8 +27,7 @@ while not script_dir.endswith("flask_microservice_stocks_filterer") and os.path.
 # Define the file paths dynamically
 stocks_to_screen_file = os.path.join(script_dir, "stocks_filtering_application", "ipos", "banned_stocks", "stocks_not_banned.csv")
 
-all_stocks_data_file3 = os.path.join(script_dir, "stocks_filtering_application", "price_data", "all_tickers_historical.csv")
 output_file3 = os.path.join(script_dir, "stocks_filtering_application", "ipos", "ranking_screens", "passed_stocks_input_data", "filtered_price_data.csv")
 
 
-filter_stock_data(stocks_to_screen_file, all_stocks_data_file3, output_file3)
\ No newline at end of file
+filter_stock_data(stocks_to_screen_file, output_file3)
\ No newline at end of file
@@ -1,5 +1,13 @@
 import pandas as pd
 import os
+import sys
+
+# Make the shared modules in stocks_filtering_application importable
+app_dir = os.path.dirname(os.path.abspath(__file__))
+while not app_dir.endswith("flask_microservice_stocks_filterer") and os.path.dirname(app_dir) != app_dir:
+    app_dir = os.path.dirname(app_dir)
+sys.path.append(os.path.join(app_dir, "stocks_filtering_application"))
+from price_store import load_prices, read_symbol_file
 
 def calculate_price_tightness(group):
     week_high = group['High'].max()
@@ -14,11 +22,11 @@ while not script_dir.endswith("flask_microservice_stocks_filterer") and os.path.
     script_dir = os.path.dirname(script_dir)
 
 # Append the correct relative path to the input and output files
-input_file = os.path.join(script_dir, "stocks_filtering_application", "ipos", "ranking_screens", "passed_stocks_input_data", "filtered_price_data.csv")
+stocks_to_screen_file = os.path.join(script_dir, "stocks_filtering_application", "ipos", "banned_stocks", "stocks_not_banned.csv")
 output_file = os.path.join(script_dir, "stocks_filtering_application", "ipos", "ranking_screens", "results", "top_price_tightness_1w.csv")
 
-# Read CSV with date parsing
-df = pd.read_csv(input_file, parse_dates=['Date'])
+# Load the screened stocks from the price store
+df = load_prices(symbols=read_symbol_file(stocks_to_screen_file))
 
 # Determine the latest date in the dataset
 latest_date = df['Date'].max()
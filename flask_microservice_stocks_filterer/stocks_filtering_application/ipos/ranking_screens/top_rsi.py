@@ -1,36 +1,13 @@
-import pandas as pd
 import os
-import numpy as np
+import sys
 
-def calculate_rsi(data, window=14):
-    """
-    Calculate the Relative Strength Index (RSI) for a given stock data.
-    
-    Parameters:
-    data (DataFrame): DataFrame containing 'Close' prices
-    window (int): Look-back period for RSI calculation, default is 14 days
-    
-    Returns:
-    Series: RSI values
-    """
-    # Calculate price changes
-    delta = data['Close'].diff()
-    
-    # Separate gains and losses
-    gain = delta.where(delta > 0, 0)
-    loss = -delta.where(delta < 0, 0)
-    
-    # Calculate average gain and average loss
-    avg_gain = gain.rolling(window=window).mean()
-    avg_loss = loss.rolling(window=window).mean()
-    
-    # Calculate RS (Relative Strength)
-    rs = avg_gain / avg_loss
-    
-    # Calculate RSI
-    rsi = 100 - (100 / (1 + rs))
-    
-    return rsi
+# Make the shared modules in stocks_filtering_application importable
+app_dir = os.path.dirname(os.path.abspath(__file__))
+while not app_dir.endswith("flask_microservice_stocks_filterer") and os.path.dirname(app_dir) != app_dir:
+    app_dir = os.path.dirname(app_dir)
+sys.path.append(os.path.join(app_dir, "stocks_filtering_application"))
+from price_store import PricePanel, read_symbol_file
+from screens import max_rsi_screen
 
 # Get the absolute path of the current script
 script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -40,55 +17,18 @@ while not script_dir.endswith("flask_microservice_stocks_filterer") and os.path.
     script_dir = os.path.dirname(script_dir)
 
 # Append the correct relative path to the input and output files
-input_file = os.path.join(script_dir, "stocks_filtering_application", "ipos", "ranking_screens", "passed_stocks_input_data", "filtered_price_data.csv")
+stocks_to_screen_file = os.path.join(script_dir, "stocks_filtering_application", "ipos", "banned_stocks", "stocks_not_banned.csv")
 output_file = os.path.join(script_dir, "stocks_filtering_application", "ipos", "ranking_screens", "results", "max_rsi_3m.csv")
 
-# Read CSV with date parsing
-df = pd.read_csv(input_file, parse_dates=['Date'])
+# Load the full history of the screened stocks; the RSI comes from the shared indicator cache
+panel = PricePanel.load(columns=['Close'], symbols=read_symbol_file(stocks_to_screen_file))
 
-# Determine the latest date in the dataset
-latest_date = df['Date'].max()
-
-# Filter data to only include the last 3 months
-three_months_ago = latest_date - pd.DateOffset(months=3)
-df_filtered = df[df['Date'] >= three_months_ago]
-
-# Initialize a dictionary to store maximum RSI values
-max_rsi_values = {}
-
-# Loop through each unique symbol
-for symbol in df_filtered['Symbol'].unique():
-    # Get data for this symbol
-    symbol_data = df_filtered[df_filtered['Symbol'] == symbol].sort_values('Date')
-    
-    # Calculate RSI if there's enough data (at least 15 trading days)
-    if len(symbol_data) >= 15:  # Ensure we have at least 15 days of data
-        symbol_data['RSI'] = calculate_rsi(symbol_data)
-        
-        # Check if RSI calculation was successful (not all NaN)
-        if not symbol_data['RSI'].isna().all():
-            # Find the maximum RSI value for this symbol (ignoring NaN values)
-            max_rsi = symbol_data['RSI'].max()
-            
-            # Store the result
-            max_rsi_values[symbol] = max_rsi
-    else:
-        # Skip symbols with insufficient data
-        print(f"Skipping {symbol}: Insufficient trading data (only {len(symbol_data)} days)")
-
-
-# Create a DataFrame with the results
-result_df = pd.DataFrame({
-    'Symbol': list(max_rsi_values.keys()),
-    'RSI_3M': list(max_rsi_values.values())
-})
-
-# Sort by maximum RSI in descending order
-result_df = result_df.sort_values('RSI_3M', ascending=False)
+# Maximum RSI over the last 3 months (symbols need at least 15 trading days in the period)
+result_df = max_rsi_screen(panel, None, 3, 'RSI_3M')
 
 # Write the results to the output CSV file
 result_df.to_csv(output_file, index=False)
 
 print(f"Top stocks by maximum RSI (last 3 months) have been saved to {output_file}")
 print(f"Total stocks analyzed: {len(result_df)}")
-print(f"Stocks excluded due to insufficient trading data: {len(df_filtered['Symbol'].unique()) - len(result_df)}")
\ No newline at end of file
+print(f"Stocks excluded due to insufficient trading data: {len(panel) - len(result_df)}")
\ No newline at end of file
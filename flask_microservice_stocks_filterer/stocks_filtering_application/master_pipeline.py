@@ -10,6 +10,7 @@ import threading
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from pipeline_status import PipelineStatus
+from screening_engine import run_all_pipelines
 import psutil
 
 # Get the current script's directory
@@ -74,16 +75,17 @@ def parse_args():
     parser.add_argument("--fetch-data", action="store_true", help="Fetch stock data before running pipelines")
     parser.add_argument("--sleep-after", action="store_true", help="Put computer to sleep after completion")
     parser.add_argument("--skip-sentiment", action="store_true", help="Skip sentiment analysis steps")
+    parser.add_argument("--subprocess-pipelines", action="store_true",
+                        help="Run each pipeline's stock_screening_pipeline.py as a subprocess instead of the in-process engine")
     return parser.parse_args()
 
 
 def run_sentiment_scripts():
-    sentiment_screens_script = os.path.join(script_dir, "market_sentiment_screens", "sentiment_screens_handler.py")
-    sentiment_graphs_script = os.path.join(script_dir, "sentiment_graphs", "sentiment_graphs_runner.py")
+    # Sentiment screens, history and graphs in one pass of the breadth engine
+    breadth_script = os.path.join(script_dir, "breadth.py")
 
     logging.info("Running sentiment analysis scripts...")
-    run_script(sentiment_screens_script)
-    run_script(sentiment_graphs_script)
+    run_script(breadth_script)
     logging.info("Sentiment analysis scripts completed.")
 
 
@@ -195,9 +197,12 @@ def main():
         else:
             logging.info("Skipping data fetch, using existing data...")
 
-        # Run pipelines in parallel
         status_tracker.update_step("Running pipelines")
-        run_all_pipelines_parallel(args.price_increase, args.top_n, status_tracker)
+        if args.subprocess_pipelines:
+            run_all_pipelines_parallel(args.price_increase, args.top_n, status_tracker)
+        else:
+            # Load the price data once and run every pipeline in this process
+            run_all_pipelines(args.price_increase, args.top_n, status_tracker=status_tracker)
         
         # if not args.skip_sentiment:
         #     logging.info("Running sentiment analysis...")
@@ -1,7 +1,15 @@
 import csv
-from datetime import datetime, timedelta
+import os
 import sys
-from collections import defaultdict
+import numpy as np
+from datetime import datetime, timedelta
+
+# Make the shared modules in stocks_filtering_application importable
+app_dir = os.path.dirname(os.path.abspath(__file__))
+while not app_dir.endswith("flask_microservice_stocks_filterer") and os.path.dirname(app_dir) != app_dir:
+    app_dir = os.path.dirname(app_dir)
+sys.path.append(os.path.join(app_dir, "stocks_filtering_application"))
+from price_store import iter_symbol_arrays
 
 def calculate_price_increase(highs, lows):
     if not highs or not lows:  # Check if lists are empty
@@ -15,48 +23,25 @@ def calculate_price_increase(highs, lows):
         
     return (year_high - year_low) / year_low * 100
 
-def process_stocks(input_file, output_file, minimum_percentage, N):
-    # Dictionary to store high and low prices for each symbol
-    stocks = defaultdict(lambda: {'highs': [], 'lows': []})
+def process_stocks(output_file, minimum_percentage, N):
     skipped_rows = 0
 
     # Define the cutoff date for filtering (last year)
-    cutoff_date = datetime.today() - timedelta(days=365)
-
-    # Read the CSV file and process the data
-    with open(input_file, 'r') as file:
-        csv_reader = csv.DictReader(file)
-        for row_num, row in enumerate(csv_reader, start=2):
-            symbol = row['Symbol']
-            date_str = row['Date'].split()[0] if row['Date'] else None
-            
-            try:
-                high_price = float(row['High'])
-                low_price = float(row['Low'])
-                date = datetime.strptime(date_str, '%Y-%m-%d')
-
-                # Skip data older than the last year
-                if date < cutoff_date:
-                    continue
-                
-                # Skip if prices are invalid
-                if high_price <= 0 or low_price <= 0:
-                    skipped_rows += 1
-                    continue
-                    
-            except (ValueError, KeyError) as e:
-                print(f"Error processing row {row_num}: {e}")
-                skipped_rows += 1
-                continue
-            
-            # Store high and low prices within the last year
-            stocks[symbol]['highs'].append(high_price)
-            stocks[symbol]['lows'].append(low_price)
+    cutoff_date = np.datetime64(datetime.today() - timedelta(days=365))
 
     # Calculate price increases for each stock
     qualified_stocks = []
-    for symbol, data in stocks.items():
-        price_increase = calculate_price_increase(data['highs'], data['lows'])
+    for symbol, dates, values in iter_symbol_arrays(['High', 'Low']):
+        # Skip data older than the last year
+        recent = dates >= cutoff_date
+        highs = values['High'][recent]
+        lows = values['Low'][recent]
+
+        # Skip if prices are invalid
+        valid = (highs > 0) & (lows > 0)
+        skipped_rows += int((~valid).sum())
+
+        price_increase = calculate_price_increase(highs[valid].tolist(), lows[valid].tolist())
         
         if price_increase is not None and price_increase >= minimum_percentage:
             qualified_stocks.append((symbol, price_increase))
@@ -88,8 +73,6 @@ if __name__ == "__main__":
         print("Error: minimum_percentage must be a number")
         sys.exit(1)
 
-    import os
-
     # Get the absolute path of the current script
     script_dir = os.path.dirname(os.path.abspath(__file__))
 
@@ -97,12 +80,8 @@ if __name__ == "__main__":
     while not script_dir.endswith("flask_microservice_stocks_filterer") and os.path.dirname(script_dir) != script_dir:
         script_dir = os.path.dirname(script_dir)
 
-    # Append the correct relative path to the input file
-    input_file = os.path.join(script_dir, "stocks_filtering_application", "price_data", "all_tickers_historical.csv")
-
     # Define the output file
     output_file = os.path.join(script_dir, "stocks_filtering_application", "minervini_1mo", "obligatory_screens", "results", "minimum_price_increase.csv")
 
-    print(f"Resolved input file path: {input_file}")
     print(f"Resolved output file path: {output_file}")
-    process_stocks(input_file, output_file, minimum_percentage, N)
+    process_stocks(output_file, minimum_percentage, N)
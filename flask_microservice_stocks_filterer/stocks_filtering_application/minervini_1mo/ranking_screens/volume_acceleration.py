@@ -1,42 +1,33 @@
 import csv
+import os
+import sys
+import numpy as np
 from datetime import datetime, timedelta
-import statistics
-
-def calculate_volume_acceleration(file_path, output_path):
-    stocks = {}
-
-    # Read the CSV file
-    with open(file_path, 'r') as csvfile:
-        reader = csv.DictReader(csvfile)
-        for row in reader:
-            symbol = row['Symbol']
-            date = datetime.strptime(row['Date'].split()[0], '%Y-%m-%d')
-            volume = int(row['Volume'])
 
-            if symbol not in stocks:
-                stocks[symbol] = []
-            stocks[symbol].append((date, volume))
+# Make the shared modules in stocks_filtering_application importable
+app_dir = os.path.dirname(os.path.abspath(__file__))
+while not app_dir.endswith("flask_microservice_stocks_filterer") and os.path.dirname(app_dir) != app_dir:
+    app_dir = os.path.dirname(app_dir)
+sys.path.append(os.path.join(app_dir, "stocks_filtering_application"))
+from price_store import iter_symbol_arrays, read_symbol_file
 
+def calculate_volume_acceleration(stocks_to_screen_file, output_path):
     # Calculate volume acceleration for each stock
     accelerated_stocks = []
-    two_months_ago = datetime.now() - timedelta(days=60)
+    two_months_ago = np.datetime64(datetime.now() - timedelta(days=60))
 
-    for symbol, data in stocks.items():
-        # Sort data by date
-        data.sort(key=lambda x: x[0])
+    for symbol, dates, values in iter_symbol_arrays(['Volume'], symbols=read_symbol_file(stocks_to_screen_file)):
+        volumes = values['Volume']
 
         # Filter data for the last 2 months
-        recent_data = [d for d in data if d[0] >= two_months_ago]
+        recent_volumes = volumes[dates >= two_months_ago]
 
-        if len(recent_data) < 2:
+        if len(recent_volumes) < 2:
             continue
 
         # Calculate average volume for the entire period and the last 2 months
-        all_volumes = [d[1] for d in data]
-        recent_volumes = [d[1] for d in recent_data]
-
-        avg_volume_all = statistics.mean(all_volumes)
-        avg_volume_recent = statistics.mean(recent_volumes)
+        avg_volume_all = volumes.mean()
+        avg_volume_recent = recent_volumes.mean()
 
         # Calculate volume acceleration, handling the case where avg_volume_all is zero
         if avg_volume_all == 0:
@@ -59,8 +50,6 @@ def calculate_volume_acceleration(file_path, output_path):
 
     print(f"Volume Acceleration Analysis complete. {len(accelerated_stocks)} Results saved to {output_path}")
 
-import os
-
 # Get the absolute path of the current script
 script_dir = os.path.dirname(os.path.abspath(__file__))
 
@@ -69,6 +58,6 @@ while not script_dir.endswith("flask_microservice_stocks_filterer") and os.path.
     script_dir = os.path.dirname(script_dir)
 
 # Append the correct relative path to the input and output files
-input_file = os.path.join(script_dir, "stocks_filtering_application", "minervini_1mo", "ranking_screens", "passed_stocks_input_data", "filtered_price_data.csv")
+stocks_to_screen_file = os.path.join(script_dir, "stocks_filtering_application", "minervini_1mo", "banned_stocks", "stocks_not_banned.csv")
 output_file = os.path.join(script_dir, "stocks_filtering_application", "minervini_1mo", "ranking_screens", "results", "volume_acceleration_stocks.csv")
-calculate_volume_acceleration(input_file, output_file)
\ No newline at end of file
+calculate_volume_acceleration(stocks_to_screen_file, output_file)
\ No newline at end of file
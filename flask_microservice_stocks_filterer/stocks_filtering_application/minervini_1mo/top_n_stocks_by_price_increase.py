@@ -15,9 +15,9 @@ def wait_for_file(file_path, max_attempts=5, wait_time=60):
         attempts += 1
     return False  # File still not found after max attempts
 
-def process_csv_files(directory, top_n, output_file, exclusion_file):
-    # Ensure the exclusion file exists (wait for it)
-    if not wait_for_file(exclusion_file):
+def process_csv_files(directory, top_n, output_file, exclusion_file=None):
+    # Ensure the exclusion file exists (wait for it); None ranks without exclusions
+    if exclusion_file is not None and not wait_for_file(exclusion_file):
         print(f"Error: '{exclusion_file}' not found after multiple attempts. Exiting.")
         return
 
@@ -47,16 +47,17 @@ def process_csv_files(directory, top_n, output_file, exclusion_file):
 
     # Read exclusion list (symbols that should be removed)
     excluded_symbols = set()
-    try:
-        with open(exclusion_file, 'r') as file:
-            reader = csv.reader(file)
-            next(reader)  # Skip header
-            for row in reader:
-                if row:
-                    excluded_symbols.add(row[0].strip())  # Store only the symbol column
-    except Exception as e:
-        print(f"Error processing exclusion file '{exclusion_file}': {str(e)}")
-        return
+    if exclusion_file is not None:
+        try:
+            with open(exclusion_file, 'r') as file:
+                reader = csv.reader(file)
+                next(reader)  # Skip header
+                for row in reader:
+                    if row:
+                        excluded_symbols.add(row[0].strip())  # Store only the symbol column
+        except Exception as e:
+            print(f"Error processing exclusion file '{exclusion_file}': {str(e)}")
+            return
 
     # Process all other CSV files in the directory
     for filename in os.listdir(directory):
@@ -1,60 +1,19 @@
 import csv
-from datetime import datetime
 import os
+import sys
 
-def process_stocks(input_file, output_file):
-    stocks = {}
-    skipped_rows = 0
-    
-    # Read the CSV file and process the data
-    with open(input_file, 'r') as file:
-        csv_reader = csv.DictReader(file)
-        for row_num, row in enumerate(csv_reader, start=2):  # Start at 2 to account for header row
-            symbol = row['Symbol']
-            date_str = row['Date'].split()[0] if row['Date'] else None
-            close_price_str = row['Close']
-            
-            # Skip rows with missing data
-            if not symbol or not date_str or not close_price_str:
-                skipped_rows += 1
-                continue
-            
-            try:
-                date = datetime.strptime(date_str, '%Y-%m-%d')
-                close_price = float(close_price_str)
-            except ValueError as e:
-                print(f"Error processing row {row_num}: {e}")
-                skipped_rows += 1
-                continue
-            
-            if symbol not in stocks:
-                stocks[symbol] = {'prices': [], 'dates': []}
-            
-            stocks[symbol]['prices'].append(close_price)
-            stocks[symbol]['dates'].append(date)
+# Make the shared modules in stocks_filtering_application importable
+app_dir = os.path.dirname(os.path.abspath(__file__))
+while not app_dir.endswith("flask_microservice_stocks_filterer") and os.path.dirname(app_dir) != app_dir:
+    app_dir = os.path.dirname(app_dir)
+sys.path.append(os.path.join(app_dir, "stocks_filtering_application"))
+from price_store import PricePanel, load_prices
+from trend_template import passing_symbols
 
+def process_stocks(output_file):
     # Find stocks that are at least 30% above their 52-week low
-    qualified_stocks = []
-    for symbol, data in stocks.items():
-        prices = data['prices']
-        dates = data['dates']
-        
-        if not prices or not dates:
-            continue
-        
-        # Find the 52-week period
-        latest_date = max(dates)
-        one_year_ago = latest_date.replace(year=latest_date.year - 1)
-        
-        # Filter prices within the last 52 weeks
-        prices_52_weeks = [price for price, date in zip(prices, dates) if date >= one_year_ago]
-        
-        if prices_52_weeks:
-            low_52_week = min(prices_52_weeks)
-            current_price = prices[-1]
-            
-            if current_price >= low_52_week * 1.30:
-                qualified_stocks.append(symbol)
+    panel = PricePanel(load_prices(['Close']))
+    qualified_stocks = passing_symbols(panel, ['above_52week_low'])
 
     # Write the qualified stocks to a new CSV file
     with open(output_file, 'w', newline='') as file:
@@ -64,9 +23,6 @@ def process_stocks(input_file, output_file):
             csv_writer.writerow([symbol])
 
     print(f"Above 52 week low analysis complete. {len(qualified_stocks)} stocks meeting the criteria have been saved to {output_file}.")
-    print(f"Skipped {skipped_rows} rows due to missing or invalid data.")
-
-import os
 
 # Get the absolute path of the current script
 
@@ -75,14 +31,10 @@ script_dir = os.path.dirname(os.path.abspath(__file__))
 while not script_dir.endswith("flask_microservice_stocks_filterer") and os.path.dirname(script_dir) != script_dir:
     script_dir = os.path.dirname(script_dir)
 
-# Append the correct relative path to the input file
-input_file = os.path.join(script_dir, "stocks_filtering_application", "price_data", "all_tickers_historical.csv")
-
 # Define the output file
 output_file = os.path.join(script_dir, "stocks_filtering_application", "minervini_1mo_unbanned", "obligatory_screens", "results", "above_52week_low.csv")
 
-print(f"Resolved input file path: {input_file}")
 print(f"Resolved output file path: {output_file}")
 
 # Run the function
-process_stocks(input_file, output_file)
\ No newline at end of file
+process_stocks(output_file)
\ No newline at end of file
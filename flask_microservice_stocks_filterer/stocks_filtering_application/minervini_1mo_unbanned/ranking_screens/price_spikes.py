@@ -1,10 +1,18 @@
 import pandas as pd
-import numpy as np
 from datetime import datetime, timedelta
+import os
+import sys
+
+# Make the shared modules in stocks_filtering_application importable
+app_dir = os.path.dirname(os.path.abspath(__file__))
+while not app_dir.endswith("flask_microservice_stocks_filterer") and os.path.dirname(app_dir) != app_dir:
+    app_dir = os.path.dirname(app_dir)
+sys.path.append(os.path.join(app_dir, "stocks_filtering_application"))
+from price_store import load_prices, read_symbol_file
 
-def analyze_stocks(input_file, output_file):
-    # Read the CSV file
-    df = pd.read_csv(input_file, parse_dates=['Date'])
+def analyze_stocks(stocks_to_screen_file, output_file):
+    # Load the screened stocks from the price store
+    df = load_prices(symbols=read_symbol_file(stocks_to_screen_file))
     
     # Group by Symbol
     grouped = df.groupby('Symbol')
@@ -47,8 +55,6 @@ def analyze_stocks(input_file, output_file):
     print(f"Analysis complete. Results saved to {output_file}")
 
 # Usage
-import os
-
 # Get the absolute path of the current script
 script_dir = os.path.dirname(os.path.abspath(__file__))
 
@@ -57,7 +63,7 @@ while not script_dir.endswith("flask_microservice_stocks_filterer") and os.path.
     script_dir = os.path.dirname(script_dir)
 
 # Append the correct relative path to the input and output files
-input_file = os.path.join(script_dir, "stocks_filtering_application", "minervini_1mo_unbanned", "ranking_screens", "passed_stocks_input_data", "filtered_price_data.csv")
+stocks_to_screen_file = os.path.join(script_dir, "stocks_filtering_application", "minervini_1mo_unbanned", "obligatory_screens", "results", "obligatory_passed_stocks.csv")
 output_file = os.path.join(script_dir, "stocks_filtering_application", "minervini_1mo_unbanned", "ranking_screens", "results", "price_spikes.csv")
 
-analyze_stocks(input_file, output_file)
\ No newline at end of file
+analyze_stocks(stocks_to_screen_file, output_file)
\ No newline at end of file
@@ -0,0 +1,113 @@
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from price_store import PricePanel
+
+# MVP (momentum, volume, price) window scanner.
+#
+# A 15-day window qualifies when the stock is up on at least 12 of its 14
+# day-over-day changes, the window's average volume is at least 25% above the
+# 50-day volume average as of the window's first day, and the close rises at
+# least 20% from the first to the last day of the window.
+#
+# Up-day counts and volume averages come from cumulative sums over the whole
+# panel, so every candidate window of every symbol is checked in a fixed
+# number of array operations (O(rows) overall) instead of slicing, copying
+# and re-sorting a DataFrame per window.
+
+WINDOW_DAYS = 15
+MIN_UP_DAYS = 12
+VOLUME_MA_DAYS = 50
+MIN_VOLUME_INCREASE = 0.25
+MIN_PRICE_INCREASE = 20
+
+
+def _prefix_sums(values: np.ndarray):
+    """Prefix sums and prefix counts of the non-missing values (exact for integer volumes)"""
+    if np.issubdtype(values.dtype, np.integer):
+        sums = np.concatenate([[0], np.cumsum(values, dtype=np.int64)])
+        counts = np.arange(len(values) + 1)
+    else:
+        present = ~np.isnan(values)
+        sums = np.concatenate([[0.0], np.cumsum(np.where(present, values, 0.0))])
+        counts = np.concatenate([[0], np.cumsum(present)])
+    return sums, counts
+
+
+def mvp_windows(panel: PricePanel, symbols: Optional[Iterable[str]] = None,
+                lookback_days: int = 180) -> pd.DataFrame:
+    """
+    Every qualifying MVP window that starts within `lookback_days` of each symbol's last date.
+
+    Returns:
+        DataFrame with Symbol, Window_Start, Window_End, Up_Days,
+        Volume_Increase_Pct and Price_Increase_Pct, one row per window,
+        ordered by symbol and window start.
+    """
+    if symbols is not None:
+        panel = PricePanel(panel.frame(symbols))
+
+    closes = panel.columns['Close'].astype(np.float64, copy=False)
+    volumes = panel.columns['Volume']
+    dates = panel.dates
+    rows = len(closes)
+    if rows == 0:
+        return pd.DataFrame(columns=['Symbol', 'Window_Start', 'Window_End', 'Up_Days',
+                                     'Volume_Increase_Pct', 'Price_Increase_Pct'])
+
+    symbol_ids = np.repeat(np.arange(len(panel)), panel.lengths)
+    segment_starts = panel.offsets[:-1][symbol_ids]
+    segment_ends = panel.offsets[1:][symbol_ids]
+
+    # Candidate starts: the window fits in the symbol's history and starts within the lookback
+    starts = np.arange(rows)
+    cutoffs = dates[panel.offsets[1:] - 1] - np.timedelta64(lookback_days, 'D')
+    candidates = (starts + WINDOW_DAYS <= segment_ends) & (dates >= cutoffs[symbol_ids])
+    starts = starts[candidates]
+    ends = starts + WINDOW_DAYS - 1
+
+    # 1. Momentum: up days among the 14 changes inside the window
+    up = np.zeros(rows, dtype=np.int64)
+    up[1:] = closes[1:] > closes[:-1]
+    up_sums = np.concatenate([[0], np.cumsum(up)])
+    up_days = up_sums[ends + 1] - up_sums[starts + 1]
+
+    # 2. Volume: window average against the 50-day average ending on the window's first day
+    volume_sums, volume_counts = _prefix_sums(volumes)
+    reference_starts = np.maximum(segment_starts[candidates], starts - VOLUME_MA_DAYS + 1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        window_volume = (volume_sums[ends + 1] - volume_sums[starts]) / (volume_counts[ends + 1] - volume_counts[starts])
+        reference_volume = ((volume_sums[starts + 1] - volume_sums[reference_starts])
+                            / (volume_counts[starts + 1] - volume_counts[reference_starts]))
+        volume_increase = window_volume / reference_volume - 1
+
+        # 3. Price: close-to-close change over the window
+        first_close, last_close = closes[starts], closes[ends]
+        price_increase = ((last_close / first_close) - 1) * 100
+
+    valid_reference = ~np.isnan(reference_volume) & (reference_volume != 0)
+    valid_price = (first_close != 0) & ~np.isnan(first_close) & ~np.isnan(last_close)
+    qualifies = ((up_days >= MIN_UP_DAYS)
+                 & valid_reference & (volume_increase >= MIN_VOLUME_INCREASE)
+                 & valid_price & (price_increase >= MIN_PRICE_INCREASE))
+
+    starts, ends = starts[qualifies], ends[qualifies]
+    return pd.DataFrame({
+        'Symbol': panel.symbols[symbol_ids[starts]].astype(object),
+        'Window_Start': dates[starts],
+        'Window_End': dates[ends],
+        'Up_Days': up_days[qualifies],
+        'Volume_Increase_Pct': volume_increase[qualifies] * 100,
+        'Price_Increase_Pct': price_increase[qualifies],
+    })
+
+
+def mvp_summary(windows: pd.DataFrame) -> pd.DataFrame:
+    """One row per symbol with at least one MVP window, listing where the windows start"""
+    if windows.empty:
+        return pd.DataFrame(columns=['Symbol', 'MVP_Last_6Mo', 'Window_Starts'])
+    starts = pd.to_datetime(windows['Window_Start']).dt.strftime('%Y-%m-%d')
+    grouped = starts.groupby(windows['Symbol'], sort=False).agg(';'.join)
+    return pd.DataFrame({'Symbol': grouped.index, 'MVP_Last_6Mo': 1, 'Window_Starts': grouped.values})
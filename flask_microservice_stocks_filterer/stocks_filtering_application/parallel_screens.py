@@ -0,0 +1,177 @@
+import atexit
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from price_store import PricePanel, _selected_symbols
+
+# Process-pool executor for per-symbol screens.
+#
+# The panel's dates, offsets and numeric columns are copied once into
+# multiprocessing.shared_memory blocks. Worker processes attach to them and
+# build zero-copy numpy views, so a task only carries a chunk of symbol
+# positions, never price data. Each worker calls the screen's per-symbol
+# function on its chunk; the chunks come back in symbol order and are merged
+# into one list.
+#
+# The per-symbol function has the iter_symbols contract,
+#     func(symbol, dates, {column: values}) -> result or None,
+# and has to be a module-level function (or a functools.partial of one) so it
+# can be pickled. Small universes run serially, where the pool would cost
+# more than it saves.
+
+DEFAULT_PROCESSES = os.cpu_count() or 1
+MIN_PARALLEL_SYMBOLS = 2000
+CHUNKS_PER_PROCESS = 4
+
+# (shared memory name, shape, dtype) per array
+ArraySpec = Dict[str, Tuple[str, Tuple[int, ...], str]]
+
+_processes = DEFAULT_PROCESSES
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+_shared_panels: List["SharedPanelArrays"] = []
+
+
+def configure(processes: Optional[int] = None) -> None:
+    """Set the number of worker processes (defaults to the CPU count); 1 runs every screen serially"""
+    global _processes
+    _processes = max(1, processes or DEFAULT_PROCESSES)
+
+
+class SharedPanelArrays:
+    """A panel's arrays copied into shared memory once, described by picklable specs"""
+
+    def __init__(self, panel: PricePanel) -> None:
+        arrays = {'Date': panel.dates, 'offsets': panel.offsets}
+        for column, values in panel.columns.items():
+            if values.dtype != object:
+                arrays[column] = values
+
+        self.blocks: List[shared_memory.SharedMemory] = []
+        self.spec: ArraySpec = {}
+        for name, values in arrays.items():
+            values = np.ascontiguousarray(values)
+            block = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+            np.ndarray(values.shape, values.dtype, buffer=block.buf)[:] = values
+            self.blocks.append(block)
+            self.spec[name] = (block.name, values.shape, values.dtype.str)
+
+    def release(self) -> None:
+        for block in self.blocks:
+            block.close()
+            try:
+                block.unlink()
+            except FileNotFoundError:
+                pass
+        self.blocks = []
+
+
+# ---------------------------------------------------------------------------
+# Worker side
+# ---------------------------------------------------------------------------
+
+_attached_spec: Optional[ArraySpec] = None
+_attached_blocks: List[shared_memory.SharedMemory] = []
+_attached_arrays: Dict[str, np.ndarray] = {}
+
+
+def _attach(spec: ArraySpec) -> Dict[str, np.ndarray]:
+    """Views of the shared arrays in this worker, kept until a task for another panel arrives"""
+    global _attached_spec, _attached_blocks, _attached_arrays
+    if spec != _attached_spec:
+        _attached_arrays = {}
+        for block in _attached_blocks:
+            block.close()
+        _attached_blocks = []
+        for name, (block_name, shape, dtype) in spec.items():
+            block = shared_memory.SharedMemory(name=block_name)
+            _attached_blocks.append(block)
+            array = np.ndarray(shape, np.dtype(dtype), buffer=block.buf)
+            array.flags.writeable = False
+            _attached_arrays[name] = array
+        _attached_spec = spec
+    return _attached_arrays
+
+
+def _run_chunk(func: Callable, spec: ArraySpec, columns: List[str],
+               symbols: List[str], positions: List[int]) -> list:
+    arrays = _attach(spec)
+    offsets, dates = arrays['offsets'], arrays['Date']
+    results = []
+    for symbol, position in zip(symbols, positions):
+        start, end = offsets[position], offsets[position + 1]
+        results.append(func(symbol, dates[start:end], {c: arrays[c][start:end] for c in columns}))
+    return results
+
+
+# ---------------------------------------------------------------------------
+# Parent side
+# ---------------------------------------------------------------------------
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: the engine runs screens on threads, and forking a threaded process is unsafe
+            _pool = ProcessPoolExecutor(max_workers=_processes, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def _shared_arrays(panel: PricePanel) -> SharedPanelArrays:
+    def build():
+        shared = SharedPanelArrays(panel)
+        _shared_panels.append(shared)
+        return shared
+    return panel.cached('shared_arrays', build)
+
+
+def release(panel: PricePanel) -> None:
+    """Free the shared memory of a panel (the pool stays up for the next panel)"""
+    shared = panel.cache.pop('shared_arrays', None)
+    if shared is not None:
+        shared.release()
+        if shared in _shared_panels:
+            _shared_panels.remove(shared)
+
+
+@atexit.register
+def shutdown() -> None:
+    """Stop the worker processes and free every shared block"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+            _pool = None
+    for shared in list(_shared_panels):
+        shared.release()
+    _shared_panels.clear()
+
+
+def map_symbols(panel: PricePanel, func: Callable, columns: List[str],
+                symbols: Optional[Iterable[str]] = None) -> list:
+    """
+    func(symbol, dates, {column: values}) for each selected symbol (all by
+    default), in symbol order, spread over the worker processes.
+    """
+    positions = _selected_symbols(panel.symbols, symbols)
+    if _processes <= 1 or len(positions) < MIN_PARALLEL_SYMBOLS:
+        return [func(symbol, dates, values) for symbol, dates, values in panel.iter_symbols(columns, symbols)]
+
+    shared = _shared_arrays(panel)
+    pool = _get_pool()
+    chunk_count = min(len(positions), _processes * CHUNKS_PER_PROCESS)
+    futures = []
+    for chunk in np.array_split(positions, chunk_count):
+        chunk_symbols = [str(s) for s in panel.symbols[chunk]]
+        futures.append(pool.submit(_run_chunk, func, shared.spec, list(columns), chunk_symbols, chunk.tolist()))
+
+    results = []
+    for future in futures:
+        results.extend(future.result())
+    return results
@@ -0,0 +1,154 @@
+import json
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+# Server side of the pipeline progress stream.
+#
+# The pipeline runs in its own process and appends its events to the event
+# log written by PipelineStatus. In the Flask service, one EventLogWatcher
+# thread tails that log, whatever the number of connected clients. It
+# publishes each new event on a ProgressBus, which fans it out to one queue
+# per client, and sse_events turns a client's queue into a Server-Sent Events
+# stream. Nothing is re-read per client or per poll: a client gets the
+# status.json snapshot once when it connects, then only the events after it.
+
+HEARTBEAT_SECONDS = 15.0
+POLL_INTERVAL = 0.2
+
+
+class ProgressBus:
+    """Fans events out to subscriber queues; a subscriber that falls behind loses its oldest events"""
+
+    def __init__(self, max_queue: int = 1000) -> None:
+        self.max_queue = max_queue
+        self._subscribers: List[queue.Queue] = []
+        self._lock = threading.Lock()
+
+    def subscribe(self) -> queue.Queue:
+        subscriber = queue.Queue(maxsize=self.max_queue)
+        with self._lock:
+            self._subscribers.append(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: queue.Queue) -> None:
+        with self._lock:
+            if subscriber in self._subscribers:
+                self._subscribers.remove(subscriber)
+
+    def publish(self, event: Dict[str, Any]) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            while True:
+                try:
+                    subscriber.put_nowait(event)
+                    break
+                except queue.Full:
+                    try:
+                        subscriber.get_nowait()
+                    except queue.Empty:
+                        pass
+
+
+class EventLogWatcher:
+    """Tails the pipeline event log on a background thread and publishes each new event on a bus"""
+
+    def __init__(self, bus: ProgressBus, events_path: str, poll_interval: float = POLL_INTERVAL) -> None:
+        self.bus = bus
+        self.events_path = events_path
+        self.poll_interval = poll_interval
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """Start tailing (once per process); events already in the log are covered by the snapshot"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="pipeline-event-watcher", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        inode, offset, partial = None, 0, b""
+        try:
+            stat = os.stat(self.events_path)
+            inode, offset = stat.st_ino, stat.st_size
+        except OSError:
+            pass
+
+        while True:
+            try:
+                stat = os.stat(self.events_path)
+            except OSError:
+                time.sleep(self.poll_interval)
+                continue
+
+            if stat.st_ino != inode or stat.st_size < offset:
+                # A new run replaced the log: read it from the start
+                inode, offset, partial = stat.st_ino, 0, b""
+                self.bus.publish({"type": "reset"})
+
+            if stat.st_size > offset:
+                try:
+                    with open(self.events_path, 'rb') as f:
+                        f.seek(offset)
+                        data = f.read(stat.st_size - offset)
+                except OSError:
+                    data = b""
+                offset += len(data)
+                lines = (partial + data).split(b"\n")
+                # The last piece is an incomplete line (or empty), kept for the next read
+                partial = lines.pop()
+                for line in lines:
+                    if line.strip():
+                        try:
+                            self.bus.publish(json.loads(line))
+                        except ValueError:
+                            pass
+            time.sleep(self.poll_interval)
+
+
+def format_sse(event_type: str, data: Any, event_id: Optional[int] = None) -> str:
+    lines = [f"id: {event_id}"] if event_id is not None else []
+    lines += [f"event: {event_type}", f"data: {json.dumps(data)}"]
+    return "\n".join(lines) + "\n\n"
+
+
+def sse_events(bus: ProgressBus, get_snapshot: Callable[[], Optional[Dict[str, Any]]],
+               heartbeat: float = HEARTBEAT_SECONDS) -> Iterator[str]:
+    """
+    Server-Sent Events for one client: a "snapshot" event with the current
+    status (null before the first run), then each progress event under its
+    own type (step, stage, batch, error, status). A new run sends a new snapshot.
+    """
+    # Subscribe before reading the snapshot, so no event falls between the two
+    subscriber = bus.subscribe()
+    try:
+        def snapshot_event():
+            snapshot = get_snapshot()
+            run = snapshot.get("start_time") if snapshot else None
+            last_id = snapshot.get("event_id", 0) if snapshot else 0
+            return run, last_id, format_sse("snapshot", snapshot, last_id)
+
+        run, last_id, message = snapshot_event()
+        yield message
+        while True:
+            try:
+                event = subscriber.get(timeout=heartbeat)
+            except queue.Empty:
+                # Keeps proxies and the browser from dropping an idle connection
+                yield ": keep-alive\n\n"
+                continue
+
+            if event.get("type") == "reset":
+                run, last_id, message = snapshot_event()
+                yield message
+                continue
+            if event.get("run") == run and event.get("id", 0) <= last_id:
+                continue  # Already in the snapshot
+            run, last_id = event.get("run"), event.get("id", 0)
+            yield format_sse(event["type"], event, last_id)
+    finally:
+        bus.unsubscribe(subscriber)
@@ -1,85 +1,147 @@
 import json
 import os
-import time
 import re
-from typing import Optional, Dict, Any
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+# Pipeline progress: in-memory state, atomic snapshots and an event log.
+#
+# The running pipeline keeps its status in memory, behind one lock shared by
+# all its threads, so parallel pipelines never lose each other's updates.
+# Every change (step, batch progress, stage timing, error, final status) is
+# appended as one JSON line to pipeline_status/events.jsonl. The whole state
+# is written to status.json through a temporary file and os.replace, so
+# readers never see a half-written snapshot. The Flask service tails the
+# event log and pushes the events to the browser over Server-Sent Events (see
+# pipeline_events.py). status.json is what /pipeline/status returns and what
+# clients connecting mid-run start from.
+#
+# Events are {"id", "run", "type", "time", ...}: ids increase within a run
+# and the snapshot's event_id is the last event it includes. The run is the
+# start time of the pipeline.
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _write_json_atomic(path: str, data: Dict[str, Any]) -> None:
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2)
+    for attempt in range(5):
+        try:
+            os.replace(tmp_path, path)
+            return
+        except PermissionError:
+            # Windows refuses to replace a file while a reader has it open
+            time.sleep(0.05 * (attempt + 1))
+    os.replace(tmp_path, path)
+
+
+def _append_event(path: str, event: Dict[str, Any]) -> None:
+    with open(path, 'a') as f:
+        f.write(json.dumps(event) + "\n")
+
 
 class PipelineStatus:
-    """Handles saving and loading pipeline status information"""
+    """Tracks the progress of a pipeline run, publishing each change as an event"""
 
     STATUS_FILE = "status.json"
+    EVENTS_FILE = "events.jsonl"
     STATUS_DIR = "pipeline_status"
+    status_path = os.path.join(APP_DIR, STATUS_DIR, STATUS_FILE)
+    events_path = os.path.join(APP_DIR, STATUS_DIR, EVENTS_FILE)
+
+    # The status of the pipeline running in this process, if any
+    _active: Optional["PipelineStatus"] = None
 
     def __init__(self, pid: int) -> None:
-        # Find or initialize status file path
-        status_path = self._find_status_file()
-        if not status_path:
-            # Create status directory if it doesn't exist
-            status_path = os.path.join(".", self.STATUS_DIR, self.STATUS_FILE)
-            os.makedirs(os.path.dirname(status_path), exist_ok=True)
-
-        self.status_path = status_path
-
-        # Initialize status file
-        self._save_status({
-            "start_time": time.time(),
+        self._lock = threading.Lock()
+        now = time.time()
+        self.state: Dict[str, Any] = {
+            "start_time": now,
             "current_step": "initializing",
             "steps_completed": [],
             "current_batch": None,
             "total_batches": None,
             "status": "running",
-            "last_updated": time.time(),
-            "process_pid": pid
+            "last_updated": now,
+            "process_pid": pid,
+            "stage_timings": {},
+            "event_id": 0
+        }
+
+        # A new run starts a new event log (a new file, so readers notice the switch)
+        os.makedirs(os.path.dirname(self.status_path), exist_ok=True)
+        tmp_events = f"{self.events_path}.{os.getpid()}.tmp"
+        open(tmp_events, 'w').close()
+        os.replace(tmp_events, self.events_path)
+        self._emit("status", {"status": "running", "process_pid": pid})
+        PipelineStatus._active = self
+
+    def _emit(self, event_type: str, data: Dict[str, Any],
+              apply: Optional[Callable[[Dict[str, Any]], None]] = None) -> None:
+        """Apply a change to the state, append its event and save the snapshot"""
+        with self._lock:
+            now = time.time()
+            if apply:
+                apply(self.state)
+            self.state["last_updated"] = now
+            self.state["event_id"] += 1
+            _append_event(self.events_path, {
+                "id": self.state["event_id"], "run": self.state["start_time"],
+                "type": event_type, "time": now, **data
+            })
+            _write_json_atomic(self.status_path, self.state)
+
+    @classmethod
+    def _emit_to_file(cls, event_type: str, data: Dict[str, Any],
+                      apply: Callable[[Dict[str, Any]], None]) -> None:
+        """_emit for another process's run (e.g. the Flask service stopping it), through the snapshot"""
+        if cls._active is not None:
+            cls._active._emit(event_type, data, apply)
+            return
+        status = cls.get_status()
+        if status is None:
+            return
+        now = time.time()
+        apply(status)
+        status["last_updated"] = now
+        status["event_id"] = status.get("event_id", 0) + 1
+        _append_event(cls.events_path, {
+            "id": status["event_id"], "run": status.get("start_time"), "type": event_type, "time": now, **data
         })
+        _write_json_atomic(cls.status_path, status)
 
     @classmethod
-    def start_pipeline(cls, pid: int) -> None:
+    def start_pipeline(cls, pid: int) -> "PipelineStatus":
         """
         Initialize the pipeline status as running with a new start time.
         """
-        status_path = cls._find_status_file()
-        if not status_path:
-            # Create status directory if it doesn't exist
-            status_path = os.path.join(".", cls.STATUS_DIR, cls.STATUS_FILE)
-            os.makedirs(os.path.dirname(status_path), exist_ok=True)
-
-        initial_status = {
-            "start_time": time.time(),
-            "current_step": "initializing",
-            "steps_completed": [],
-            "current_batch": None,
-            "total_batches": None,
-            "status": "running",
-            "last_updated": time.time(),
-            "process_pid": pid
-        }
-
-        with open(status_path, 'w') as f:
-            json.dump(initial_status, f, indent=2)
+        return cls(pid)
 
     @classmethod
     def set_process_pid(cls, pid: int) -> None:
         """Set the process ID for the running pipeline"""
-        status_path = cls._find_status_file()
-        if not status_path:
-            return None
-
-        with open(status_path, 'r') as f:
-            current_status = json.load(f)
-
-        current_status["process_pid"] = pid
-        current_status["last_updated"] = time.time()
-
-        with open(status_path, 'w') as f:
-            json.dump(current_status, f, indent=2)
+        cls._emit_to_file("status", {"process_pid": pid}, lambda state: state.update(process_pid=pid))
 
     def update_step(self, step: str) -> None:
         """Update the current step of the pipeline"""
-        current_status = self._load_status()
-        current_status["current_step"] = step
-        current_status["steps_completed"].append(step)
-        current_status["last_updated"] = time.time()
-        self._save_status(current_status)
+        def apply(state):
+            state["current_step"] = step
+            state["steps_completed"].append(step)
+        self._emit("step", {"step": step}, apply)
+
+    def record_stage(self, stage: str, seconds: float, finished: int, total: int) -> None:
+        """Record a finished stage of the screening engine and how long it took"""
+        step = f"Running pipelines ({finished}/{total} stages)"
+
+        # Stages only move the current step along; steps_completed keeps the pipeline's steps
+        def apply(state):
+            state["current_step"] = step
+            state.setdefault("stage_timings", {})[stage] = round(seconds, 3)
+        self._emit("stage", {"stage": stage, "seconds": round(seconds, 3), "finished": finished,
+                             "total": total, "step": step}, apply)
 
     def handle_script_output(self, line: str, script_name: str) -> None:
         """
@@ -109,86 +171,34 @@ class PipelineStatus:
         if batch_match:
             current_batch = int(batch_match.group(1))
             total_batches = int(batch_match.group(2))
-            current_status = self._load_status()
-            current_status["current_batch"] = current_batch
-            current_status["total_batches"] = total_batches
-            current_status["last_updated"] = time.time()
-            self._save_status(current_status)
+            self._emit("batch", {"current_batch": current_batch, "total_batches": total_batches},
+                       lambda state: state.update(current_batch=current_batch, total_batches=total_batches))
 
     def _handle_error(self, line: str, script_name: str) -> None:
         """Handle error messages in the output"""
-        current_status = self._load_status()
-        if "errors" not in current_status:
-            current_status["errors"] = []
-        current_status["errors"].append({
-            "script": script_name,
-            "error": line,
-            "timestamp": time.time()
-        })
-        self._save_status(current_status)
+        error = {"script": script_name, "error": line, "timestamp": time.time()}
+        self._emit("error", {"script": script_name, "error": line},
+                   lambda state: state.setdefault("errors", []).append(error))
 
     @classmethod
     def complete_pipeline(cls) -> None:
         """Mark the pipeline as completed"""
-        status_path = cls._find_status_file()
-        if not status_path:
-            return None
-
-        with open(status_path, 'r') as f:
-            current_status = json.load(f)
-
-        current_status["status"] = "completed"
-        current_status["end_time"] = time.time()
-        current_status["last_updated"] = time.time()
-        current_status["process_pid"] = None  # Clear PID on completion
-
-        with open(status_path, 'w') as f:
-            json.dump(current_status, f, indent=2)
+        end_time = time.time()
+        # Clear PID on completion
+        cls._emit_to_file("status", {"status": "completed", "end_time": end_time, "process_pid": None},
+                          lambda state: state.update(status="completed", end_time=end_time, process_pid=None))
 
     def fail_pipeline(self, error: str) -> None:
         """Mark the pipeline as failed"""
-        current_status = self._load_status()
-        current_status["status"] = "failed"
-        current_status["error"] = error
-        current_status["end_time"] = time.time()
-        current_status["last_updated"] = time.time()
-        self._save_status(current_status)
-
-    def _save_status(self, status: Dict[str, Any]) -> None:
-        """Save the current status to file"""
-        with open(self.status_path, 'w') as f:
-            json.dump(status, f, indent=2)
-
-    def _load_status(self) -> Dict[str, Any]:
-        """Load the current status from file"""
-        if not os.path.exists(self.status_path):
-            return {
-                "start_time": time.time(),
-                "current_step": "initializing",
-                "steps_completed": [],
-                "current_batch": None,
-                "total_batches": None,
-                "status": "running",
-                "last_updated": time.time()
-            }
-
-        with open(self.status_path, 'r') as f:
-            return json.load(f)
-
-    @classmethod
-    def _find_status_file(cls) -> Optional[str]:
-        """Find status.json by walking down through subdirectories"""
-        for root, _, files in os.walk('.'):
-            if cls.STATUS_FILE in files and cls.STATUS_DIR in root.split(os.sep):
-                return os.path.join(root, cls.STATUS_FILE)
-        return None
+        end_time = time.time()
+        self._emit("status", {"status": "failed", "error": error, "end_time": end_time},
+                   lambda state: state.update(status="failed", error=error, end_time=end_time))
 
     @classmethod
     def get_status(cls) -> Optional[Dict[str, Any]]:
         """Get the current pipeline status"""
-        status_path = cls._find_status_file()
-        if not status_path:
+        try:
+            with open(cls.status_path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
             return None
-
-        with open(status_path, 'r') as f:
-            return json.load(f)
\ No newline at end of file
@@ -0,0 +1,680 @@
+import datetime
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+import uuid
+import argparse
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Directory layout:
+#   price_data/price_store/
+#       meta.json       - row/symbol counts, date range, a version id and
+#                         the data directory of that version
+#       data-<version>/
+#           symbols.npy     - unique symbols, sorted
+#           offsets.npy     - row offset of each symbol (len = symbols + 1)
+#           Date.npy        - datetime64[D], sorted by Symbol then Date
+#           Open.npy, High.npy, Low.npy, Close.npy, Volume.npy
+#
+# Every column file can be memory-mapped, so a screen only pays for the
+# columns it actually touches instead of parsing the full CSV.
+#
+# A write never touches the current version: it fills a new data directory
+# and then replaces meta.json, the one pointer readers follow. A reader
+# resolves meta.json once and takes every file from that directory, so it
+# can't mix the columns of one version with the offsets of another. The
+# previous version is kept for readers still opening it; older ones are
+# removed. Stores written before versioned directories keep their files
+# directly in price_store/ until the next write.
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+PRICE_DATA_DIR = os.path.join(APP_DIR, "price_data")
+STORE_DIR = os.path.join(PRICE_DATA_DIR, "price_store")
+CSV_FILE = os.path.join(PRICE_DATA_DIR, "all_tickers_historical.csv")
+
+META_FILE = "meta.json"
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+CSV_COLUMNS = ['Date', 'Open', 'High', 'Low', 'Close', 'Volume',
+               'Dividends', 'Stock Splits', 'Symbol', 'Capital Gains']
+DATA_DIR_PREFIX = "data-"
+STORE_FILES = ['Date', 'symbols', 'offsets'] + PRICE_COLUMNS
+
+
+def _column_path(store_dir: str, name: str) -> str:
+    return os.path.join(store_dir, f"{name}.npy")
+
+
+def _save_array(store_dir: str, name: str, array: np.ndarray) -> None:
+    """Write an array next to its final name and swap it in atomically."""
+    final_path = _column_path(store_dir, name)
+    tmp_path = final_path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        np.save(f, array, allow_pickle=False)
+    os.replace(tmp_path, final_path)
+
+
+def normalize_price_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Bring a long-format price DataFrame into store order.
+
+    Dates are reduced to calendar days (the CSV carries a fixed
+    "00:00:00-04:00" suffix), rows are sorted by Symbol then Date and
+    duplicate (Symbol, Date) pairs keep the last occurrence.
+    """
+    df = df.dropna(subset=['Symbol', 'Date']).copy()
+    df['Symbol'] = df['Symbol'].astype(str)
+    df['Date'] = pd.to_datetime(df['Date'].astype(str).str.slice(0, 10), errors='coerce')
+    df = df.dropna(subset=['Date'])
+
+    for column in PRICE_COLUMNS:
+        if column not in df.columns:
+            df[column] = np.nan
+        df[column] = pd.to_numeric(df[column], errors='coerce')
+
+    df = df.drop_duplicates(subset=['Symbol', 'Date'], keep='last')
+    return df.sort_values(['Symbol', 'Date'], kind='mergesort').reset_index(drop=True)
+
+
+def write_price_store(df: pd.DataFrame, store_dir: str = STORE_DIR) -> Dict:
+    """Write a long-format price DataFrame (Date, OHLCV, Symbol) to the columnar store."""
+    df = normalize_price_frame(df)
+    version, data_dir = _new_data_dir(store_dir)
+
+    symbol_values = df['Symbol'].to_numpy(dtype=str)
+    symbols, starts = np.unique(symbol_values, return_index=True)
+    offsets = np.append(starts, len(df)).astype(np.int64)
+
+    _save_array(data_dir, 'Date', df['Date'].to_numpy(dtype='datetime64[D]'))
+    for column in ['Open', 'High', 'Low', 'Close']:
+        _save_array(data_dir, column, df[column].to_numpy(dtype=np.float64))
+    _save_array(data_dir, 'Volume', df['Volume'].fillna(0).to_numpy(dtype=np.int64))
+    _save_array(data_dir, 'symbols', symbols)
+    _save_array(data_dir, 'offsets', offsets)
+
+    first_date = df['Date'].min() if len(df) else None
+    last_date = df['Date'].max() if len(df) else None
+    return _publish(store_dir, version, data_dir, len(df), len(symbols), first_date, last_date)
+
+
+def _new_data_dir(store_dir: str) -> Tuple[str, str]:
+    """A new version id and its (empty) data directory"""
+    version = uuid.uuid4().hex
+    data_dir = os.path.join(store_dir, DATA_DIR_PREFIX + version)
+    os.makedirs(data_dir)
+    return version, data_dir
+
+
+def _publish(store_dir: str, version: str, data_dir: str, rows: int, symbols: int,
+             first_date, last_date) -> Dict:
+    """Make a fully written data directory the current version, then prune old versions."""
+    previous = _current_data_dir(store_dir, read_meta(store_dir))
+    meta = {
+        "version": version,
+        "data_dir": os.path.basename(data_dir),
+        "created_at": time.time(),
+        "rows": int(rows),
+        "symbols": int(symbols),
+        "first_date": str(pd.Timestamp(first_date).date()) if first_date is not None else None,
+        "last_date": str(pd.Timestamp(last_date).date()) if last_date is not None else None,
+    }
+    # Replacing meta.json switches every new reader to the new version at once
+    tmp_meta = os.path.join(store_dir, META_FILE + ".tmp")
+    with open(tmp_meta, 'w') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp_meta, os.path.join(store_dir, META_FILE))
+    _prune_versions(store_dir, keep={data_dir, previous})
+
+    print(f"Wrote price store with {meta['rows']} rows for {meta['symbols']} symbols to {store_dir}")
+    return meta
+
+
+def _prune_versions(store_dir: str, keep) -> None:
+    """Remove the data of versions not in keep (best effort: files still mapped on Windows stay)"""
+    keep = {os.path.normpath(path) for path in keep if path}
+    for name in os.listdir(store_dir):
+        path = os.path.join(store_dir, name)
+        if name.startswith(DATA_DIR_PREFIX) and os.path.normpath(path) not in keep:
+            shutil.rmtree(path, ignore_errors=True)
+    if os.path.normpath(store_dir) not in keep:
+        # Files of a store written before versioned directories
+        for name in STORE_FILES:
+            try:
+                os.remove(_column_path(store_dir, name))
+            except OSError:
+                pass
+
+
+def _current_data_dir(store_dir: str, meta: Optional[Dict]) -> Optional[str]:
+    """Directory holding the files of the version meta describes"""
+    if meta is None:
+        return None
+    return os.path.join(store_dir, meta['data_dir']) if meta.get('data_dir') else store_dir
+
+
+def _read_store(store_dir: str, read):
+    """
+    read(meta, data_dir) on the current version. Retried when a version's
+    files disappear under it (two writes finished while it was opening them).
+    """
+    for attempt in range(3):
+        meta = read_meta(store_dir)
+        try:
+            return read(meta, _current_data_dir(store_dir, meta))
+        except FileNotFoundError:
+            if attempt == 2:
+                raise
+
+
+def store_exists(store_dir: str = STORE_DIR) -> bool:
+    return os.path.exists(os.path.join(store_dir, META_FILE))
+
+
+def read_meta(store_dir: str = STORE_DIR) -> Optional[Dict]:
+    """Return the store metadata, or None if no store has been written yet."""
+    meta_path = os.path.join(store_dir, META_FILE)
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path, 'r') as f:
+        return json.load(f)
+
+
+def price_data_timestamp(store_dir: str = STORE_DIR) -> Optional[float]:
+    """Modification time of the current price data (store first, CSV as fallback)."""
+    meta_path = os.path.join(store_dir, META_FILE)
+    if os.path.exists(meta_path):
+        return os.path.getmtime(meta_path)
+    if os.path.exists(CSV_FILE):
+        return os.path.getmtime(CSV_FILE)
+    return None
+
+
+def _load_column(data_dir: str, name: str) -> np.ndarray:
+    return np.load(_column_path(data_dir, name), mmap_mode='r', allow_pickle=False)
+
+
+def _symbol_index(data_dir: str) -> Tuple[np.ndarray, np.ndarray]:
+    symbols = np.load(_column_path(data_dir, 'symbols'), allow_pickle=False)
+    offsets = np.load(_column_path(data_dir, 'offsets'), allow_pickle=False)
+    return symbols, offsets
+
+
+def _selected_symbols(all_symbols: np.ndarray, symbols: Optional[Iterable[str]]) -> np.ndarray:
+    """Positions of the requested symbols in the store (all symbols when None)."""
+    if symbols is None:
+        return np.arange(len(all_symbols))
+    wanted = np.unique(np.asarray([str(s) for s in symbols], dtype=str))
+    if len(wanted) == 0 or len(all_symbols) == 0:
+        return np.array([], dtype=np.int64)
+    positions = np.minimum(np.searchsorted(all_symbols, wanted), len(all_symbols) - 1)
+    return positions[all_symbols[positions] == wanted]
+
+
+def _load_csv(columns: List[str], symbols: Optional[Iterable[str]], since) -> pd.DataFrame:
+    """Fallback for trees where only the legacy CSV exists."""
+    print(f"Price store not found, falling back to {CSV_FILE}")
+    usecols = ['Date', 'Symbol'] + [c for c in columns if c not in ('Date', 'Symbol')]
+    df = normalize_price_frame(pd.read_csv(CSV_FILE, usecols=usecols))
+    if symbols is not None:
+        df = df[df['Symbol'].isin(set(symbols))]
+    if since is not None:
+        df = df[df['Date'] >= pd.Timestamp(since)]
+    return df[['Date'] + [c for c in columns if c not in ('Date', 'Symbol')] + ['Symbol']].reset_index(drop=True)
+
+
+def load_prices(columns: Optional[List[str]] = None,
+                symbols: Optional[Iterable[str]] = None,
+                since=None,
+                store_dir: str = STORE_DIR) -> pd.DataFrame:
+    """
+    Load the price panel as a long DataFrame sorted by Symbol then Date.
+
+    The frame has the same shape screens used to get from
+    pd.read_csv(all_tickers_historical.csv, parse_dates=['Date']):
+    a 'Date' column (naive datetime64), the requested price columns and 'Symbol'.
+
+    Args:
+        columns: Price columns to load (defaults to Open/High/Low/Close/Volume)
+        symbols: Only load these symbols (defaults to every symbol)
+        since: Only load rows on or after this date
+        store_dir: Store directory (defaults to price_data/price_store)
+    """
+    columns = list(columns) if columns is not None else list(PRICE_COLUMNS)
+    price_columns = [c for c in columns if c not in ('Date', 'Symbol')]
+
+    if not store_exists(store_dir):
+        return _load_csv(price_columns, symbols, since)
+    return _read_store(store_dir, lambda meta, data_dir: _load_store_prices(data_dir, price_columns, symbols, since))
+
+
+def _load_store_prices(data_dir: str, price_columns: List[str], symbols: Optional[Iterable[str]],
+                       since) -> pd.DataFrame:
+    """load_prices from one version's data directory"""
+    all_symbols, offsets = _symbol_index(data_dir)
+    positions = _selected_symbols(all_symbols, symbols)
+    starts = offsets[positions]
+    counts = offsets[positions + 1] - starts
+
+    if symbols is None:
+        rows = slice(None)
+    else:
+        # Row indices of every selected symbol, built without a Python loop
+        total = int(counts.sum())
+        rows = np.repeat(starts - np.cumsum(np.append(0, counts[:-1])), counts) + np.arange(total)
+
+    dates = np.asarray(_load_column(data_dir, 'Date')[rows])
+    data = {'Date': dates.astype('datetime64[ns]')}
+    for column in price_columns:
+        data[column] = np.asarray(_load_column(data_dir, column)[rows])
+    data['Symbol'] = np.repeat(all_symbols[positions], counts).astype(object)
+
+    df = pd.DataFrame(data)
+    if since is not None:
+        df = df[df['Date'] >= pd.Timestamp(since)].reset_index(drop=True)
+    return df
+
+
+def iter_symbol_arrays(columns: Optional[List[str]] = None,
+                       symbols: Optional[Iterable[str]] = None,
+                       store_dir: str = STORE_DIR) -> Iterator[Tuple[str, np.ndarray, Dict[str, np.ndarray]]]:
+    """
+    Yield (symbol, dates, {column: values}) for each symbol, in symbol order.
+
+    Arrays are read-only views into the memory-mapped store, already sorted by
+    date, so per-symbol screens can loop without building a DataFrame.
+    """
+    columns = list(columns) if columns is not None else list(PRICE_COLUMNS)
+
+    if not store_exists(store_dir):
+        df = _load_csv(columns, symbols, None)
+        for symbol, group in df.groupby('Symbol', sort=True):
+            yield symbol, group['Date'].to_numpy(dtype='datetime64[D]'), \
+                {c: group[c].to_numpy() for c in columns}
+        return
+
+    # Everything is mapped up front, so later writes can't mix versions into the loop
+    all_symbols, offsets, dates, arrays = _read_store(store_dir, lambda meta, data_dir: (
+        *_symbol_index(data_dir), _load_column(data_dir, 'Date'), {c: _load_column(data_dir, c) for c in columns}))
+
+    for position in _selected_symbols(all_symbols, symbols):
+        start, end = offsets[position], offsets[position + 1]
+        yield str(all_symbols[position]), dates[start:end], {c: a[start:end] for c, a in arrays.items()}
+
+
+class PricePanel:
+    """
+    The full price history held in memory, sorted by Symbol then Date.
+
+    Built once per process and shared by every screen that runs in it. Each
+    symbol's rows are a contiguous slice located through `offsets`, so picking
+    a universe of symbols or iterating symbol by symbol costs no extra parsing.
+    """
+
+    def __init__(self, df: pd.DataFrame, version: Optional[str] = None, store_dir: Optional[str] = None) -> None:
+        self.df = df.reset_index(drop=True)
+        # Store version and directory the rows came from (None for frames built elsewhere),
+        # used to key results that can be persisted next to the store
+        self.version = version
+        self.store_dir = store_dir
+        symbol_values = self.df['Symbol'].to_numpy(dtype=str)
+
+        # Rows are already grouped by symbol, so the boundaries are where the symbol changes
+        if len(symbol_values):
+            starts = np.append(0, np.flatnonzero(symbol_values[1:] != symbol_values[:-1]) + 1)
+        else:
+            starts = np.array([], dtype=np.int64)
+        self.symbols = symbol_values[starts]
+        self.offsets = np.append(starts, len(self.df)).astype(np.int64)
+
+        self.dates = self.df['Date'].to_numpy(dtype='datetime64[D]')
+        self.columns = {c: self.df[c].to_numpy() for c in self.df.columns if c not in ('Date', 'Symbol')}
+        # Derived results (indicator matrices, condition masks) shared by the screens using this panel
+        self.cache: Dict = {}
+        self._cache_locks: Dict = {}
+        self._cache_lock = threading.Lock()
+
+    @classmethod
+    def load(cls, store_dir: str = STORE_DIR, columns: Optional[List[str]] = None,
+             symbols: Optional[Iterable[str]] = None) -> "PricePanel":
+        """Load the full history of the requested symbols and columns (all by default) from the store."""
+        if not store_exists(store_dir):
+            return cls(load_prices(columns, symbols, store_dir=store_dir))
+        columns = list(columns) if columns is not None else list(PRICE_COLUMNS)
+        price_columns = [c for c in columns if c not in ('Date', 'Symbol')]
+        meta, df = _read_store(store_dir, lambda meta, data_dir: (
+            meta, _load_store_prices(data_dir, price_columns, symbols, None)))
+        return cls(df, meta['version'], store_dir)
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def cached(self, key, build):
+        """self.cache[key], built by build() once even when screens on several threads ask at the same time."""
+        with self._cache_lock:
+            lock = self._cache_locks.setdefault(key, threading.Lock())
+        with lock:
+            if key not in self.cache:
+                self.cache[key] = build()
+        return self.cache[key]
+
+    def rows(self, symbols: Optional[Iterable[str]] = None) -> np.ndarray:
+        """Row indices of the requested symbols (all rows when None)."""
+        if symbols is None:
+            return np.arange(len(self.df))
+        positions = _selected_symbols(self.symbols, symbols)
+        starts = self.offsets[positions]
+        counts = self.offsets[positions + 1] - starts
+        return np.repeat(starts - np.cumsum(np.append(0, counts[:-1])), counts) + np.arange(int(counts.sum()))
+
+    def frame(self, symbols: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """A copy of the long DataFrame restricted to the requested symbols."""
+        if symbols is None:
+            return self.df.copy()
+        return self.df.take(self.rows(symbols)).reset_index(drop=True)
+
+    @property
+    def lengths(self) -> np.ndarray:
+        """Number of rows of each symbol, in self.symbols order."""
+        return np.diff(self.offsets)
+
+    def trailing_positions(self, length: int, ends: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Row indices of the last `length` rows of every symbol as a (symbols x length) matrix.
+
+        Rows are aligned on each symbol's last row (or on `ends`, one exclusive
+        end row per symbol), which is how the screens index history
+        (iloc[-63:] etc.). Returns the positions and a mask of the ones that
+        fall inside the symbol's history.
+        """
+        ends = self.offsets[1:] if ends is None else ends
+        positions = ends[:, None] - length + np.arange(length)
+        inside = positions >= self.offsets[:-1, None]
+        return positions, inside
+
+    def trailing_matrix(self, column: str, length: int, ends: Optional[np.ndarray] = None) -> np.ndarray:
+        """The last `length` values of `column` per symbol, padded with NaN on the left for short histories."""
+        values = self.columns[column].astype(np.float64, copy=False)
+        positions, inside = self.trailing_positions(length, ends)
+        matrix = np.full(positions.shape, np.nan)
+        matrix[inside] = values[positions[inside]]
+        return matrix
+
+    def last_valid_rows(self, column: str) -> np.ndarray:
+        """Index of each symbol's last row with a non-NaN `column` value (-1 when there is none)."""
+        if len(self.df) == 0:
+            return np.array([], dtype=np.int64)
+        values = self.columns[column].astype(np.float64, copy=False)
+        rows = np.where(np.isnan(values), -1, np.arange(len(values)))
+        return np.maximum.reduceat(rows, self.offsets[:-1])
+
+    def day_keys(self) -> Tuple[np.ndarray, int, int]:
+        """
+        Sort keys of the rows, symbol position * stride + days since the first date,
+        with that first day and the stride (rows are sorted by both, so the keys increase).
+        """
+        def build():
+            days = self.dates.astype(np.int64)
+            first_day = int(days.min()) if len(days) else 0
+            stride = (int(days.max()) - first_day + 2) if len(days) else 1
+            symbol_positions = np.repeat(np.arange(len(self), dtype=np.int64), self.lengths)
+            return symbol_positions * stride + (days - first_day), first_day, stride
+        return self.cached('day_keys', build)
+
+    def rows_as_of(self, dates) -> np.ndarray:
+        """
+        Index of each symbol's last row on or before each date, as a
+        (dates x symbols) matrix (-1 where the symbol has no row yet).
+        """
+        keys, first_day, stride = self.day_keys()
+        days = np.asarray(dates, dtype='datetime64[D]').astype(np.int64) - first_day
+        wanted = np.arange(len(self), dtype=np.int64)[None, :] * stride + np.clip(days, -1, stride - 1)[:, None]
+        rows = np.searchsorted(keys, wanted, side='right') - 1
+        return np.where(rows >= self.offsets[None, :-1], rows, -1)
+
+    def iter_symbols(self, columns: Optional[List[str]] = None,
+                     symbols: Optional[Iterable[str]] = None
+                     ) -> Iterator[Tuple[str, np.ndarray, Dict[str, np.ndarray]]]:
+        """Same contract as iter_symbol_arrays, served from memory."""
+        columns = list(columns) if columns is not None else list(self.columns)
+        for position in _selected_symbols(self.symbols, symbols):
+            start, end = self.offsets[position], self.offsets[position + 1]
+            yield str(self.symbols[position]), self.dates[start:end], \
+                {c: self.columns[c][start:end] for c in columns}
+
+
+def last_bars(store_dir: str = STORE_DIR) -> Dict[str, Tuple[pd.Timestamp, float]]:
+    """(last date, last close) of every symbol in the store; empty when there is no store."""
+    if not store_exists(store_dir):
+        return {}
+
+    def read(meta, data_dir):
+        symbols, offsets = _symbol_index(data_dir)
+        last_rows = offsets[1:] - 1
+        dates = np.asarray(_load_column(data_dir, 'Date')[last_rows])
+        closes = np.asarray(_load_column(data_dir, 'Close')[last_rows])
+        return symbols, dates, closes
+
+    symbols, dates, closes = _read_store(store_dir, read)
+    return {str(symbol): (pd.Timestamp(date), float(close)) for symbol, date, close in zip(symbols, dates, closes)}
+
+
+class StoreAppender:
+    """
+    Streams fetched symbols into the store without holding them in memory.
+
+    Each append() writes one symbol's rows to raw column files in a staging
+    directory next to the store. commit() then writes a new store version in a
+    single pass over memory-mapped columns, copying every symbol either from
+    the staging files or from the current version, so memory stays flat no
+    matter how many symbols were fetched.
+
+    Staged symbols survive a crash: a new appender over the same staging
+    directory resumes from the symbols it already holds, as long as they were
+    staged today.
+    """
+
+    COLUMN_TYPES = {'Date': np.int64, 'Open': np.float64, 'High': np.float64,
+                    'Low': np.float64, 'Close': np.float64, 'Volume': np.int64}
+    SEGMENTS_FILE = "segments.jsonl"
+
+    def __init__(self, store_dir: str = STORE_DIR, staging_dir: Optional[str] = None, resume: bool = True) -> None:
+        self.store_dir = store_dir
+        self.staging_dir = staging_dir or store_dir.rstrip(os.sep) + "_staging"
+        self.lock = threading.Lock()
+        # symbol -> (first staged row, row count, replace the stored history); the last append wins
+        self.segments: Dict[str, Tuple[int, int, bool]] = {}
+        self.rows = 0
+
+        segments_path = os.path.join(self.staging_dir, self.SEGMENTS_FILE)
+        if resume and os.path.exists(segments_path) and \
+                datetime.date.fromtimestamp(os.path.getmtime(segments_path)) == datetime.date.today():
+            self._load_segments(segments_path)
+        else:
+            shutil.rmtree(self.staging_dir, ignore_errors=True)
+        os.makedirs(self.staging_dir, exist_ok=True)
+
+        # Drop rows appended after the last recorded segment (interrupted append)
+        for column in self.COLUMN_TYPES:
+            with open(self._staged_path(column), 'ab') as f:
+                f.truncate(self.rows * np.dtype(self.COLUMN_TYPES[column]).itemsize)
+
+    def _staged_path(self, column: str) -> str:
+        return os.path.join(self.staging_dir, f"{column}.bin")
+
+    def _load_segments(self, segments_path: str) -> None:
+        with open(segments_path, 'r') as f:
+            for line in f:
+                try:
+                    segment = json.loads(line)
+                except ValueError:
+                    break
+                self.segments[segment['symbol']] = (self.rows, segment['rows'], segment['replace'])
+                self.rows += segment['rows']
+
+    @property
+    def staged_symbols(self) -> List[str]:
+        return list(self.segments)
+
+    def append(self, symbol: str, df: pd.DataFrame, replace: bool = False) -> None:
+        """
+        Stage one symbol's rows (Date and OHLCV columns).
+
+        With replace=True the symbol's stored history is dropped on commit,
+        otherwise the rows are added to it and win on dates already stored.
+        """
+        df = normalize_price_frame(df.assign(Symbol=symbol))
+        arrays = {
+            'Date': df['Date'].to_numpy(dtype='datetime64[D]').astype(np.int64),
+            'Volume': df['Volume'].fillna(0).to_numpy(dtype=np.int64),
+        }
+        for column in ['Open', 'High', 'Low', 'Close']:
+            arrays[column] = df[column].to_numpy(dtype=np.float64)
+
+        with self.lock:
+            for column, values in arrays.items():
+                with open(self._staged_path(column), 'ab') as f:
+                    values.tofile(f)
+            # The segment is recorded after its rows, so a crash in between only loses this symbol
+            with open(os.path.join(self.staging_dir, self.SEGMENTS_FILE), 'a') as f:
+                f.write(json.dumps({'symbol': symbol, 'rows': len(df), 'replace': replace}) + "\n")
+            self.segments[symbol] = (self.rows, len(df), replace)
+            self.rows += len(df)
+
+    def _staged_column(self, column: str) -> np.ndarray:
+        dtype = self.COLUMN_TYPES[column]
+        if self.rows == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(self._staged_path(column), dtype=dtype, mode='r', shape=(self.rows,))
+
+    def commit(self, keep_symbols: Optional[Iterable[str]] = None, since=None, incremental: bool = True) -> Dict:
+        """
+        Write the store from the staged symbols and remove the staging directory.
+
+        Args:
+            keep_symbols: Only keep stored symbols in this set (defaults to every symbol)
+            since: Drop rows before this date
+            incremental: Merge into the current store; False rebuilds it from the staged symbols alone
+        """
+        with self.lock:
+            staged_dates = self._staged_column('Date')
+            since_day = pd.Timestamp(since).to_datetime64().astype('datetime64[D]').astype(np.int64) \
+                if since is not None else np.iinfo(np.int64).min
+
+            base_symbols, base_offsets = np.array([], dtype=str), np.zeros(1, dtype=np.int64)
+            base_dates = np.zeros(0, dtype=np.int64)
+            base_dir = _current_data_dir(self.store_dir, read_meta(self.store_dir)) if incremental else None
+            if base_dir is not None:
+                base_symbols, base_offsets = _symbol_index(base_dir)
+                base_dates = _load_column(base_dir, 'Date').view(np.int64)
+            base_positions = {str(symbol): position for position, symbol in enumerate(base_symbols)}
+
+            kept = set(keep_symbols) if keep_symbols is not None else None
+            symbols = set(self.segments)
+            symbols.update(s for s in base_positions if kept is None or s in kept)
+            symbols = sorted(symbols)
+
+            # Rows of each symbol: stored rows before its first staged date, then the staged rows
+            pieces = []  # (symbol, base start, base end, staged start, staged end)
+            for symbol in symbols:
+                base_start = base_end = staged_start = staged_end = 0
+                first_staged = np.iinfo(np.int64).max
+                if symbol in self.segments:
+                    start, count, replace = self.segments[symbol]
+                    staged = staged_dates[start:start + count]
+                    staged_start = start + int(np.searchsorted(staged, since_day))
+                    staged_end = start + count
+                    if count:
+                        first_staged = int(staged[0])
+                else:
+                    replace = False
+                if symbol in base_positions and not replace:
+                    start, end = base_offsets[base_positions[symbol]], base_offsets[base_positions[symbol] + 1]
+                    stored = base_dates[start:end]
+                    base_start = start + int(np.searchsorted(stored, since_day))
+                    base_end = start + int(np.searchsorted(stored, first_staged))
+                    base_end = max(base_end, base_start)
+                if base_end > base_start or staged_end > staged_start:
+                    pieces.append((symbol, base_start, base_end, staged_start, staged_end))
+
+            lengths = np.array([(b1 - b0) + (s1 - s0) for _, b0, b1, s0, s1 in pieces], dtype=np.int64)
+            offsets = np.append(0, np.cumsum(lengths)).astype(np.int64)
+            total = int(offsets[-1])
+
+            # Write every column of the new version, one symbol slice at a time
+            version, data_dir = _new_data_dir(self.store_dir)
+            first_date = last_date = None
+            for column, dtype in self.COLUMN_TYPES.items():
+                base = _load_column(base_dir, column) if len(base_dates) else np.zeros(0, dtype=dtype)
+                staged = self._staged_column(column)
+                out_dtype = np.dtype('datetime64[D]') if column == 'Date' else np.dtype(dtype)
+                out = np.lib.format.open_memmap(_column_path(data_dir, column),
+                                                mode='w+', dtype=out_dtype, shape=(total,))
+                target = out.view(np.int64) if column == 'Date' else out
+                base = base.view(np.int64) if column == 'Date' else base
+                for (_, b0, b1, s0, s1), row in zip(pieces, offsets[:-1]):
+                    target[row:row + b1 - b0] = base[b0:b1]
+                    target[row + b1 - b0:row + b1 - b0 + s1 - s0] = staged[s0:s1]
+                if column == 'Date' and total:
+                    first_date, last_date = out.min(), out.max()
+                out.flush()
+                del out, target, base, staged
+
+            # Publish the version once nothing maps the old files any more (they may be pruned)
+            staged_dates = base_dates = stored = None
+            _save_array(data_dir, 'symbols', np.array([symbol for symbol, *_ in pieces], dtype=str))
+            _save_array(data_dir, 'offsets', offsets)
+            meta = _publish(self.store_dir, version, data_dir, total, len(pieces), first_date, last_date)
+
+            shutil.rmtree(self.staging_dir, ignore_errors=True)
+            self.segments, self.rows = {}, 0
+            return meta
+
+    def discard(self) -> None:
+        """Drop everything staged so far."""
+        with self.lock:
+            shutil.rmtree(self.staging_dir, ignore_errors=True)
+            os.makedirs(self.staging_dir, exist_ok=True)
+            self.segments, self.rows = {}, 0
+
+
+def read_symbol_file(file_path: str) -> List[str]:
+    """Read the 'Symbol' column of a screen result / ban list CSV."""
+    if not os.path.exists(file_path):
+        return []
+    symbols = pd.read_csv(file_path, usecols=['Symbol'])['Symbol']
+    return symbols.dropna().astype(str).tolist()
+
+
+def export_csv(output_file: str = CSV_FILE, store_dir: str = STORE_DIR) -> None:
+    """Write the store back out in the legacy all_tickers_historical.csv format."""
+    df = load_prices(store_dir=store_dir)
+    df['Date'] = df['Date'].dt.strftime('%Y-%m-%d') + " 00:00:00-04:00"
+    df['Dividends'] = 0.0
+    df['Stock Splits'] = 0.0
+    df['Capital Gains'] = ''
+    df[CSV_COLUMNS].to_csv(output_file, index=False)
+    print(f"Exported price store to {output_file}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Columnar price store maintenance")
+    parser.add_argument("--from-csv", nargs="?", const=CSV_FILE, default=None,
+                        help="Build the store from a merged price CSV (defaults to all_tickers_historical.csv)")
+    parser.add_argument("--export-csv", nargs="?", const=CSV_FILE, default=None,
+                        help="Export the store to a CSV (defaults to all_tickers_historical.csv)")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.from_csv:
+        write_price_store(pd.read_csv(args.from_csv))
+    elif args.export_csv:
+        export_csv(args.export_csv)
+    else:
+        print(json.dumps(read_meta(), indent=2))
+        sys.exit(0 if store_exists() else 1)
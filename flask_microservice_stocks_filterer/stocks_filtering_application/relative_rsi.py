@@ -0,0 +1,111 @@
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from price_store import PricePanel
+
+# Stock RSI against market RSI, used by good_rsi_against_market.py.
+#
+# The stock RSIs are computed on a (symbols x rows) matrix aligned on each
+# symbol's last row and every stock date is mapped to its market date with one
+# searchsorted call, so the whole screen is a handful of array operations
+# instead of a per-date scan of the market dates and an iterrows() fill.
+
+RSI_PERIOD = 14
+MARKET_SYMBOL = "^GSPC"  # S&P 500
+
+
+def rolling_rsi(closes: np.ndarray, period: int = RSI_PERIOD) -> np.ndarray:
+    """
+    Simple-moving-average RSI along the last axis of a matrix of closes.
+
+    Same values as the per-series version: NaN until `period` changes are
+    available (or when a change in the window is missing), 100 when the window
+    has no losses and 0 when it has no gains.
+    """
+    closes = np.atleast_2d(np.asarray(closes, dtype=np.float64))
+    delta = np.full(closes.shape, np.nan)
+    delta[:, 1:] = np.diff(closes, axis=1)
+    gain = np.clip(delta, 0, None)
+    loss = -np.clip(delta, None, 0)
+
+    avg_gain = np.full(closes.shape, np.nan)
+    avg_loss = np.full(closes.shape, np.nan)
+    if closes.shape[1] >= period:
+        avg_gain[:, period - 1:] = sliding_window_view(gain, period, axis=1).mean(axis=-1)
+        avg_loss[:, period - 1:] = sliding_window_view(loss, period, axis=1).mean(axis=-1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = np.where(avg_loss == 0, np.inf, np.where(avg_gain == 0, 0, avg_gain / avg_loss))
+        return 100 - (100 / (1 + rs))
+
+
+def market_positions(dates: np.ndarray, market_dates: np.ndarray) -> np.ndarray:
+    """
+    Index of the market date to use for each date: the most recent market date
+    on or before it (weekends/holidays), or the first market date when there is none.
+    """
+    positions = np.searchsorted(market_dates, dates, side='right') - 1
+    return np.clip(positions, 0, len(market_dates) - 1)
+
+
+def rsi_vs_market(panel: PricePanel, market_dates: np.ndarray, market_closes: np.ndarray,
+                  period: int = RSI_PERIOD) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Highest and lowest daily StockRSI - MarketRSI of every symbol in the panel.
+
+    Returns:
+        (best_days, worst_days): Symbol with Max_Market_RSI_Diff_3M /
+        Min_Market_RSI_Diff_3M, both sorted descending. Symbols without any
+        day where both RSIs are available are left out.
+    """
+    width = int(panel.lengths.max()) if len(panel) else 1
+    stock_rsi = rolling_rsi(panel.trailing_matrix('Close', width), period)
+    market_rsi = rolling_rsi(market_closes, period)[0]
+
+    positions, inside = panel.trailing_positions(width)
+    dates = panel.dates[np.where(inside, positions, 0)]
+    aligned_market_rsi = np.where(inside, market_rsi[market_positions(dates, market_dates)], np.nan)
+    differences = stock_rsi - aligned_market_rsi
+
+    valid = ~np.isnan(differences).all(axis=1)
+    symbols = panel.symbols[valid].astype(object)
+    differences = differences[valid]
+
+    best_days = pd.DataFrame({'Symbol': symbols, 'Max_Market_RSI_Diff_3M': np.nanmax(differences, axis=1)})
+    best_days.sort_values(by='Max_Market_RSI_Diff_3M', ascending=False, inplace=True)
+    worst_days = pd.DataFrame({'Symbol': symbols, 'Min_Market_RSI_Diff_3M': np.nanmin(differences, axis=1)})
+    worst_days.sort_values(by='Min_Market_RSI_Diff_3M', ascending=False, inplace=True)
+    return best_days, worst_days
+
+
+def fetch_market_closes(start: pd.Timestamp, end: pd.Timestamp,
+                        symbol: str = MARKET_SYMBOL) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Daily market closes from yfinance between start and end (inclusive).
+
+    Returns:
+        (dates, closes) sorted by date, dates as calendar days in the
+        exchange's time zone so they line up with the price store dates.
+    """
+    import yfinance as yf
+
+    market_ticker = yf.Ticker(symbol)
+    end_exclusive = (end + pd.DateOffset(days=1)).strftime("%Y-%m-%d")
+    market_data = market_ticker.history(start=start.strftime("%Y-%m-%d"), end=end_exclusive, interval="1d")
+
+    if len(market_data) < 5:
+        # Very little data returned, fetch an extra month and cut it back to the range
+        extended_start = start - pd.DateOffset(days=30)
+        market_data = market_ticker.history(start=extended_start.strftime("%Y-%m-%d"), end=end_exclusive, interval="1d")
+        index = market_data.index.tz_localize(None) if market_data.index.tz is not None else market_data.index
+        market_data = market_data[index.normalize() >= start.normalize()]
+
+    index = pd.DatetimeIndex(market_data.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    market = pd.DataFrame({'Date': index.normalize(), 'Close': market_data['Close'].to_numpy()})
+    market = market.dropna(subset=['Date']).sort_values('Date')
+    return market['Date'].to_numpy(dtype='datetime64[D]'), market['Close'].to_numpy(dtype=np.float64)
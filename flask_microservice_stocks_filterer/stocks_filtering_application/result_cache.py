@@ -0,0 +1,134 @@
+import ast
+import hashlib
+import json
+import os
+import shutil
+from datetime import date
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+
+from price_store import PricePanel
+
+# Screen results cached by (screen code, input data, parameters).
+#
+# A screen's result only depends on the code of the screens and the helpers
+# they use, the price data (the store version), the symbols it runs on and
+# its settings. Re-running the pipelines with another top N, a new ban or a
+# different price-increase threshold therefore only recomputes the screens
+# whose key changed; the others are read back from
+# price_data/result_cache/<store version>/ and written to their result CSVs
+# as usual.
+#
+# Keys include the current date because some screens measure their lookback
+# from today rather than from the data.
+
+CACHE_DIR_NAME = "result_cache"
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+# The screens' entry module; it and every app module it imports (directly or
+# not) decide what the screens return
+SCREENS_MODULE = "screens.py"
+
+_code_hash: Optional[str] = None
+
+
+def code_modules(entry: str = SCREENS_MODULE) -> List[str]:
+    """entry and the app modules it imports, transitively (file names, sorted)"""
+    found, pending = set(), [entry]
+    while pending:
+        module = pending.pop()
+        if module in found:
+            continue
+        found.add(module)
+        with open(os.path.join(APP_DIR, module), 'rb') as f:
+            tree = ast.parse(f.read(), filename=module)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                names = [node.module]
+            else:
+                continue
+            for name in names:
+                file_name = f"{name.split('.')[0]}.py"
+                # Only modules of this app; packages and the standard library are skipped
+                if os.path.isfile(os.path.join(APP_DIR, file_name)):
+                    pending.append(file_name)
+    return sorted(found)
+
+
+def code_hash() -> str:
+    """Hash of the screen code (computed once per process)"""
+    global _code_hash
+    if _code_hash is None:
+        digest = hashlib.sha1()
+        for module in code_modules():
+            with open(os.path.join(APP_DIR, module), 'rb') as f:
+                digest.update(f.read())
+        _code_hash = digest.hexdigest()
+    return _code_hash
+
+
+def fingerprint(value) -> str:
+    """Stable hash of JSON-like inputs (symbol lists, settings); other objects hash by str()"""
+    payload = json.dumps(value, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+class ResultCache:
+    """Screen results of one store version, persisted as pickles next to the store"""
+
+    def __init__(self, panel: PricePanel) -> None:
+        self.cache_dir = None
+        if panel.version and panel.store_dir:
+            self.cache_dir = os.path.join(os.path.dirname(panel.store_dir), CACHE_DIR_NAME, panel.version)
+        self.version = panel.version
+
+    def key(self, name: str, inputs: Dict) -> str:
+        payload = [name, code_hash(), self.version, date.today().isoformat(), inputs]
+        return f"{name}-{fingerprint(payload)[:20]}"
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.pkl")
+
+    def get(self, key: str) -> Optional[pd.DataFrame]:
+        if self.cache_dir is None:
+            return None
+        try:
+            return pd.read_pickle(self._path(key))
+        except (OSError, EOFError, ValueError, ImportError, AttributeError):
+            return None
+
+    def put(self, key: str, result: pd.DataFrame) -> None:
+        if self.cache_dir is None:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = self._path(key) + ".tmp"
+            result.to_pickle(tmp_path)
+            os.replace(tmp_path, self._path(key))
+        except OSError as e:
+            print(f"Could not cache result {key}: {e}")
+            return
+
+        # Results of older store versions can never be hit again
+        versions_dir = os.path.dirname(self.cache_dir)
+        for version in os.listdir(versions_dir):
+            if version != self.version:
+                shutil.rmtree(os.path.join(versions_dir, version), ignore_errors=True)
+
+    def get_or_compute(self, name: str, inputs: Dict,
+                       compute: Callable[[], Optional[pd.DataFrame]]):
+        """
+        Cached result of a screen, or compute() stored under its key.
+
+        Returns (result, hit). None results (failed screens) are not cached.
+        """
+        key = self.key(name, inputs)
+        result = self.get(key)
+        if result is not None:
+            return result, True
+        result = compute()
+        if result is not None:
+            self.put(key, result)
+        return result, False
@@ -0,0 +1,72 @@
+import warnings
+import numpy as np
+import pandas as pd
+
+from price_store import PricePanel
+
+# IBD-style relative strength for the whole universe at once.
+#
+# The closes of every symbol are laid out as a (symbols x 252) matrix aligned
+# on each symbol's last trading day, so the four quarterly averages, the
+# weighted strength factor and the percentile rank are a few array operations
+# instead of a per-symbol loop. The numbers are the same as the original
+# ibd_rs_ranking.py: quarters are the trailing 63-row blocks, NaN closes are
+# skipped in the averages and symbols with 252 rows or fewer get no rating.
+
+QUARTER_LENGTH = 63
+LOOKBACK = 4 * QUARTER_LENGTH
+# Weight of each quarter, most recent first
+QUARTER_WEIGHTS = [0.4, 0.2, 0.2, 0.2]
+
+
+def quarterly_averages(closes: np.ndarray) -> np.ndarray:
+    """
+    Average close of each trailing quarter.
+
+    Args:
+        closes: (symbols x LOOKBACK) matrix, oldest column first
+
+    Returns:
+        (symbols x 4) matrix, most recent quarter first
+    """
+    averages = []
+    for quarter in range(4):
+        end = LOOKBACK - quarter * QUARTER_LENGTH
+        block = closes[:, end - QUARTER_LENGTH:end]
+        with warnings.catch_warnings():
+            # All-NaN quarters average to NaN, like Series.mean()
+            warnings.simplefilter("ignore", category=RuntimeWarning)
+            averages.append(np.nanmean(block, axis=1))
+    return np.column_stack(averages)
+
+
+def strength_factors(panel: PricePanel) -> pd.Series:
+    """Weighted rate of change of the current close against each quarterly average, by symbol"""
+    eligible = panel.lengths > LOOKBACK
+    closes = panel.trailing_matrix('Close', LOOKBACK)[eligible]
+    symbols = panel.symbols[eligible]
+
+    averages = quarterly_averages(closes)
+    current = closes[:, -1:]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rocs = np.where((averages == 0) | np.isnan(averages), np.nan, (current / averages - 1) * 100)
+
+    strength = QUARTER_WEIGHTS[0] * rocs[:, 0]
+    for quarter in range(1, 4):
+        strength = strength + QUARTER_WEIGHTS[quarter] * rocs[:, quarter]
+
+    valid = ~np.isnan(strength)
+    return pd.Series(strength[valid], index=symbols[valid].astype(object), name='StrengthFactor')
+
+
+def rank_strength(strength: pd.Series) -> pd.DataFrame:
+    """Percentile rank (0-99) of each strength factor, sorted by IBD_RSI descending"""
+    rs_df = pd.DataFrame({'Symbol': strength.index, 'StrengthFactor': strength.values})
+    rs_df['IBD_RSI'] = np.clip(rs_df['StrengthFactor'].rank(pct=True) * 100, 0, 99).astype(int)
+    rs_df = rs_df.sort_values('IBD_RSI', ascending=False)
+    return rs_df[['Symbol', 'IBD_RSI']]
+
+
+def calculate_ibd_rs(panel: PricePanel) -> pd.DataFrame:
+    """IBD_RSI of every symbol with more than a year of history"""
+    return rank_strength(strength_factors(panel))
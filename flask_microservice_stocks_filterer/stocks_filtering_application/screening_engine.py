@@ -0,0 +1,388 @@
+import os
+import sys
+import time
+import logging
+import argparse
+import importlib
+from datetime import datetime
+import threading
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+import parallel_screens
+from price_store import PricePanel
+from result_cache import ResultCache, fingerprint
+from screens import OBLIGATORY_SCREENS, RANKING_SCREENS
+from stage_graph import StageGraph
+
+# In-process screening engine.
+#
+# The pipeline folders (minervini_1mo, minervini_4mo, minervini_1mo_unbanned,
+# ipos) used to run as one subprocess each, with every screen in them started
+# as yet another Python process that re-imported pandas and re-read the price
+# data. The engine loads the price panel once and runs every pipeline as a
+# PipelineConfig over the screen functions registered in screens.py. Result
+# CSVs are written to the same places as before, so the rankings endpoints
+# and the per-pipeline top_n scripts read them unchanged.
+#
+# The pipelines are stages of one StageGraph: each stage starts as soon as the
+# stages it reads from are done, and obligatory screens with the same settings
+# are a single stage shared by every pipeline. Screen results are cached by
+# (code, store version, inputs), so a re-run only recomputes the screens whose
+# inputs changed.
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+
+
+@dataclass
+class PipelineConfig:
+    """Static description of one screening pipeline"""
+    name: str
+    obligatory_screens: List[str]
+    ranking_screens: List[str]
+    # Months the 200MA has to be rising for trending_up
+    trend_months: int = 1
+    # Rank the stocks that are not banned, or every stock that passed
+    rank_banned: bool = False
+    # Drop banned stocks from the ranking's IBD RS column
+    rs_excludes_banned: bool = True
+    # Lookback of top_price_increases_1y (None = the whole history)
+    price_increase_lookback: Optional[pd.DateOffset] = field(default_factory=lambda: pd.DateOffset(years=1))
+    # Pipeline whose obligatory_passed_stocks.csv is excluded from the final ranking
+    top_n_exclusion: Optional[str] = None
+
+    @property
+    def base_dir(self) -> str:
+        return os.path.join(script_dir, self.name)
+
+    @property
+    def obligatory_results_dir(self) -> str:
+        return os.path.join(self.base_dir, "obligatory_screens", "results")
+
+    @property
+    def ranking_results_dir(self) -> str:
+        return os.path.join(self.base_dir, "ranking_screens", "results")
+
+    @property
+    def passed_stocks_file(self) -> str:
+        return os.path.join(self.obligatory_results_dir, "obligatory_passed_stocks.csv")
+
+
+MINERVINI_OBLIGATORY = ["ibd_rs_ranking", "above_52week_low", "trending_up", "close_to_52week_high",
+                        "minimum_price_increase", "minimum_5_dollar"]
+MINERVINI_RANKING = ["ibd_rs_ticker_filterer", "top_price_increases_1y", "price_spikes", "volume_acceleration",
+                     "top_price_tightness_1w", "top_rsi", "mvp", "top_rsi_6m", "top_rsi_12m"]
+
+# minervini_4mo is listed before minervini_1mo because minervini_1mo's ranking
+# excludes the stocks that passed minervini_4mo, so its stage has to exist first
+PIPELINES: Dict[str, PipelineConfig] = {
+    "minervini_4mo": PipelineConfig(
+        name="minervini_4mo",
+        obligatory_screens=MINERVINI_OBLIGATORY,
+        ranking_screens=MINERVINI_RANKING,
+        trend_months=4,
+    ),
+    "minervini_1mo": PipelineConfig(
+        name="minervini_1mo",
+        obligatory_screens=MINERVINI_OBLIGATORY,
+        ranking_screens=MINERVINI_RANKING,
+        top_n_exclusion="minervini_4mo",
+    ),
+    "minervini_1mo_unbanned": PipelineConfig(
+        name="minervini_1mo_unbanned",
+        obligatory_screens=MINERVINI_OBLIGATORY,
+        ranking_screens=MINERVINI_RANKING,
+        rank_banned=True,
+        rs_excludes_banned=False,
+    ),
+    "ipos": PipelineConfig(
+        name="ipos",
+        obligatory_screens=["close_to_52week_high", "trading_for_at_most_3mo", "minimum_5_dollar"],
+        ranking_screens=["top_price_increases_1y", "price_spikes", "volume_acceleration", "top_price_tightness_1w",
+                         "top_rsi", "mvp", "days_traded", "top_rsi_6m", "top_rsi_12m"],
+        price_increase_lookback=None,
+    ),
+}
+
+
+class PipelineRun:
+    """State of one pipeline while the engine runs it; passed to every screen"""
+
+    def __init__(self, config: PipelineConfig, panel: PricePanel, price_increase: float, top_n: int,
+                 result_cache: Optional[ResultCache] = None) -> None:
+        self.config = config
+        self.panel = panel
+        self.result_cache = result_cache
+        self.price_increase = price_increase
+        self.top_n = top_n
+        self.obligatory_results: Dict[str, pd.DataFrame] = {}
+        self.passed: List[str] = []
+        self.not_banned: List[str] = []
+        self.universe: List[str] = []
+        self._frame: Optional[pd.DataFrame] = None
+        self._frame_lock = threading.Lock()
+
+    @property
+    def frame(self) -> pd.DataFrame:
+        """Price rows of the ranked universe as a long DataFrame, built on first use"""
+        with self._frame_lock:
+            if self._frame is None:
+                self._frame = self.panel.frame(self.universe)
+        return self._frame
+
+    @property
+    def filtered_rs_ratings(self) -> pd.DataFrame:
+        """IBD RS ratings of the stocks that passed the obligatory screens"""
+        rs_df = self.obligatory_results.get("ibd_rs_ranking", pd.DataFrame(columns=['Symbol', 'IBD_RSI']))
+        return rs_df[rs_df['Symbol'].isin(set(self.passed))]
+
+
+def cleanup_results(config: PipelineConfig) -> None:
+    """Delete the result CSVs of the previous run"""
+    for directory in [config.ranking_results_dir, config.obligatory_results_dir]:
+        os.makedirs(directory, exist_ok=True)
+        for root, _, files in os.walk(directory):
+            for file in files:
+                if file.lower().endswith('.csv'):
+                    try:
+                        os.remove(os.path.join(root, file))
+                    except OSError as e:
+                        logging.error(f"Error deleting {os.path.join(root, file)}: {e}")
+
+
+def write_result(df: pd.DataFrame, output_file: str) -> None:
+    df.to_csv(output_file, index=False)
+
+
+def run_screen(registry, name: str, panel: PricePanel, run: PipelineRun,
+               inputs: Optional[Dict] = None) -> Optional[pd.DataFrame]:
+    """
+    Run one registered screen, logging its duration; failures are logged and return None.
+
+    With `inputs` (everything besides the price data the result depends on) and
+    a result cache on the run, an unchanged screen is read back instead.
+    """
+    output_file, func = registry[name]
+    start = time.perf_counter()
+
+    def compute():
+        try:
+            return func(panel, run)
+        except Exception as e:
+            logging.error(f"[{run.config.name}] [{name} ERROR] {e}")
+            return None
+
+    if run.result_cache is not None and inputs is not None:
+        result, hit = run.result_cache.get_or_compute(name, inputs, compute)
+    else:
+        result, hit = compute(), False
+    if result is None:
+        return None
+    source = "cached" if hit else "computed"
+    logging.info(f"[{run.config.name}] [{name}] {len(result)} stocks {source} in "
+                 f"{time.perf_counter() - start:.2f}s -> {output_file}")
+    return result
+
+
+def ranking_inputs(run: PipelineRun) -> Dict:
+    """What a ranking screen reads from the run besides the price data"""
+    return {
+        'universe': fingerprint(run.universe),
+        'not_banned': fingerprint(run.not_banned),
+        'rs_ratings': fingerprint(run.filtered_rs_ratings.to_dict('list')),
+        'rs_excludes_banned': run.config.rs_excludes_banned,
+        'price_increase_lookback': run.config.price_increase_lookback,
+    }
+
+
+def apply_bans(run: PipelineRun) -> None:
+    """Drop expired bans and split the passed stocks, like banned_stocks/banned_filter.py"""
+    banned_filter = importlib.import_module(f"{run.config.name}.banned_stocks.banned_filter")
+    banned_dir = os.path.join(run.config.base_dir, "banned_stocks")
+    not_banned_file = os.path.join(banned_dir, "stocks_not_banned.csv")
+    banned_file = os.path.join(banned_dir, "banned_stocks.csv")
+
+    try:
+        banned_symbols = banned_filter.read_banned_symbols(banned_file)
+        allowed, banned_symbols, removed_count = banned_filter.process_symbols(
+            run.passed, banned_symbols, datetime.now())
+        banned_filter.write_banned_symbols(banned_file, banned_symbols)
+    except Exception as e:
+        logging.error(f"[{run.config.name}] Error applying bans: {e}")
+        allowed, removed_count = [], 0
+
+    run.not_banned = allowed
+    write_result(pd.DataFrame({'Symbol': allowed}), not_banned_file)
+    logging.info(f"[{run.config.name}] Checking {len(run.passed)} symbols for ban. "
+                 f"{len(allowed)} symbols are allowed. Removed {removed_count} expired bans.")
+
+
+def screen_cache_key(name: str, run: PipelineRun):
+    """Obligatory screens see the whole panel, so equal settings give equal results across pipelines"""
+    if name == "trending_up":
+        return name, run.config.trend_months
+    if name == "minimum_price_increase":
+        return name, run.price_increase
+    return name
+
+
+def obligatory_stage_name(name: str, run: PipelineRun) -> str:
+    """Stage of an obligatory screen, shared by every pipeline with the same cache key"""
+    key = screen_cache_key(name, run)
+    return "obligatory:" + (":".join(str(part) for part in key) if isinstance(key, tuple) else key)
+
+
+def collect_passed(run: PipelineRun, *results) -> List[str]:
+    """Write the obligatory results of the pipeline and intersect them into obligatory_passed_stocks.csv"""
+    config = run.config
+    for name, result in zip(config.obligatory_screens, results):
+        if result is not None:
+            run.obligatory_results[name] = result
+            write_result(result, os.path.join(config.obligatory_results_dir, OBLIGATORY_SCREENS[name][0]))
+
+    # Stocks that passed every obligatory screen that produced a result
+    symbol_sets = [set(df['Symbol'].astype(str)) for df in run.obligatory_results.values()]
+    run.passed = sorted(set.intersection(*symbol_sets)) if symbol_sets else []
+    write_result(pd.DataFrame({'Symbol': run.passed}), config.passed_stocks_file)
+    logging.info(f"[{config.name}] Found {len(run.passed)} stocks that passed all available screens")
+    return run.passed
+
+
+def select_universe(run: PipelineRun, passed: List[str]) -> List[str]:
+    """Apply the bans and pick the stocks the ranking screens run on"""
+    apply_bans(run)
+    run.universe = run.passed if run.config.rank_banned else run.not_banned
+
+    if "ibd_rs_ranking" in run.obligatory_results:
+        write_result(run.filtered_rs_ratings, os.path.join(run.config.obligatory_results_dir, "filtered_rs_file.csv"))
+    return run.universe
+
+
+def ranking_stage(run: PipelineRun, name: str, universe: List[str]) -> Optional[pd.DataFrame]:
+    result = run_screen(RANKING_SCREENS, name, run.panel, run, ranking_inputs(run))
+    if result is not None:
+        write_result(result, os.path.join(run.config.ranking_results_dir, RANKING_SCREENS[name][0]))
+    return result
+
+
+def write_ranking(run: PipelineRun, exclusion_in_graph: bool, *inputs) -> None:
+    """
+    The final ranking, built by the pipeline's own top_n script from the result CSVs.
+
+    The excluded pipeline's passed stocks are read from its last run when it
+    isn't part of this one; without that file the ranking excludes nothing
+    (the top_n script would otherwise wait minutes for it).
+    """
+    config = run.config
+    top_n_module = importlib.import_module(f"{config.name}.top_n_stocks_by_price_increase")
+    output_file = os.path.join(config.base_dir, "stocks_ranking_by_price.csv")
+    exclusion_file = PIPELINES[config.top_n_exclusion].passed_stocks_file if config.top_n_exclusion else None
+    if exclusion_file and not exclusion_in_graph and not os.path.exists(exclusion_file):
+        logging.warning(f"[{config.name}] {config.top_n_exclusion} was not run and has no passed stocks file; "
+                        f"ranking without its exclusion")
+        exclusion_file = None
+    if exclusion_file:
+        top_n_module.process_csv_files(config.ranking_results_dir, run.top_n, output_file, exclusion_file)
+    else:
+        top_n_module.process_csv_files(config.ranking_results_dir, run.top_n, output_file)
+    logging.info(f"[{config.name}] Stock screening pipeline completed successfully.")
+
+
+def add_pipeline(graph: StageGraph, config: PipelineConfig, panel: PricePanel,
+                 price_increase: float, top_n: int, result_cache: Optional[ResultCache] = None) -> PipelineRun:
+    """
+    Add the stages of one pipeline to the graph:
+    obligatory screens -> passed -> bans -> ranking screens -> top N ranking.
+
+    Obligatory screens already added by another pipeline are reused. The top N
+    ranking of a pipeline with a top_n_exclusion also waits for the excluded
+    pipeline's passed stocks when that pipeline is part of the graph.
+    """
+    run = PipelineRun(config, panel, price_increase, top_n, result_cache)
+    logging.info(f"[{config.name}] Starting stock screening pipeline")
+    cleanup_results(config)
+
+    obligatory = [graph.add(obligatory_stage_name(name, run),
+                            partial(run_screen, OBLIGATORY_SCREENS, name, panel, run,
+                                    {'settings': screen_cache_key(name, run)}))
+                  for name in config.obligatory_screens]
+    passed = graph.add(f"{config.name}:passed", partial(collect_passed, run), obligatory)
+    universe = graph.add(f"{config.name}:universe", partial(select_universe, run), [passed])
+    ranking = [graph.add(f"{config.name}:ranking:{name}", partial(ranking_stage, run, name), [universe])
+               for name in config.ranking_screens]
+
+    inputs = ranking
+    excluded_passed = f"{config.top_n_exclusion}:passed"
+    exclusion_in_graph = bool(config.top_n_exclusion) and excluded_passed in graph
+    if exclusion_in_graph:
+        inputs = ranking + [excluded_passed]
+    graph.add(f"{config.name}:top_n", partial(write_ranking, run, exclusion_in_graph), inputs)
+    return run
+
+
+def run_all_pipelines(price_increase: float, top_n: int, pipelines: Optional[List[str]] = None,
+                      status_tracker=None, panel: Optional[PricePanel] = None,
+                      max_workers: Optional[int] = None, use_cache: bool = True,
+                      processes: Optional[int] = None) -> Dict[str, PipelineRun]:
+    """
+    Load the price panel once and run the requested pipelines (all of them by
+    default) against it, as one stage graph on a pool of `max_workers` threads.
+    Per-symbol screens use `processes` worker processes (defaults to the CPU count).
+    With use_cache=False every screen is recomputed.
+    """
+    parallel_screens.configure(processes)
+    start = time.perf_counter()
+    if panel is None:
+        panel = PricePanel.load()
+    logging.info(f"Loaded price panel with {len(panel)} symbols in {time.perf_counter() - start:.2f}s")
+
+    # PIPELINES lists excluded pipelines first, so their stages exist when the exclusion is added
+    graph = StageGraph()
+    result_cache = ResultCache(panel) if use_cache else None
+    runs = {}
+    for name in [p for p in PIPELINES if pipelines is None or p in pipelines]:
+        runs[name] = add_pipeline(graph, PIPELINES[name], panel, price_increase, top_n, result_cache)
+
+    def on_finish(stage: str, finished: int, total: int, seconds: float) -> None:
+        if status_tracker:
+            status_tracker.record_stage(stage, seconds, finished, total)
+
+    try:
+        graph.run(max_workers, on_finish)
+    finally:
+        parallel_screens.release(panel)
+    logging.info(f"All pipelines completed in {time.perf_counter() - start:.2f}s")
+    return runs
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run the screening pipelines in a single process")
+    parser.add_argument("price_increase", type=float, help="Minimum price increase percentage")
+    parser.add_argument("--top-n", type=int, default=100, help="Number of top stocks to select")
+    parser.add_argument("--pipelines", nargs="+", choices=list(PIPELINES), default=None,
+                        help="Pipelines to run (defaults to all)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Stages running at the same time (defaults to the CPU count)")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="Worker processes for per-symbol screens (defaults to the CPU count, 1 = serial)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Recompute every screen instead of reusing cached results")
+    return parser.parse_args()
+
+
+def main():
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[logging.StreamHandler(sys.stdout)]
+    )
+    args = parse_args()
+    run_all_pipelines(args.price_increase, args.top_n, args.pipelines, max_workers=args.workers,
+                      use_cache=not args.no_cache, processes=args.processes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta
+from functools import partial
+from typing import Callable, Dict, Tuple
+
+from indicators import max_rsi
+from mvp_scanner import mvp_summary, mvp_windows
+from parallel_screens import map_symbols
+from rs_engine import calculate_ibd_rs
+from trend_template import passing_symbols, trending_up_conditions
+
+# Screen functions used by screening_engine.py.
+#
+# Each function reproduces one of the standalone scripts in the pipeline
+# folders (same thresholds, same output columns), but works on the PricePanel
+# that the engine loaded once instead of reading the price data itself.
+# A screen receives (panel, run) where `run` is the engine's PipelineRun and
+# returns the DataFrame that gets written to the screen's result CSV.
+#
+# Screens that loop over symbols keep the per-symbol work in a module-level
+# function run through parallel_screens.map_symbols, which spreads large
+# universes over worker processes reading the prices from shared memory.
+
+# name -> (result file name, function)
+OBLIGATORY_SCREENS: Dict[str, Tuple[str, Callable]] = {}
+RANKING_SCREENS: Dict[str, Tuple[str, Callable]] = {}
+
+
+def obligatory_screen(name: str, output_file: str):
+    """Register a screen whose result is intersected into obligatory_passed_stocks.csv"""
+    def register(func):
+        OBLIGATORY_SCREENS[name] = (output_file, func)
+        return func
+    return register
+
+
+def ranking_screen(name: str, output_file: str):
+    """Register a screen whose result becomes a column of the final ranking"""
+    def register(func):
+        RANKING_SCREENS[name] = (output_file, func)
+        return func
+    return register
+
+
+def symbol_frame(symbols) -> pd.DataFrame:
+    return pd.DataFrame({'Symbol': list(symbols)})
+
+
+# ---------------------------------------------------------------------------
+# Obligatory screens
+# ---------------------------------------------------------------------------
+
+@obligatory_screen("ibd_rs_ranking", "raw_rs_file.csv")
+def ibd_rs_ranking(panel, run) -> pd.DataFrame:
+    """IBD-style RS rating from the current close against quarterly average closes"""
+    return calculate_ibd_rs(panel)
+
+
+@obligatory_screen("trending_up", "trending_up_stocks.csv")
+def trending_up(panel, run) -> pd.DataFrame:
+    """Close > 50MA > 150MA > 200MA with a rising 200MA over `trend_months` months"""
+    return symbol_frame(passing_symbols(panel, trending_up_conditions(run.config.trend_months)))
+
+
+@obligatory_screen("above_52week_low", "above_52week_low.csv")
+def above_52week_low(panel, run) -> pd.DataFrame:
+    """Last close at least 30% above the 52-week low close"""
+    return symbol_frame(passing_symbols(panel, ['above_52week_low']))
+
+
+@obligatory_screen("close_to_52week_high", "close_to_52week_high.csv")
+def close_to_52week_high(panel, run) -> pd.DataFrame:
+    """Last close within 25% of the 52-week high close"""
+    return symbol_frame(passing_symbols(panel, ['close_to_52week_high']))
+
+
+def _year_price_increase(symbol, dates, values, cutoff_date, min_increase):
+    recent = dates >= cutoff_date
+    highs = values['High'][recent]
+    lows = values['Low'][recent]
+    valid = (highs > 0) & (lows > 0)
+    if not valid.any():
+        return None
+
+    year_high = highs[valid].max()
+    year_low = lows[valid].min()
+    price_increase = (year_high - year_low) / year_low * 100
+    return (symbol, price_increase) if price_increase >= min_increase else None
+
+
+@obligatory_screen("minimum_price_increase", "minimum_price_increase.csv")
+def minimum_price_increase(panel, run) -> pd.DataFrame:
+    """Low-to-high move over the last 365 calendar days of at least run.price_increase percent"""
+    cutoff_date = np.datetime64(datetime.today() - timedelta(days=365))
+    kernel = partial(_year_price_increase, cutoff_date=cutoff_date, min_increase=run.price_increase)
+    qualified_stocks = [r for r in map_symbols(panel, kernel, ['High', 'Low']) if r is not None]
+
+    qualified_stocks.sort(key=lambda x: x[1], reverse=True)
+    return pd.DataFrame({
+        'Symbol': [symbol for symbol, _ in qualified_stocks],
+        'Price_Increase_Percentage': [f"{increase:.2f}" for _, increase in qualified_stocks],
+    })
+
+
+@obligatory_screen("minimum_5_dollar", "last_price_above_10.csv")
+def minimum_5_dollar(panel, run) -> pd.DataFrame:
+    """Last close of at least $10 (the file name predates the threshold change)"""
+    return symbol_frame(passing_symbols(panel, ['last_price_above_10']))
+
+
+def _short_history(symbol, dates, values, max_days):
+    dates = dates[~np.isnan(values['Close'])]
+    if len(dates) and (dates.max() - dates.min()) <= np.timedelta64(max_days, 'D'):
+        return symbol
+    return None
+
+
+@obligatory_screen("trading_for_at_most_3mo", "trading_for_at_most_3mo.csv")
+def trading_for_at_most_3mo(panel, run, max_months=12) -> pd.DataFrame:
+    """Stocks whose price history spans at most `max_months` months"""
+    kernel = partial(_short_history, max_days=max_months * 30)
+    return symbol_frame([s for s in map_symbols(panel, kernel, ['Close']) if s is not None])
+
+
+# ---------------------------------------------------------------------------
+# Ranking screens (run on run.universe, the symbols that passed and are not banned)
+# ---------------------------------------------------------------------------
+
+@ranking_screen("ibd_rs_ticker_filterer", "filtered_banned_rs_file.csv")
+def ibd_rs_ticker_filterer(panel, run) -> pd.DataFrame:
+    """IBD RS ratings of the ranked universe"""
+    rs_df = run.filtered_rs_ratings
+    if run.config.rs_excludes_banned:
+        rs_df = rs_df[rs_df['Symbol'].isin(set(run.not_banned))]
+    return rs_df
+
+
+def _price_range_screen(run_frame: pd.DataFrame, offset, column, ascending, relative_to) -> pd.DataFrame:
+    df = run_frame
+    if offset is not None and len(df):
+        df = df[df['Date'] >= df['Date'].max() - offset]
+    grouped = df.groupby('Symbol')
+    high, low = grouped['High'].max(), grouped['Low'].min()
+    values = (high - low) / (low if relative_to == 'low' else high) * 100
+    values = values.sort_values(ascending=ascending)
+    return pd.DataFrame({'Symbol': values.index, column: values.values})
+
+
+@ranking_screen("top_price_increases_1y", "top_price_increase_1y.csv")
+def top_price_increases_1y(panel, run) -> pd.DataFrame:
+    """Low-to-high move over the last year (the whole history for configs without a lookback)"""
+    lookback = run.config.price_increase_lookback
+    return _price_range_screen(run.frame, lookback, 'Price_Increase_Percentage',
+                               ascending=False, relative_to='low')
+
+
+@ranking_screen("top_price_tightness_1w", "top_price_tightness_1w.csv")
+def top_price_tightness_1w(panel, run) -> pd.DataFrame:
+    """High-low range of the last week as a percentage of the high"""
+    return _price_range_screen(run.frame, pd.DateOffset(weeks=1), 'Price_Tightness_1W',
+                               ascending=True, relative_to='high')
+
+
+def _count_spikes(symbol, dates, values):
+    if len(dates) == 0:
+        return None
+    recent = dates > dates.max() - np.timedelta64(60, 'D')
+    if recent.sum() < 2:
+        return None
+
+    opens, closes = values['Open'][recent], values['Close'][recent]
+    volumes = values['Volume'][recent]
+    avg_volume = volumes.mean()
+
+    up_days = closes > opens
+    avg_price_increase = (closes[up_days] - opens[up_days]).mean() if up_days.any() else np.nan
+
+    spikes = up_days & (closes - opens > 3 * avg_price_increase) & (volumes > 3 * avg_volume)
+    num_spikes = int(spikes.sum())
+    return {'Symbol': symbol, 'Nr_Of_Spikes': num_spikes} if num_spikes > 0 else None
+
+
+@ranking_screen("price_spikes", "price_spikes.csv")
+def price_spikes(panel, run) -> pd.DataFrame:
+    """Up days in the last 2 months with 3x the average gain on 3x the average volume"""
+    results = map_symbols(panel, _count_spikes, ['Open', 'Close', 'Volume'], run.universe)
+    return pd.DataFrame([r for r in results if r is not None])
+
+
+def _volume_acceleration(symbol, dates, values, since):
+    volumes = values['Volume']
+    recent_volumes = volumes[dates >= since]
+    if len(recent_volumes) < 2:
+        return None
+
+    avg_volume_all = volumes.mean()
+    avg_volume_recent = recent_volumes.mean()
+    if avg_volume_all == 0:
+        acceleration = float('inf') if avg_volume_recent > 0 else 0
+    else:
+        acceleration = (avg_volume_recent - avg_volume_all) / avg_volume_all * 100
+    return (symbol, acceleration) if acceleration > 50 else None
+
+
+@ranking_screen("volume_acceleration", "volume_acceleration_stocks.csv")
+def volume_acceleration(panel, run) -> pd.DataFrame:
+    """Average volume of the last 2 months at least 50% above the full-history average"""
+    two_months_ago = np.datetime64(datetime.now() - timedelta(days=60))
+    kernel = partial(_volume_acceleration, since=two_months_ago)
+    accelerated_stocks = [r for r in map_symbols(panel, kernel, ['Volume'], run.universe) if r is not None]
+
+    return pd.DataFrame({
+        'Symbol': [symbol for symbol, _ in accelerated_stocks],
+        'Volume-Acceleration(%)': [f"{a:.2f}" if a != float('inf') else "inf" for _, a in accelerated_stocks],
+    })
+
+
+def max_rsi_screen(panel, symbols, months: int, column: str) -> pd.DataFrame:
+    """Highest 14-day RSI over the last `months` months, from the RSI shared by every pipeline"""
+    max_rsi_values = max_rsi(panel, months, symbols)
+    result_df = pd.DataFrame({'Symbol': max_rsi_values.index, column: max_rsi_values.values})
+    return result_df.sort_values(column, ascending=False)
+
+
+@ranking_screen("top_rsi", "max_rsi_3m.csv")
+def top_rsi(panel, run) -> pd.DataFrame:
+    return max_rsi_screen(panel, run.universe, 3, 'RSI_3M')
+
+
+@ranking_screen("top_rsi_6m", "max_rsi_6m.csv")
+def top_rsi_6m(panel, run) -> pd.DataFrame:
+    return max_rsi_screen(panel, run.universe, 6, 'RSI_6M')
+
+
+@ranking_screen("top_rsi_12m", "max_rsi_12m.csv")
+def top_rsi_12m(panel, run) -> pd.DataFrame:
+    return max_rsi_screen(panel, run.universe, 12, 'RSI_12M')
+
+
+@ranking_screen("mvp", "mvp_stocks_6mo.csv")
+def mvp(panel, run) -> pd.DataFrame:
+    """Momentum, volume and price (MVP) setup at least once in the last 6 months, with the window starts"""
+    return mvp_summary(mvp_windows(panel, run.universe, lookback_days=180))
+
+
+@ranking_screen("days_traded", "Days_Traded.csv")
+def days_traded(panel, run) -> pd.DataFrame:
+    """Number of trading days in each symbol's history"""
+    trading_days = run.frame.groupby('Symbol')['Date'].nunique().sort_values(ascending=False)
+    return pd.DataFrame({'Symbol': trading_days.index, 'Days_Traded': trading_days.values})
@@ -0,0 +1,119 @@
+import logging
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+# Dependency graph of pipeline stages, used by screening_engine.py.
+#
+# Each stage declares the stages whose results it takes as inputs. Stages are
+# added by name, and adding a name that already exists returns the existing
+# stage, so work that several pipelines need (the RS ranking, the price
+# filters) is one node that runs once. A stage starts on the worker pool as
+# soon as all its inputs have finished, instead of waiting for every stage
+# of the previous phase.
+
+DEFAULT_WORKERS = os.cpu_count() or 1
+
+
+@dataclass
+class Stage:
+    name: str
+    func: Callable
+    inputs: Sequence[str] = ()
+
+
+class StageGraph:
+    """Stages with declared inputs, run on a bounded worker pool as soon as their inputs are ready"""
+
+    def __init__(self) -> None:
+        self.stages: Dict[str, Stage] = {}
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.stages
+
+    def add(self, name: str, func: Callable, inputs: Sequence[str] = ()) -> str:
+        """
+        Add a stage computed as func(*results of inputs); returns its name.
+
+        Inputs have to be added first, which also keeps the graph acyclic. A
+        stage that already exists is kept as it is (shared by every caller).
+        """
+        if name in self.stages:
+            return name
+        missing = [i for i in inputs if i not in self.stages]
+        if missing:
+            raise ValueError(f"Stage {name} depends on unknown stages: {missing}")
+        self.stages[name] = Stage(name, func, tuple(inputs))
+        return name
+
+    def run(self, max_workers: Optional[int] = None,
+            on_finish: Optional[Callable[[str, int, int, float], None]] = None) -> Dict[str, Any]:
+        """
+        Run every stage and return name -> result.
+
+        A stage that raises is logged and its dependents are skipped; the other
+        stages still run, then a RuntimeError lists what failed.
+
+        Args:
+            max_workers: Stages running at the same time (defaults to the CPU count)
+            on_finish: Called with (stage name, finished count, total, seconds the stage took) after each stage
+        """
+        results: Dict[str, Any] = {}
+        durations: Dict[str, float] = {}
+        failed: Dict[str, BaseException] = {}
+        skipped: List[str] = []
+        waiting = {name: set(stage.inputs) for name, stage in self.stages.items()}
+        dependents: Dict[str, List[str]] = {name: [] for name in self.stages}
+        for name, stage in self.stages.items():
+            for input_name in stage.inputs:
+                dependents[input_name].append(name)
+
+        def execute(stage: Stage):
+            start = time.perf_counter()
+            result = stage.func(*[results[i] for i in stage.inputs])
+            durations[stage.name] = time.perf_counter() - start
+            logging.debug(f"[stage {stage.name}] finished in {durations[stage.name]:.2f}s")
+            return result
+
+        def skip(name: str) -> None:
+            # Dependents of a failed stage never become ready
+            for dependent in dependents[name]:
+                if dependent in waiting:
+                    del waiting[dependent]
+                    skipped.append(dependent)
+                    skip(dependent)
+
+        with ThreadPoolExecutor(max_workers=max_workers or DEFAULT_WORKERS) as executor:
+            running = {}
+
+            def submit_ready():
+                for name in [n for n, inputs in waiting.items() if not inputs]:
+                    del waiting[name]
+                    running[executor.submit(execute, self.stages[name])] = name
+
+            submit_ready()
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        results[name] = future.result()
+                    except Exception as e:
+                        logging.error(f"[stage {name} ERROR] {e}")
+                        failed[name] = e
+                        skip(name)
+                        continue
+                    for dependent in dependents[name]:
+                        if dependent in waiting:
+                            waiting[dependent].discard(name)
+                    if on_finish:
+                        on_finish(name, len(results), len(self.stages), durations[name])
+                submit_ready()
+
+        if failed:
+            details = "; ".join(f"{name}: {error}" for name, error in failed.items())
+            skipped_text = f" (skipped {len(skipped)} dependent stages)" if skipped else ""
+            raise RuntimeError(f"{len(failed)} stages failed{skipped_text}: {details}")
+        return results
@@ -0,0 +1,242 @@
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from price_store import PricePanel
+
+# Batched Monte Carlo trade simulator.
+#
+# A trade buys a symbol at the first close on or after a random start date
+# and sells at the first close that hits one of its exit rules (fixed stop
+# loss, take profit, trailing stop), or at the symbol's last close.
+#
+# Instead of filtering the price frame and walking rows per trade, entries
+# are located for all trades at once with a searchsorted over (symbol, day)
+# keys, and each batch of trades becomes a (trades x days held) matrix of
+# closes. The first barrier crossing is the argmax of the combined exit mask,
+# and the trailing stop level comes from a running maximum along each row, so
+# tens of thousands of trades take a few array operations per batch.
+
+TRADE_COLUMNS = ['trade_num', 'symbol', 'start_date', 'entry_date', 'pct_return', 'days_held', 'exit_reason']
+# Upper bound on the cells of one batch matrix (~32 MB of float64)
+MAX_BATCH_CELLS = 4_000_000
+NS_PER_DAY = 86_400 * 10**9
+
+
+@dataclass
+class ExitRules:
+    """Exit thresholds in percent of the entry price; None disables a rule"""
+    stop_loss_pct: Optional[float] = 6.0
+    take_profit_pct: Optional[float] = None
+    # Once the price is above the entry, sell when it falls this far below its highest close
+    trailing_stop_pct: Optional[float] = None
+
+
+def random_entries(panel: PricePanel, num_trades: int, lookback_days: int,
+                   rng: Optional[np.random.Generator] = None, now=None):
+    """
+    Random (symbol position, start time) pairs: a uniformly drawn symbol and a
+    start time 0..lookback_days whole days after now - lookback_days.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    first_start = pd.Timestamp(now if now is not None else pd.Timestamp.now()) - pd.Timedelta(days=lookback_days)
+    symbol_positions = rng.integers(0, len(panel), num_trades)
+    offsets_days = rng.integers(0, lookback_days + 1, num_trades)
+    start_times = first_start.to_datetime64().astype('datetime64[ns]') + offsets_days.astype('timedelta64[D]')
+    return symbol_positions, start_times
+
+
+def simulate_trades(panel: PricePanel, symbol_positions: np.ndarray, start_times: np.ndarray,
+                    rules: ExitRules) -> pd.DataFrame:
+    """
+    Simulate one trade per (symbol position, start time), in the given order.
+
+    Returns a frame with TRADE_COLUMNS. Trades whose symbol has no close on or
+    after the start time get exit_reason "No data available" and NaN results.
+    """
+    symbol_positions = np.asarray(symbol_positions, dtype=np.int64)
+    start_times = np.asarray(start_times, dtype='datetime64[ns]')
+    closes = panel.columns['Close'].astype(np.float64, copy=False)
+    trades = pd.DataFrame({
+        'trade_num': np.arange(1, len(symbol_positions) + 1),
+        'symbol': panel.symbols[symbol_positions] if len(panel) else np.array([], dtype=str),
+        'start_date': start_times,
+        'entry_date': pd.NaT,
+        'pct_return': np.nan,
+        'days_held': np.nan,
+        'exit_reason': "No data available",
+    })
+    if len(symbol_positions) == 0 or len(closes) == 0:
+        return trades[TRADE_COLUMNS]
+
+    # First row on or after the start: dates are midnights, so that is the start rounded up to a day
+    keys, first_day, stride = panel.day_keys()
+    start_days = -(-start_times.astype(np.int64) // NS_PER_DAY)
+    wanted = symbol_positions * stride + np.clip(start_days - first_day, 0, stride - 1)
+    entries = np.searchsorted(keys, wanted)
+    ends = panel.offsets[symbol_positions + 1]
+    valid = np.flatnonzero(entries < ends)
+    if len(valid) == 0:
+        # E.g. every start is after the store's last date
+        return trades[TRADE_COLUMNS]
+
+    entries, ends = entries[valid], ends[valid]
+    pct_return = np.empty(len(valid))
+    exit_rows = np.empty(len(valid), dtype=np.int64)
+    reasons = np.empty(len(valid), dtype=object)
+
+    horizon = int((ends - entries).max())
+    batch_size = max(1, MAX_BATCH_CELLS // horizon)
+    for batch in range(0, len(valid), batch_size):
+        rows = slice(batch, batch + batch_size)
+        pct_return[rows], exit_rows[rows], reasons[rows] = _simulate_batch(closes, entries[rows], ends[rows], rules)
+
+    days_held = (panel.dates[exit_rows] - panel.dates[entries]).astype(np.int64)
+    trades.loc[valid, 'entry_date'] = panel.dates[entries].astype('datetime64[ns]')
+    trades.loc[valid, 'pct_return'] = pct_return
+    trades.loc[valid, 'days_held'] = days_held
+    trades.loc[valid, 'exit_reason'] = reasons
+    trades['entry_date'] = pd.to_datetime(trades['entry_date'])
+    trades['days_held'] = trades['days_held'].astype('Int64')
+    return trades[TRADE_COLUMNS]
+
+
+def _simulate_batch(closes: np.ndarray, entries: np.ndarray, ends: np.ndarray, rules: ExitRules):
+    """(pct return, exit row, exit reason) of trades held from `entries` until an exit or `ends` - 1"""
+    horizon = int((ends - entries).max())
+    positions = entries[:, None] + np.arange(horizon)
+    inside = positions < ends[:, None]
+    prices = np.where(inside, closes[np.minimum(positions, len(closes) - 1)], np.nan)
+    entry_prices = prices[:, :1]
+    change = (prices - entry_prices) / entry_prices * 100
+
+    # NaN comparisons are False, so padding and missing closes never trigger an exit
+    exits = []
+    if rules.stop_loss_pct is not None:
+        exits.append(("Stop Loss", change <= -rules.stop_loss_pct, change))
+    if rules.take_profit_pct is not None:
+        exits.append(("Take Profit", change >= rules.take_profit_pct, change))
+    if rules.trailing_stop_pct is not None:
+        highest = np.fmax.accumulate(prices, axis=1)
+        stop_levels = highest * (1 - rules.trailing_stop_pct / 100)
+        hit = (highest > entry_prices) & (prices <= stop_levels)
+        # Sold at the stop level, not at the close that went through it
+        exits.append(("Trailing Stop", hit, (stop_levels - entry_prices) / entry_prices * 100))
+
+    trade_rows = np.arange(len(entries))
+    last_steps = ends - entries - 1
+    exit_steps = last_steps.copy()
+    pct_return = change[trade_rows, last_steps]
+    reasons = np.full(len(entries), "End of Data", dtype=object)
+    if exits:
+        any_hit = np.logical_or.reduce([hit for _, hit, _ in exits])
+        exited = any_hit.any(axis=1)
+        first_steps = any_hit.argmax(axis=1)
+        exit_steps = np.where(exited, first_steps, last_steps)
+        # Rules are checked in order on the exit day, so the first matching one names the exit
+        decided = ~exited
+        for reason, hit, returns in exits:
+            matched = ~decided & hit[trade_rows, first_steps]
+            pct_return = np.where(matched, returns[trade_rows, first_steps], pct_return)
+            reasons[matched] = reason
+            decided |= matched
+
+    return pct_return, entries + exit_steps, reasons
+
+
+def compound_capital(trades: pd.DataFrame, initial_capital: float) -> pd.DataFrame:
+    """The successful trades with dollar_return and capital_after, reinvesting the full capital each trade"""
+    done = trades[trades['exit_reason'] != "No data available"].copy()
+    capital_after = initial_capital * np.cumprod(1 + done['pct_return'].to_numpy() / 100)
+    capital_before = np.concatenate([[initial_capital], capital_after[:-1]])
+    done['dollar_return'] = capital_before * done['pct_return'].to_numpy() / 100
+    done['capital_after'] = capital_after
+    return done
+
+
+def run_simulation(panel: PricePanel, num_trades: int, lookback_days: int, rules: ExitRules,
+                   seed: Optional[int] = None) -> pd.DataFrame:
+    """Simulate num_trades random trades started within the last lookback_days"""
+    symbol_positions, start_times = random_entries(panel, num_trades, lookback_days, np.random.default_rng(seed))
+    return simulate_trades(panel, symbol_positions, start_times, rules)
+
+
+def print_report(trades: pd.DataFrame, initial_capital: float, show_trades: bool = True) -> pd.DataFrame:
+    """Print the trade log and summary statistics; returns the successful trades with capital columns"""
+    done = compound_capital(trades, initial_capital)
+    final_capital = done['capital_after'].iloc[-1] if len(done) else initial_capital
+
+    print(f"Initial Capital: ${initial_capital:,.2f}")
+    print("-" * 80)
+    if show_trades:
+        lines = []
+        log = trades.merge(done[['trade_num', 'dollar_return', 'capital_after']], on='trade_num', how='left')
+        for trade in log.itertuples(index=False):
+            start = pd.Timestamp(trade.start_date).strftime('%Y-%B-%d')
+            if not pd.isna(trade.capital_after):
+                lines.append(f"Trade #{trade.trade_num:3d} | {trade.symbol:6s} | {start} | "
+                             f"{trade.pct_return:+6.2f}% | ${trade.dollar_return:+8.2f} | {trade.days_held:3d} days | "
+                             f"{trade.exit_reason:12s} | Capital: ${trade.capital_after:10.2f}")
+            else:
+                lines.append(f"Trade #{trade.trade_num:3d} | {trade.symbol:6s} | {start} | FAILED - No data available")
+        print("\n".join(lines))
+        print("-" * 80)
+
+    print(f"Simulation Complete!")
+    print(f"Successful Trades: {len(done)}/{len(trades)}")
+    print(f"Initial Capital: ${initial_capital:,.2f}")
+    print(f"Final Capital: ${final_capital:,.2f}")
+    print(f"Total Return: {((final_capital - initial_capital) / initial_capital * 100):+.2f}%")
+
+    if len(done):
+        returns = done['pct_return']
+        print(f"Win Rate: {(returns > 0).mean() * 100:.1f}%")
+        print(f"Average Return per Trade: {returns.mean():+.2f}%")
+        print(f"Average Win: {returns[returns > 0].mean() if (returns > 0).any() else 0:+.2f}%")
+        print(f"Average Loss: {returns[returns < 0].mean() if (returns < 0).any() else 0:+.2f}%")
+        print("Exits: " + ", ".join(f"{reason} {count}" for reason, count in done['exit_reason'].value_counts().items()))
+    return done
+
+
+def plot_results(done: pd.DataFrame) -> None:
+    """Capital, return distribution, cumulative return and holding period plots of the successful trades"""
+    if done.empty:
+        print("No trades to plot")
+        return
+    import matplotlib.pyplot as plt
+
+    fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(15, 10))
+    fig.suptitle('Trading Simulation Results', fontsize=16)
+    trade_nums = done['trade_num']
+
+    ax1.plot(trade_nums, done['capital_after'], 'b-', linewidth=2)
+    ax1.set_title('Capital Over Time')
+    ax1.set_xlabel('Trade Number')
+    ax1.set_ylabel('Capital ($)')
+    ax1.grid(True, alpha=0.3)
+    ax1.yaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: f'${x:,.0f}'))
+
+    ax2.hist(done['pct_return'], bins=20, alpha=0.7, color='green', edgecolor='black')
+    ax2.set_title('Distribution of Trade Returns')
+    ax2.set_xlabel('Return (%)')
+    ax2.set_ylabel('Frequency')
+    ax2.grid(True, alpha=0.3)
+    ax2.axvline(x=0, color='red', linestyle='--', alpha=0.7)
+
+    ax3.plot(trade_nums, done['pct_return'].cumsum(), 'g-', linewidth=2)
+    ax3.set_title('Cumulative Returns')
+    ax3.set_xlabel('Trade Number')
+    ax3.set_ylabel('Cumulative Return (%)')
+    ax3.grid(True, alpha=0.3)
+    ax3.axhline(y=0, color='red', linestyle='--', alpha=0.7)
+
+    ax4.hist(done['days_held'].astype(float), bins=15, alpha=0.7, color='orange', edgecolor='black')
+    ax4.set_title('Distribution of Days Held')
+    ax4.set_xlabel('Days Held')
+    ax4.set_ylabel('Frequency')
+    ax4.grid(True, alpha=0.3)
+
+    plt.tight_layout()
+    plt.show()
@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+
+from price_store import PricePanel
+
+# Minervini trend template for the whole universe at once.
+#
+# Every condition used by trending_up, above_52week_low, close_to_52week_high
+# and minimum_5_dollar is evaluated as an array operation over trailing
+# (symbols x rows) matrices and returned as one boolean column per condition,
+# indexed by symbol. A new condition is one more column here instead of
+# another pass over the price data.
+
+# 200MA markers of the "200MA rising" conditions, in trading rows counted back
+# from the last row (current, then 1, 2, 3 and 4 months ago)
+MONTH_MARKERS = [-1, -22, -44, -66, -88]
+MA_LENGTHS = [50, 150, 200]
+# Enough trailing rows for a 200MA four months back
+TREND_ROWS = max(MA_LENGTHS) - MONTH_MARKERS[-1] - 1
+# Upper bound of the rows a symbol can have in 52 weeks (one per calendar day)
+YEAR_ROWS = 367
+
+MA_CONDITIONS = ['ma150_above_ma200', 'ma50_above_ma150', 'close_above_ma50',
+                 'close_above_ma150', 'close_above_ma200']
+
+
+def trending_up_conditions(months: int):
+    """Conditions trending_up requires, with the 200MA rising for `months` months"""
+    return MA_CONDITIONS + [f'ma200_rising_{months}mo']
+
+
+def _window_mean(matrix: np.ndarray, end: int, window: int) -> np.ndarray:
+    """Mean of the `window` columns ending at column `end` (negative index); NaN if any is missing"""
+    stop = matrix.shape[1] + end + 1
+    return matrix[:, stop - window:stop].mean(axis=1)
+
+
+def _moving_average_conditions(panel: PricePanel) -> dict:
+    closes = panel.trailing_matrix('Close', TREND_ROWS)
+    close = closes[:, -1]
+    ma50 = _window_mean(closes, -1, 50)
+    ma150 = _window_mean(closes, -1, 150)
+    ma200 = [_window_mean(closes, marker, 200) for marker in MONTH_MARKERS]
+
+    # Comparisons with NaN are False, so symbols without enough history fail every condition
+    conditions = {
+        'ma150_above_ma200': ma150 > ma200[0],
+        'ma50_above_ma150': ma50 > ma150,
+        'close_above_ma50': close > ma50,
+        'close_above_ma150': close > ma150,
+        'close_above_ma200': close > ma200[0],
+    }
+    rising = np.ones(len(close), dtype=bool)
+    for months in range(1, len(MONTH_MARKERS)):
+        rising &= ma200[months - 1] > ma200[months]
+        conditions[f'ma200_rising_{months}mo'] = rising.copy()
+    return conditions
+
+
+def _year_range_conditions(panel: PricePanel) -> dict:
+    """52-week conditions on the non-missing closes within a year of each symbol's last close"""
+    last_rows = panel.last_valid_rows('Close')
+    has_close = last_rows >= 0
+    ends = np.where(has_close, last_rows + 1, panel.offsets[1:])
+
+    closes = panel.trailing_matrix('Close', YEAR_ROWS, ends)
+    positions, inside = panel.trailing_positions(YEAR_ROWS, ends)
+    dates = np.where(inside, panel.dates[np.where(inside, positions, 0)], np.datetime64('NaT'))
+
+    latest = pd.DatetimeIndex(dates[:, -1])
+    one_year_ago = (latest - pd.DateOffset(years=1)).to_numpy(dtype='datetime64[D]')
+    in_year = inside & (dates >= one_year_ago[:, None]) & ~np.isnan(closes)
+
+    current = closes[:, -1]
+    with np.errstate(invalid='ignore'):
+        year_low = np.where(in_year, closes, np.inf).min(axis=1)
+        year_high = np.where(in_year, closes, -np.inf).max(axis=1)
+
+    return {
+        'above_52week_low': has_close & (current >= year_low * 1.30),
+        'close_to_52week_high': has_close & (current >= year_high * 0.75),
+        'last_price_above_10': has_close & (current >= 10),
+    }
+
+
+def evaluate_trend_template(panel: PricePanel) -> pd.DataFrame:
+    """
+    Pass/fail of every trend template condition for every symbol.
+
+    Returns:
+        DataFrame of booleans indexed by Symbol (in panel order), one column per
+        condition. The result is cached on the panel, so screens sharing a panel
+        evaluate the template once.
+    """
+    def build():
+        conditions = _moving_average_conditions(panel)
+        conditions.update(_year_range_conditions(panel))
+        return pd.DataFrame(conditions, index=pd.Index(panel.symbols.astype(object), name='Symbol'))
+    return panel.cached('trend_template', build)
+
+
+def passing_symbols(panel: PricePanel, conditions) -> list:
+    """Symbols that pass all of the given conditions, in panel order"""
+    masks = evaluate_trend_template(panel)
+    return masks.index[masks[list(conditions)].all(axis=1)].tolist()
@@ -116,9 +116,9 @@ export const PipelineStatus: React.FC<PipelineStatusProps> = ({
                 </div>
 
                 <div className="flex flex-wrap gap-1">
-                    {status.steps_completed.map((step) => (
+                    {status.steps_completed.map((step, index) => (
                         <Badge 
-                            key={step} 
+                            key={`${index}-${step}`} 
                             variant="outline"
                             className="text-xs flex items-center gap-1"
                         >
@@ -1,13 +1,53 @@
 // hooks/usePipelineStatus.ts
 
 import { useState, useEffect } from 'react';
-import { PipelineStatus } from '../types/pipelineStatus';
-import { getPipelineStatus } from '../services/pipelineService';
+import { PipelineEvent, PipelineStatus } from '../types/pipelineStatus';
+import { getPipelineStatus, PIPELINE_EVENTS_URL } from '../services/pipelineService';
 
 interface UsePipelineStatusOptions {
+    // Used only when the browser can't keep the event stream open
     pollingInterval?: number;
 }
 
+const NO_RUN_ERROR = 'No pipeline run yet. Start a screening to see live progress.';
+
+// Applies one progress event to the status it follows
+export function applyPipelineEvent(status: PipelineStatus, event: PipelineEvent): PipelineStatus {
+    const next: PipelineStatus = { ...status, last_updated: event.time, event_id: event.id };
+    switch (event.type) {
+        case 'step': {
+            const step = event.step ?? status.current_step;
+            next.current_step = step;
+            next.steps_completed = [...status.steps_completed, step];
+            break;
+        }
+        case 'stage':
+            // Engine stages only advance the current step, they don't add completed steps
+            if (event.step !== undefined) next.current_step = event.step;
+            if (event.stage !== undefined && event.seconds !== undefined) {
+                next.stage_timings = { ...status.stage_timings, [event.stage]: event.seconds };
+            }
+            break;
+        case 'batch':
+            next.current_batch = event.current_batch ?? null;
+            next.total_batches = event.total_batches ?? null;
+            break;
+        case 'error':
+            next.errors = [
+                ...(status.errors ?? []),
+                { script: event.script ?? '', error: event.error ?? '', timestamp: event.time },
+            ];
+            break;
+        case 'status':
+            if (event.status !== undefined) next.status = event.status;
+            if (event.process_pid !== undefined) next.process_pid = event.process_pid;
+            if (event.end_time !== undefined) next.end_time = event.end_time;
+            if (event.error !== undefined) next.error = event.error;
+            break;
+    }
+    return next;
+}
+
 export function usePipelineStatus({ pollingInterval = 1000 }: UsePipelineStatusOptions = {}) {
     const [status, setStatus] = useState<PipelineStatus | null>(null);
     const [error, setError] = useState<Error | null>(null);
@@ -15,6 +55,8 @@ export function usePipelineStatus({ pollingInterval = 1000 }: UsePipelineStatusO
 
     useEffect(() => {
         let isSubscribed = true;
+        let intervalId: ReturnType<typeof setInterval> | null = null;
+        let source: EventSource | null = null;
 
         const fetchStatus = async () => {
             try {
@@ -34,18 +76,50 @@ export function usePipelineStatus({ pollingInterval = 1000 }: UsePipelineStatusO
             }
         };
 
-        // Initial fetch
-        fetchStatus();
+        const startPolling = () => {
+            if (intervalId !== null) return;
+            fetchStatus();
+            intervalId = setInterval(fetchStatus, pollingInterval);
+        };
+
+        if (typeof EventSource === 'undefined') {
+            startPolling();
+        } else {
+            source = new EventSource(PIPELINE_EVENTS_URL);
+
+            // Sent on connect and when a new run starts: replaces the whole status
+            source.addEventListener('snapshot', (e) => {
+                if (!isSubscribed) return;
+                const snapshot = JSON.parse((e as MessageEvent).data) as PipelineStatus | null;
+                setStatus(snapshot);
+                setError(snapshot ? null : new Error(NO_RUN_ERROR));
+                setIsLoading(false);
+            });
 
-        // Poll at the specified interval
-        const intervalId = setInterval(fetchStatus, pollingInterval);
+            const onProgress = (e: Event) => {
+                if (!isSubscribed) return;
+                const event = JSON.parse((e as MessageEvent).data) as PipelineEvent;
+                setStatus((current) => (current ? applyPipelineEvent(current, event) : current));
+            };
+            ['step', 'stage', 'batch', 'error', 'status'].forEach((type) =>
+                source?.addEventListener(type, onProgress)
+            );
+
+            source.onerror = () => {
+                // EventSource reconnects by itself (and gets a fresh snapshot); poll only if it gave up
+                if (isSubscribed && source?.readyState === EventSource.CLOSED) {
+                    startPolling();
+                }
+            };
+        }
 
         // Cleanup function
         return () => {
             isSubscribed = false;
-            clearInterval(intervalId);
+            source?.close();
+            if (intervalId !== null) clearInterval(intervalId);
         };
     }, [pollingInterval]);
 
     return { status, error, isLoading };
-}
\ No newline at end of file
+}
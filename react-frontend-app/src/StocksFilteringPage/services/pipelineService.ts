@@ -10,4 +10,7 @@ export async function getPipelineStatus(): Promise<PipelineStatus> {
         throw new Error(`Failed to fetch pipeline status: ${response.statusText}`);
     }
     return response.json();
-}
\ No newline at end of file
+}
+
+// Server-Sent Events: a "snapshot" event with the current status, then one event per change
+export const PIPELINE_EVENTS_URL = `${API_CONFIG.baseURL}/stock_filtering_app/pipeline/events`;
@@ -1,12 +1,13 @@
 import axios from 'axios';
-import { RankingListSuccessResponse } from '../types/rankingList';
+import { RankingListSuccessResponse, RankingQuery } from '../types/rankingList';
 import { API_CONFIG } from '../../config';
 
 export const rankingService = {
-  async fetchRankingList(fileName: string): Promise<RankingListSuccessResponse> {
+  async fetchRankingList(fileName: string, query?: RankingQuery): Promise<RankingListSuccessResponse> {
     try {
       const response = await axios.get(
-        `${API_CONFIG.baseURL}/stock_filtering_app/rankings/${fileName}`
+        `${API_CONFIG.baseURL}/stock_filtering_app/rankings/${fileName}`,
+        { params: query }
       );
       
       // If response.data is already an object, use it directly
@@ -17,7 +18,11 @@ export const rankingService = {
           stock_data_created_at: response.data.stock_data_created_at,
           rankings_created_at: response.data.rankings_created_at,
           total_stocks: response.data.total_stocks || 0, // Default to 0 if not present
-          filtered_stocks: response.data.filtered_stocks || 0 // Default to 0 if not present
+          filtered_stocks: response.data.filtered_stocks || 0, // Default to 0 if not present
+          matched_stocks: response.data.matched_stocks,
+          offset: response.data.offset,
+          limit: response.data.limit,
+          next_offset: response.data.next_offset
         };
       }
 
@@ -35,7 +40,11 @@ export const rankingService = {
           stock_data_created_at: parsed.stock_data_created_at,
           rankings_created_at: parsed.rankings_created_at,
           total_stocks: parsed.total_stocks || 0, // Default to 0 if not present
-          filtered_stocks: parsed.filtered_stocks || 0 // Default to 0 if not present
+          filtered_stocks: parsed.filtered_stocks || 0, // Default to 0 if not present
+          matched_stocks: parsed.matched_stocks,
+          offset: parsed.offset,
+          limit: parsed.limit,
+          next_offset: parsed.next_offset
         };
       }
 
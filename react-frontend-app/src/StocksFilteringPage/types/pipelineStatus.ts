@@ -1,3 +1,9 @@
+export interface PipelineError {
+  script: string;
+  error: string;
+  timestamp: number;
+}
+
 export interface PipelineStatus {
   current_batch: number | null;
   current_step: string;
@@ -6,5 +12,30 @@ export interface PipelineStatus {
   status: 'completed' | 'running' | 'failed';
   steps_completed: string[];
   total_batches: number | null;
-  process_pid: number;
-}
\ No newline at end of file
+  process_pid: number | null;
+  // Seconds per finished screening stage
+  stage_timings?: Record<string, number>;
+  errors?: PipelineError[];
+  // Id of the last progress event included in this status
+  event_id?: number;
+  end_time?: number;
+  error?: string;
+}
+
+// Progress events streamed from /pipeline/events, one per status change
+export interface PipelineEvent {
+  id: number;
+  run: number;
+  type: 'step' | 'stage' | 'batch' | 'error' | 'status';
+  time: number;
+  step?: string;
+  stage?: string;
+  seconds?: number;
+  current_batch?: number;
+  total_batches?: number;
+  script?: string;
+  error?: string;
+  status?: PipelineStatus['status'];
+  process_pid?: number | null;
+  end_time?: number;
+}
@@ -20,6 +20,21 @@ export interface RankingListSuccessResponse {
   rankings_created_at: string;
   total_stocks: number;  // Optional as older API responses might not have this
   filtered_stocks: number; // Optional as older API responses might not have this
+  // Paging fields, for requests made with a RankingQuery
+  matched_stocks?: number;
+  offset?: number;
+  limit?: number | null;
+  next_offset?: number | null;
+}
+
+// Optional server-side paging, projection, sorting and filtering of a ranking list
+export interface RankingQuery {
+  offset?: number;
+  limit?: number;
+  columns?: string; // comma-separated, e.g. "Symbol,Screeners"
+  sort?: string;
+  order?: 'asc' | 'desc';
+  symbol?: string; // comma-separated symbols
 }
 
 // For the error response